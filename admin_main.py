@@ -4,13 +4,29 @@ Sistema de administración principal - CRUD de Categorías y Trabajos
 import streamlit as st
 import sys
 import os
+import time
+import contextvars
+from collections import Counter
 
 # Agregar el directorio shared al path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'shared'))
 
-from database import CategoriesDatabase, WorksDatabase
-from config import APP_CONFIG, WORK_STATUS, CATEGORY_ICONS
-from utils import generate_category_id, generate_work_id, format_date, get_status_badge, show_success_message, show_error_message
+from database import CategoriesDatabase, WorksDatabase, prefetch, snapshot_cache, write_queue
+from backends import CATEGORIES_TABLE, WORKS_TABLE, get_backend
+from instrumentation import start_rerun, get_rerun_calls
+from startup import get_startup_report
+from importer import read_import_file, validate_categories_import, validate_works_import
+from config import APP_CONFIG, COST_GUARD_CONFIG, WORK_STATUS, CATEGORY_ICONS, PREFETCH_CONFIG
+from cost_guard import QueryBudgetExceeded, SessionBudget, format_bytes, set_session_budget
+from presentation import categories_display, option_map, works_display
+from utils import generate_category_id, generate_work_id, show_success_message, show_error_message, validate_image_file
+
+# Columnas del listado de trabajos (image_preview_url solo se usa en la galería)
+WORKS_LIST_DISPLAY_COLUMNS = ['work_name', 'category', 'status', 'version', 'created_date', 'image_preview_url']
+WORKS_TABLE_COLUMNS = [column for column in WORKS_LIST_DISPLAY_COLUMNS if column != 'image_preview_url']
+
+# Escrituras diferidas de la sesión cuyo estado se muestra (las más recientes)
+WRITE_STATUS_LIMIT = 20
 
 # Configuración de la página
 st.set_page_config(
@@ -43,36 +59,184 @@ def check_admin_access():
 
 def main():
     """Función principal de administración"""
+    start_rerun()
+    budget = session_cost_budget()
     check_admin_access()
     
     st.title("⚙️ Data Science Admin")
     st.markdown("*Sistema de Administración - Categorías y Trabajos*")
     st.divider()
     
-    # Tabs principales
-    tab1, tab2 = st.tabs(["📂 Gestión de Categorías", "📋 Gestión de Trabajos"])
+    # Contador del pool de conexiones BigQuery compartido por todas las sesiones
+    pool_stats = get_backend().connection_stats()
+    if pool_stats:
+        st.sidebar.caption(
+            f"🔌 Clientes BigQuery: {pool_stats['clients']} · "
+            f"Conexiones: {pool_stats['connections_opened']} abiertas / {pool_stats['connections_idle']} inactivas"
+        )
     
-    with tab1:
-        show_categories_management()
+    # Solo se ejecuta la sección activa: las ocultas no consultan la base de datos
+    section_id = show_navigation()
+    section = SECTIONS[section_id]
     
-    with tab2:
-        show_works_management()
-
-def show_categories_management():
-    """Gestión de categorías"""
-    st.subheader("📂 Gestión de Categorías")
+    # Precarga concurrente: al iniciar la sesión, categorías y trabajos; luego, lo que declare la sección
+    if PREFETCH_CONFIG["enabled"]:
+        namespaces = set(section["loads"])
+        if not st.session_state.get("session_prefetched"):
+            namespaces |= {"categories", "works"}
+            st.session_state.session_prefetched = True
+        prefetch_data(namespaces)
+    
+    # Solo se avisa de lo que bloquee el render: la sección reintenta lo que la precarga no pudo leer
+    budget.clear_blocked()
+    st.subheader(section["group"])
+    cost_warnings = st.container()
+    section["render"]()
+    show_cost_warnings(cost_warnings, budget)
     
-    # Subtabs para categorías
-    cat_tab1, cat_tab2, cat_tab3 = st.tabs(["📋 Ver Categorías", "➕ Agregar Categoría", "✏️ Editar Categoría"])
+    if st.session_state.get("write_ids"):
+        with st.sidebar:
+            show_write_status()
     
-    with cat_tab1:
-        show_categories_list()
+    if pool_stats and COST_GUARD_CONFIG["enabled"]:
+        st.sidebar.caption(f"💸 Consumo de la sesión: {format_bytes(budget.spent_bytes)} de "
+                           f"{format_bytes(budget.limit_bytes)}")
     
-    with cat_tab2:
-        show_add_category_form()
+    if st.sidebar.toggle("🩺 Diagnóstico", key="show_diagnostics"):
+        show_diagnostics_panel(section)
+
+def show_navigation() -> str:
+    """Selector de sección guardado en session_state; devuelve el ID de la sección activa"""
+    groups = list(dict.fromkeys(section["group"] for section in SECTIONS.values()))
+    group = st.sidebar.radio("Sección", groups, key="nav_group")
+    
+    group_sections = [section_id for section_id, section in SECTIONS.items() if section["group"] == group]
+    return st.radio(
+        "Vista",
+        group_sections,
+        format_func=lambda section_id: SECTIONS[section_id]["label"],
+        horizontal=True,
+        label_visibility="collapsed",
+        key=f"nav_section_{group_sections[0]}"
+    )
+
+def prefetch_data(namespaces: set):
+    """Lanzar a la vez las lecturas de los datos indicados; quedan en la caché compartida"""
+    loaders = {}
+    if "categories" in namespaces:
+        loaders["categories"] = CategoriesDatabase().get_all_categories
+    if "works" in namespaces:
+        # session_state se lee en el hilo del script: los hilos del pool no tienen contexto de Streamlit
+        request = works_list_request()
+        loaders["works"] = lambda: WorksDatabase().list_works(**request)
+    prefetch(loaders)
+
+def works_list_request(filters=None) -> dict:
+    """Parámetros de list_works de la página visible (filtros y cursor de session_state)"""
+    cursors = st.session_state.get("works_page_cursors", [None])
+    return {
+        "columns": WORKS_LIST_DISPLAY_COLUMNS,
+        "filters": filters if filters is not None else st.session_state.get("works_page_filters", {}),
+        "page_size": APP_CONFIG["works_page_size"],
+        "cursor": cursors[-1]
+    }
+
+def session_cost_budget() -> SessionBudget:
+    """Presupuesto de bytes de la sesión, asociado a las consultas del rerun actual"""
+    budget = st.session_state.get("cost_budget")
+    if budget is None:
+        budget = st.session_state.cost_budget = SessionBudget(COST_GUARD_CONFIG["session_budget_bytes"])
+    set_session_budget(budget)
+    return budget
+
+def show_cost_warnings(container, budget: SessionBudget):
+    """Avisar de las consultas que el control de costo no ejecutó y permitir ejecutarlas una vez"""
+    for fingerprint, error in list(budget.blocked.items()):
+        with container:
+            st.warning(f"💸 Consulta no ejecutada por su costo estimado: {error}. "
+                       f"Revise los filtros o confirme para ejecutarla una vez.")
+            st.button("Ejecutar de todas formas", key=f"cost_allow_{fingerprint}",
+                      on_click=budget.allow_once, args=(fingerprint,))
+
+def track_writes(write_ids):
+    """Recordar en la sesión las últimas escrituras diferidas (WRITE_STATUS_LIMIT) para mostrar su estado"""
+    if write_ids:
+        tracked = st.session_state.get("write_ids", []) + list(write_ids)
+        st.session_state.write_ids = tracked[-WRITE_STATUS_LIMIT:]
+
+def show_write_status():
+    """Estado de las escrituras diferidas de la sesión; se refresca solo mientras haya pendientes"""
+    statuses = write_queue.statuses(st.session_state.get("write_ids", []))
+    polling = any(s["status"] == "pending" for s in statuses)
+    # Fragmento con sondeo cada 2 s solo si queda algo pendiente; si no, se dibuja una vez
+    st.fragment(write_status_fragment, run_every=2 if polling else None)(polling)
+
+def write_status_fragment(polling: bool):
+    """Contadores y errores de las escrituras diferidas, sin releer datos"""
+    statuses = write_queue.statuses(st.session_state.get("write_ids", []))
+    if not statuses:
+        return
+    counts = Counter(s["status"] for s in statuses)
+    st.caption(f"✍️ Escrituras: {counts['pending']} pendientes · {counts['committed']} confirmadas · "
+               f"{counts['failed']} fallidas")
+    for status in statuses:
+        if status["status"] == "failed":
+            st.error(f"No se pudo guardar {status['key']} ({status['kind']}): {status['error']}")
+    if polling and not counts["pending"]:
+        # Todo confirmado: un rerun completo vuelve a dibujar el fragmento sin sondeo
+        st.rerun()
+
+def loaded_namespaces(calls) -> set:
+    """Datos ("categories", "works") leídos en el rerun según los registros de la caché"""
+    return {c["key"].split(":")[0] for c in calls if c.get("kind") == "cache"}
+
+def show_diagnostics_panel(section):
+    """Desglose de las llamadas a la base de datos del rerun actual"""
+    calls = get_rerun_calls()
+    queries = [c for c in calls if c.get("kind") not in ("cache", "resilience")]
+    resilience = [c for c in calls if c.get("kind") == "resilience"]
+    cache_hits = sum(1 for c in calls if c.get("cache") == "hit")
+    cache_misses = sum(1 for c in calls if c.get("cache") == "miss")
     
-    with cat_tab3:
-        show_edit_category_form()
+    with st.sidebar:
+        st.subheader("🩺 Diagnóstico del rerun")
+        declared = set(section["loads"])
+        loaded = loaded_namespaces(calls)
+        st.caption(f"Datos declarados: {', '.join(sorted(declared)) or 'ninguno'} · "
+                   f"leídos: {', '.join(sorted(loaded)) or 'ninguno'}")
+        if not loaded <= declared:
+            st.warning(f"La sección leyó datos no declarados: {', '.join(sorted(loaded - declared))}")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Jobs", len(queries))
+            st.metric("Caché (aciertos/fallos)", f"{cache_hits}/{cache_misses}")
+        with col2:
+            st.metric("Tiempo (ms)", f"{sum(c.get('wall_ms', 0) for c in queries):.0f}")
+            st.metric("MB procesados", f"{sum(c.get('bytes_processed') or 0 for c in queries) / 1e6:.1f}")
+        
+        if resilience:
+            st.caption(f"Reintentos: {sum(c['retries'] for c in resilience)} · "
+                       f"lecturas duplicadas: {sum(c['hedges'] for c in resilience)} · "
+                       f"plazos vencidos: {sum(1 for c in resilience if c['outcome'] == 'deadline')}")
+        
+        startup_report = get_startup_report()
+        if startup_report:
+            st.caption("Arranque del proceso (ms): " + " · ".join(
+                f"{name.removesuffix('_ms')} {value:.0f}" for name, value in startup_report.items()
+            ))
+        
+        # Memoria de los snapshots compartidos por todas las sesiones del proceso
+        snapshots = snapshot_cache.memory_report()
+        if snapshots:
+            st.caption("Snapshots en memoria: " + " · ".join(
+                f"{entry['key']} {entry['rows']} filas, {format_bytes(entry['bytes'])}" for entry in snapshots
+            ))
+        
+        if queries:
+            columns = ["operation", "kind", "wall_ms", "rows", "bytes_processed", "slot_millis",
+                       "bigquery_cache_hit", "job_id", "error"]
+            st.dataframe([{column: c.get(column) for column in columns} for c in queries],
+                         width="stretch")
 
 def show_categories_list():
     """Mostrar lista de categorías"""
@@ -87,10 +251,10 @@ def show_categories_list():
         st.subheader("📋 Lista de Categorías")
         
         # Mostrar tabla
-        display_df = categories_df[['category_name', 'category_icon', 'display_order', 'created_date']].copy()
-        display_df['created_date'] = display_df['created_date'].apply(format_date)
+        st.dataframe(categories_display(categories_df), width="stretch")
         
-        st.dataframe(display_df, use_container_width=True)
+        show_export_controls("categories", CATEGORIES_TABLE, db.check_export_cost,
+                             lambda fmt, compress: db.export_categories(fmt, compress))
         
     except Exception as e:
         st.error(f"Error al cargar categorías: {str(e)}")
@@ -159,8 +323,7 @@ def show_edit_category_form():
             return
         
         # Selector de categoría
-        category_options = {row['category_name']: row['category_id'] 
-                          for _, row in categories_df.iterrows()}
+        category_options = option_map(categories_df, 'category_name', 'category_id')
         
         selected_category_name = st.selectbox("Seleccionar categoría a editar:", list(category_options.keys()))
         selected_category_id = category_options[selected_category_name]
@@ -190,6 +353,8 @@ def show_edit_category_form():
                     height=100
                 )
                 
+                archive_works = st.checkbox("Al archivar, archivar también los trabajos de esta categoría")
+                
                 col1, col2 = st.columns(2)
                 with col1:
                     update_submitted = st.form_submit_button("💾 Actualizar Categoría")
@@ -209,6 +374,7 @@ def show_edit_category_form():
                             }
                             
                             if db.update_category(selected_category_id, update_data):
+                                track_writes(db.last_write_ids)
                                 st.success(f"✅ Categoría '{category_name}' actualizada exitosamente")
                                 st.rerun()
                             else:
@@ -219,7 +385,8 @@ def show_edit_category_form():
                 
                 if delete_submitted:
                     try:
-                        if db.archive_category(selected_category_id):
+                        if db.archive_categories_bulk([selected_category_id], include_works=archive_works):
+                            track_writes(db.last_write_ids)
                             st.success(f"✅ Categoría '{category_name}' archivada exitosamente")
                             st.rerun()
                         else:
@@ -230,43 +397,190 @@ def show_edit_category_form():
     except Exception as e:
         st.error(f"Error al cargar categorías: {str(e)}")
 
-def show_works_management():
-    """Gestión de trabajos"""
-    st.subheader("📋 Gestión de Trabajos")
-    
-    # Subtabs para trabajos
-    work_tab1, work_tab2, work_tab3 = st.tabs(["📋 Ver Trabajos", "➕ Agregar Trabajo", "✏️ Editar Trabajo"])
+def show_import_categories_form():
+    """Importación masiva de categorías desde CSV/JSONL"""
+    st.subheader("📥 Importar Categorías")
+    st.caption("Columnas: category_name *, description *, category_id, category_icon, display_order")
     
-    with work_tab1:
-        show_works_list()
+    uploaded_file = st.file_uploader("Archivo CSV o JSONL", type=['csv', 'jsonl', 'json'], key="import_categories_file")
+    if uploaded_file is None:
+        return
     
-    with work_tab2:
-        show_add_work_form()
+    try:
+        db = CategoriesDatabase()
+        import_df = read_import_file(uploaded_file)
+        existing_ids = existing_ids_for_upload("import_categories", uploaded_file, db.get_all_category_ids)
+        valid_df, errors_df = validate_categories_import(import_df, existing_ids)
+        
+        show_import_summary(len(import_df), valid_df, errors_df)
+        
+        if not valid_df.empty and st.button(f"Importar {len(valid_df)} categorías", key="import_categories_submit"):
+            loaded = db.create_categories_bulk(valid_df.to_dict('records'))
+            st.session_state.pop("import_categories_existing_ids", None)
+            if loaded == len(valid_df):
+                st.success(f"✅ {loaded} categorías importadas exitosamente")
+            else:
+                st.error(f"❌ Solo se importaron {loaded} de {len(valid_df)} categorías")
+        
+    except Exception as e:
+        st.error(f"Error al importar categorías: {str(e)}")
+
+def existing_ids_for_upload(key: str, uploaded_file, load_ids) -> list:
+    """IDs existentes para validar una importación: load_ids() lee toda la columna de claves, así
+    que se consulta una vez por archivo subido (no en cada rerun) y se guarda en session_state.
+    Tras importar se descarta, para que las filas recién cargadas cuenten como existentes."""
+    state_key = f"{key}_existing_ids"
+    cached = st.session_state.get(state_key)
+    if cached is None or cached[0] != uploaded_file.file_id:
+        cached = st.session_state[state_key] = (uploaded_file.file_id, load_ids())
+    return cached[1]
+
+def show_import_summary(total_rows: int, valid_df, errors_df):
+    """Mostrar resultado de la validación de una importación"""
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Filas válidas", f"{len(valid_df)} / {total_rows}")
+    with col2:
+        st.metric("Errores", len(errors_df))
     
-    with work_tab3:
-        show_edit_work_form()
+    if not errors_df.empty:
+        st.warning("Las filas con errores se omiten; el resto se importa igualmente.")
+        st.dataframe(errors_df, width="stretch")
 
 def show_works_list():
-    """Mostrar lista de trabajos"""
+    """Mostrar lista de trabajos paginada y filtrada en BigQuery"""
     try:
+        cat_db = CategoriesDatabase()
+        categories_df = cat_db.get_all_categories()
+        category_options = option_map(categories_df, 'category_name', 'category_id', first={"Todas": None})
+        
+        st.subheader("📋 Lista de Trabajos")
+        
+        # Filtros aplicados en el servidor
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            category_name = st.selectbox("Categoría", list(category_options.keys()), key="works_filter_category")
+        with col2:
+            status = st.selectbox("Estado", ["Todos"] + list(WORK_STATUS.values()), key="works_filter_status")
+        with col3:
+            only_latest = st.checkbox("Solo última versión", value=False, key="works_filter_latest")
+        
+        filters = {
+            "category": category_options[category_name],
+            "status": None if status == "Todos" else status,
+            "is_latest": True if only_latest else None
+        }
+        
+        # La exportación lee la tabla completa (todas las columnas) con los filtros actuales
+        db = WorksDatabase()
+        show_export_controls("works", WORKS_TABLE, lambda: db.check_export_cost(filters),
+                             lambda fmt, compress: db.export_works(fmt, filters, compress))
+        
+        # Búsqueda en el índice en memoria: sin consultas ni paginación
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            query = st.text_input("🔎 Buscar", key="works_search",
+                                  placeholder="Nombre, descripción, subcategoría o tags")
+        with col2:
+            view = st.radio("Mostrar", ["Tabla", "Galería"], horizontal=True, key="works_view")
+        if query.strip():
+            started = time.perf_counter()
+            results_df = WorksDatabase().search_works(query, filters)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            st.caption(f"{len(results_df)} resultados en {elapsed_ms:.1f} ms")
+            if not results_df.empty:
+                show_works_page(results_df[WORKS_LIST_DISPLAY_COLUMNS], categories_df, view)
+            return
+        
+        # Pila de cursores por página; se reinicia cuando cambian los filtros
+        if st.session_state.get("works_page_filters") != filters:
+            st.session_state.works_page_filters = filters
+            st.session_state.works_page_cursors = [None]
+        cursors = st.session_state.works_page_cursors
+        
         db = WorksDatabase()
-        works_df = db.get_all_works()
+        works_df, next_cursor = db.list_works(**works_list_request(filters))
         
         if works_df.empty:
             st.info("No hay trabajos registrados.")
             return
         
-        st.subheader("📋 Lista de Trabajos")
-        
-        # Mostrar tabla
-        display_df = works_df[['work_name', 'category', 'status', 'version', 'created_date']].copy()
-        display_df['created_date'] = display_df['created_date'].apply(format_date)
+        show_works_page(works_df, categories_df, view)
         
-        st.dataframe(display_df, use_container_width=True)
+        # Controles de paginación
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("⬅️ Anterior", disabled=len(cursors) == 1, key="works_page_prev"):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            st.caption(f"Página {len(cursors)}")
+        with col3:
+            if st.button("Siguiente ➡️", disabled=next_cursor is None, key="works_page_next"):
+                cursors.append(next_cursor)
+                st.rerun()
         
     except Exception as e:
         st.error(f"Error al cargar trabajos: {str(e)}")
 
+def show_export_controls(key: str, table, check_cost, export):
+    """Descarga de una tabla; export(formato, comprimir) genera el archivo por lotes solo al pulsar el botón.
+    
+    check_cost() valida el costo al dibujar la página (una estimación cacheada, sin leer filas):
+    si el control de costo la bloquea, el aviso con "Ejecutar de todas formas" reemplaza al botón.
+    """
+    # pyarrow.parquet y los escritores de exportación se importan solo en las páginas que exportan
+    from export import EXPORT_FORMATS, export_file_name, export_mime
+    
+    with st.expander("⬇️ Exportar"):
+        try:
+            check_cost()
+        except QueryBudgetExceeded:
+            st.caption("💸 Exportación no disponible por su costo estimado (ver el aviso de arriba)")
+            return
+        col1, col2 = st.columns(2)
+        with col1:
+            fmt = st.selectbox("Formato", list(EXPORT_FORMATS), format_func=str.upper, key=f"{key}_export_format")
+        with col2:
+            compress = st.checkbox("Comprimir (gzip)", value=True, disabled=fmt == "parquet",
+                                   key=f"{key}_export_gzip")
+        # data como función: se ejecuta en otro hilo al descargar, no en cada rerun. Corre en una
+        # copia del contexto del rerun para llevar el presupuesto de costo de la sesión
+        context = contextvars.copy_context()
+        st.download_button(
+            "Descargar",
+            data=lambda: context.copy().run(export, fmt, compress),
+            file_name=export_file_name(table, fmt, compress),
+            mime=export_mime(fmt, compress),
+            on_click="ignore",
+            key=f"{key}_export_download"
+        )
+
+def show_works_page(works_df, categories_df, view: str):
+    """Trabajos de la página como tabla o como galería de miniaturas"""
+    if view == "Tabla":
+        st.dataframe(works_display(works_df[WORKS_TABLE_COLUMNS], categories_df), width="stretch")
+        return
+
+    # Pillow se importa solo en la galería y en los formularios con imagen
+    from images import load_thumbnails
+    
+    # Solo se cargan las miniaturas de la página visible, en paralelo y desde la caché compartida
+    display_df = works_display(works_df, categories_df)
+    thumbnails = load_thumbnails(works_df['image_preview_url'].fillna("").tolist())
+    columns_per_row = APP_CONFIG["gallery_columns"]
+    for start in range(0, len(display_df), columns_per_row):
+        columns = st.columns(columns_per_row)
+        for column, (_, work), thumbnail in zip(columns, display_df.iloc[start:start + columns_per_row].iterrows(),
+                                                thumbnails[start:start + columns_per_row]):
+            with column:
+                if thumbnail is not None:
+                    st.image(thumbnail, width="stretch")
+                else:
+                    st.caption("🖼️ Sin imagen")
+                st.markdown(f"**{work['work_name']}**")
+                st.caption(f"{work['category']} · {work['status']} · v{work['version']}")
+
 def show_add_work_form():
     """Formulario para agregar nuevo trabajo"""
     st.subheader("➕ Agregar Nuevo Trabajo")
@@ -280,8 +594,7 @@ def show_add_work_form():
             st.warning("No hay categorías disponibles. Crea categorías primero.")
             return
         
-        category_options = {row['category_name']: row['category_id'] 
-                          for _, row in categories_df.iterrows()}
+        category_options = option_map(categories_df, 'category_name', 'category_id')
         
         with st.form("add_work_form"):
             col1, col2 = st.columns(2)
@@ -295,7 +608,7 @@ def show_add_work_form():
             with col2:
                 status = st.selectbox("Estado *", list(WORK_STATUS.values()))
                 work_url = st.text_input("URL del Trabajo *", placeholder="https://calls-analysis-dashboard.run.app")
-                image_file = st.file_uploader("Imagen preview", type=['jpg', 'jpeg', 'png', 'gif'])
+                image_file = st.file_uploader("Imagen preview", type=['jpg', 'jpeg', 'png', 'gif', 'webp'])
             
             description = st.text_area("Descripción")
             short_description = st.text_area("Descripción corta (para el índice)")
@@ -315,6 +628,15 @@ def show_add_work_form():
                         # Obtener category_id
                         category_id = category_options[category]
                         
+                        # Guardar la imagen y sus miniaturas (una imagen ya subida se reutiliza)
+                        image_preview_url = ""
+                        if image_file is not None:
+                            is_valid, message = validate_image_file(image_file)
+                            if not is_valid:
+                                raise ValueError(message)
+                            from images import store_image
+                            image_preview_url = store_image(image_file.getvalue())["url"]
+                        
                         # Preparar datos para inserción
                         work_data = {
                             "work_id": work_id,
@@ -328,6 +650,7 @@ def show_add_work_form():
                             "description": description,
                             "short_description": short_description,
                             "work_url": work_url,
+                            "image_preview_url": image_preview_url,
                             "notes": notes,
                             "tags": []
                         }
@@ -346,10 +669,77 @@ def show_add_work_form():
     except Exception as e:
         st.error(f"Error al cargar categorías: {str(e)}")
 
+def show_import_works_form():
+    """Importación masiva de trabajos desde CSV/JSONL"""
+    st.subheader("📥 Importar Trabajos")
+    st.caption("Columnas: work_name *, category * (ID o nombre), status *, version *, work_url *, "
+               "work_id, subcategory, is_latest, description, short_description, notes, tags")
+    
+    uploaded_file = st.file_uploader("Archivo CSV o JSONL", type=['csv', 'jsonl', 'json'], key="import_works_file")
+    if uploaded_file is None:
+        return
+    
+    try:
+        categories_df = CategoriesDatabase().get_all_categories()
+        db = WorksDatabase()
+        import_df = read_import_file(uploaded_file)
+        existing_ids = existing_ids_for_upload("import_works", uploaded_file, db.get_all_work_ids)
+        valid_df, errors_df = validate_works_import(import_df, categories_df, existing_ids)
+        
+        show_import_summary(len(import_df), valid_df, errors_df)
+        
+        if not valid_df.empty and st.button(f"Importar {len(valid_df)} trabajos", key="import_works_submit"):
+            loaded = db.create_works_bulk(valid_df.to_dict('records'))
+            st.session_state.pop("import_works_existing_ids", None)
+            if loaded == len(valid_df):
+                st.success(f"✅ {loaded} trabajos importados exitosamente")
+            else:
+                st.error(f"❌ Solo se importaron {loaded} de {len(valid_df)} trabajos")
+        
+    except Exception as e:
+        st.error(f"Error al importar trabajos: {str(e)}")
+
 def show_edit_work_form():
     """Formulario para editar trabajo existente"""
     st.subheader("✏️ Editar Trabajo Existente")
     st.info("Funcionalidad de edición de trabajos pendiente de implementar")
 
+# Secciones de la aplicación: grupo, etiqueta, función que la dibuja y datos que carga
+# ("categories", "works"). Cada rerun ejecuta solo la sección activa.
+SECTIONS = {
+    "categories_list": {
+        "group": "📂 Gestión de Categorías", "label": "📋 Ver Categorías",
+        "render": show_categories_list, "loads": ("categories",)
+    },
+    "categories_add": {
+        "group": "📂 Gestión de Categorías", "label": "➕ Agregar Categoría",
+        "render": show_add_category_form, "loads": ()
+    },
+    "categories_edit": {
+        "group": "📂 Gestión de Categorías", "label": "✏️ Editar Categoría",
+        "render": show_edit_category_form, "loads": ("categories",)
+    },
+    "categories_import": {
+        "group": "📂 Gestión de Categorías", "label": "📥 Importar",
+        "render": show_import_categories_form, "loads": ("categories",)
+    },
+    "works_list": {
+        "group": "📋 Gestión de Trabajos", "label": "📋 Ver Trabajos",
+        "render": show_works_list, "loads": ("categories", "works")
+    },
+    "works_add": {
+        "group": "📋 Gestión de Trabajos", "label": "➕ Agregar Trabajo",
+        "render": show_add_work_form, "loads": ("categories",)
+    },
+    "works_edit": {
+        "group": "📋 Gestión de Trabajos", "label": "✏️ Editar Trabajo",
+        "render": show_edit_work_form, "loads": ()
+    },
+    "works_import": {
+        "group": "📋 Gestión de Trabajos", "label": "📥 Importar",
+        "render": show_import_works_form, "loads": ("categories",)
+    }
+}
+
 if __name__ == "__main__":
     main()
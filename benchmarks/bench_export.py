@@ -0,0 +1,89 @@
+"""
+Benchmark de memoria y tiempo de la exportación por lotes (shared/export.py)
+
+Uso:
+    python benchmarks/bench_export.py                       # 10k y 50k trabajos
+    python benchmarks/bench_export.py --sizes 10000 50000 --max-growth 1.5
+
+Exporta works_index en cada formato desde un SQLite temporal y mide el pico de memoria
+de Python (tracemalloc) durante la exportación; los tiempos incluyen el costo de tracemalloc.
+Con --max-growth el proceso termina con código 1 si el pico del tamaño mayor supera ese
+múltiplo del pico del tamaño menor (ambos tamaños deben ser mayores que EXPORT_CONFIG["batch_rows"]).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backends import WORKS_TABLE
+from export import EXPORT_FORMATS, export_table
+from fake_bigquery import make_catalog
+from instrumentation import logger
+from sqlite_backend import SQLiteBackend
+
+# Los logs JSON por llamada no aportan al informe
+logger.setLevel("WARNING")
+
+DEFAULT_SIZES = [10000, 50000]
+
+
+def seed_backend(path: str, n_works: int) -> SQLiteBackend:
+    """SQLite con un catálogo sintético de n_works trabajos"""
+    backend = SQLiteBackend(path)
+    works = make_catalog(n_works)[WORKS_TABLE.name]
+    works = works.astype(object).where(works.notna(), None)
+    backend.create_bulk(WORKS_TABLE, works.to_dict("records"))
+    return backend
+
+
+def measure(backend: SQLiteBackend, fmt: str, compress: bool) -> dict:
+    """Exportar una vez y devolver tiempo, pico de memoria y tamaño del archivo"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    with export_table(backend, WORKS_TABLE, {}, fmt, compress) as exported:
+        wall_ms = (time.perf_counter() - started) * 1000
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        file_bytes = exported.seek(0, os.SEEK_END)
+    return {"wall_ms": wall_ms, "peak_mb": peak_bytes / 1e6, "file_mb": file_bytes / 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--max-growth", type=float, default=None,
+                        help="múltiplo máximo del pico de memoria entre el tamaño menor y el mayor")
+    args = parser.parse_args()
+
+    peaks = {}
+    print(f"{'trabajos':>9} {'formato':>10} {'ms':>9} {'pico MB':>8} {'archivo MB':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n_works in args.sizes:
+            backend = seed_backend(os.path.join(directory, f"bench_{n_works}.db"), n_works)
+            for fmt in EXPORT_FORMATS:
+                for compress in ((True, False) if fmt != "parquet" else (False,)):
+                    label = f"{fmt}.gz" if compress else fmt
+                    result = measure(backend, fmt, compress)
+                    peaks[(n_works, label)] = result["peak_mb"]
+                    print(f"{n_works:>9} {label:>10} {result['wall_ms']:>9.1f} {result['peak_mb']:>8.1f} "
+                          f"{result['file_mb']:>11.1f}")
+            backend.connection.close()
+
+    if args.max_growth is not None and len(args.sizes) > 1:
+        smallest, largest = min(args.sizes), max(args.sizes)
+        failed = [label for (n_works, label), peak in peaks.items()
+                  if n_works == largest and peak > args.max_growth * max(peaks[(smallest, label)], 1.0)]
+        if failed:
+            print(f"La memoria crece con el tamaño de la tabla en: {', '.join(failed)}")
+            sys.exit(1)
+        print("Memoria acotada en todos los formatos.")
+
+
+if __name__ == "__main__":
+    main()
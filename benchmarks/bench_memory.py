@@ -0,0 +1,100 @@
+"""
+Informe de memoria de los snapshots en memoria: tipos tal como llegan del backend frente a los compactos
+
+Uso:
+    python benchmarks/bench_memory.py                       # 10k y 50k trabajos
+    python benchmarks/bench_memory.py --sizes 50000 --min-saving 0.5
+
+Carga works_index desde el doble de BigQuery de dos formas: la anterior (SELECT * sin
+convertir tipos) y la actual (sin columnas de detalle y con compact_dataframe), y muestra
+los bytes por columna. También mide lo que asigna cada llamada a get_all_works(), que
+antes copiaba el snapshot completo en cada sesión. Con --min-saving el proceso termina con
+código 1 si el ahorro total es menor que esa fracción.
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("BIGQUERY_FETCH_ENGINE", "rest")
+os.environ["STORAGE_BACKEND"] = "bigquery"
+os.environ.setdefault("COST_GUARD_ENABLED", "false")
+
+import backends
+import database
+from backends import WORKS_TABLE
+from config import BIGQUERY_PROJECT
+from connection import register_client
+from database import WorksDatabase, compact_dataframe
+from fake_bigquery import RecordingBigQueryClient, make_catalog
+from instrumentation import logger
+
+# Los logs JSON por llamada no aportan al informe
+logger.setLevel("WARNING")
+
+DEFAULT_SIZES = [10000, 50000]
+
+
+def column_bytes(df) -> dict:
+    """Bytes por columna, incluido el contenido del texto"""
+    return df.memory_usage(deep=True, index=False).to_dict()
+
+
+def allocated_bytes(call) -> int:
+    """Bytes asignados (pico) por una llamada"""
+    tracemalloc.start()
+    result = call()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak_bytes
+
+
+def report_size(n_works: int) -> float:
+    """Imprimir el informe de un catálogo de n_works trabajos; devuelve la fracción ahorrada"""
+    client = RecordingBigQueryClient(BIGQUERY_PROJECT, make_catalog(n_works))
+    register_client(BIGQUERY_PROJECT, client)
+    backends.set_backend(None)
+    database.snapshot_cache.clear()
+    backend = backends.get_backend()
+
+    raw_df = backend.get_all(WORKS_TABLE)
+    compact_df = compact_dataframe(backend.get_all(WORKS_TABLE, WORKS_TABLE.snapshot_columns), WORKS_TABLE)
+    before, after = column_bytes(raw_df), column_bytes(compact_df)
+
+    print(f"\n== {n_works} trabajos ==")
+    print(f"{'columna':<20} {'tipo anterior':<22} {'tipo compacto':<28} {'antes MB':>9} {'después MB':>11}")
+    for column in raw_df.columns:
+        new_type = str(compact_df[column].dtype) if column in compact_df else "(al abrir el registro)"
+        print(f"{column:<20} {str(raw_df[column].dtype):<22} {new_type:<28} "
+              f"{before[column] / 1e6:>9.2f} {after.get(column, 0) / 1e6:>11.2f}")
+    total_before, total_after = sum(before.values()), sum(after.values())
+    saving = 1 - total_after / total_before
+    print(f"{'total':<72} {total_before / 1e6:>9.2f} {total_after / 1e6:>11.2f}  (-{saving:.0%})")
+
+    db = WorksDatabase()
+    db.get_all_works()  # carga el snapshot
+    print(f"get_all_works() por sesión: antes copiaba {total_before / 1e6:.2f} MB; "
+          f"ahora asigna {allocated_bytes(db.get_all_works) / 1e6:.2f} MB")
+    return saving
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--min-saving", type=float, default=None,
+                        help="fracción mínima de memoria ahorrada en cada tamaño")
+    args = parser.parse_args()
+
+    savings = [report_size(n_works) for n_works in args.sizes]
+    if args.min_saving is not None and min(savings) < args.min_saving:
+        print(f"Ahorro insuficiente: {min(savings):.0%} < {args.min_saving:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
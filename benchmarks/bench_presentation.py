@@ -0,0 +1,78 @@
+"""
+Benchmark de la preparación de tablas para mostrar (shared/presentation.py)
+
+Uso:
+    python benchmarks/bench_presentation.py                 # 50k trabajos
+    python benchmarks/bench_presentation.py --sizes 1000 50000 --max-ms 200
+
+Compara works_display/option_map con el recorrido fila a fila que reemplazan.
+Con --max-ms el proceso termina con código 1 si la versión por columnas supera ese tiempo.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backends import CATEGORIES_TABLE, WORKS_TABLE
+from fake_bigquery import make_catalog
+from presentation import option_map, works_display
+from utils import format_date, get_status_badge
+
+DISPLAY_COLUMNS = ['work_name', 'category', 'status', 'version', 'created_date']
+
+
+def row_by_row(works_df, categories_df):
+    """Versión anterior: apply por fila e iterrows para el mapa de opciones"""
+    options = {row['category_name']: row['category_id'] for _, row in categories_df.iterrows()}
+    names = {category_id: name for name, category_id in options.items()}
+    display_df = works_df.copy()
+    display_df['category'] = display_df['category'].apply(lambda c: names.get(c, c))
+    display_df['status'] = display_df['status'].apply(lambda s: f"{get_status_badge(s)} {s}")
+    display_df['created_date'] = display_df['created_date'].apply(lambda d: format_date(d.isoformat()))
+    return display_df
+
+
+def columnar(works_df, categories_df):
+    """Versión por columnas de shared/presentation.py"""
+    option_map(categories_df, 'category_name', 'category_id')
+    return works_display(works_df, categories_df)
+
+
+def measure(function, *args) -> float:
+    """Mejor tiempo de 3 ejecuciones, en ms"""
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        function(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50000], help="tamaños del catálogo de trabajos")
+    parser.add_argument("--max-ms", type=float, help="fallar si la versión por columnas tarda más")
+    args = parser.parse_args()
+
+    print(f"{'trabajos':>9} {'fila a fila ms':>14} {'por columnas ms':>15}")
+    slowest = 0.0
+    for n_works in args.sizes:
+        catalog = make_catalog(n_works)
+        works_df = catalog[WORKS_TABLE.name][DISPLAY_COLUMNS]
+        categories_df = catalog[CATEGORIES_TABLE.name]
+        row_ms = measure(row_by_row, works_df, categories_df)
+        columnar_ms = measure(columnar, works_df, categories_df)
+        slowest = max(slowest, columnar_ms)
+        print(f"{n_works:>9} {row_ms:>14.1f} {columnar_ms:>15.1f}")
+
+    if args.max_ms is not None and slowest > args.max_ms:
+        print(f"\nLa versión por columnas superó {args.max_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Benchmark de consultas, latencia simulada y memoria por rerun de admin_main.py
+
+Uso:
+    python benchmarks/bench_reruns.py                       # tamaños 10, 1k y 100k
+    python benchmarks/bench_reruns.py --sizes 10 1000 --check
+
+Con --check el proceso termina con código 1 si algún flujo supera el número de
+consultas por rerun registrado en benchmarks/query_budget.json, o si alguna sección
+lee datos que no declara en admin_main.SECTIONS.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# El doble no implementa la Storage Read API: todas las lecturas van por REST
+os.environ.setdefault("BIGQUERY_FETCH_ENGINE", "rest")
+os.environ["STORAGE_BACKEND"] = "bigquery"
+
+from streamlit.testing.v1 import AppTest
+
+import admin_main
+import backends
+import database
+from config import BIGQUERY_PROJECT
+from connection import register_client
+from cost_guard import cost_guard
+from backends import CATEGORIES_TABLE, WORKS_LATEST_VIEW, WORKS_TABLE
+from fake_bigquery import RecordingBigQueryClient, make_catalog
+from instrumentation import logger
+
+# Los logs JSON por llamada no aportan al informe
+logger.setLevel("WARNING")
+
+APP_PATH = os.path.join(ROOT, "admin_main.py")
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_budget.json")
+DEFAULT_SIZES = [10, 1000, 100000]
+TABLE_NAMESPACES = {CATEGORIES_TABLE.name: "categories", WORKS_TABLE.name: "works", WORKS_LATEST_VIEW.name: "works"}
+
+
+def navigate(at: AppTest, section_id: str):
+    """Ir a una sección con el selector de la barra lateral y el de vista"""
+    group = admin_main.SECTIONS[section_id]["group"]
+    group_sections = [sid for sid, section in admin_main.SECTIONS.items() if section["group"] == group]
+    at.radio(key="nav_group").set_value(group).run()
+    at.radio(key=f"nav_section_{group_sections[0]}").set_value(section_id).run()
+
+
+def open_app(at: AppTest):
+    """Primera carga de la página con la caché vacía"""
+    at.run()
+
+
+def rerun_app(at: AppTest):
+    """Rerun sin cambios (cualquier interacción con un widget)"""
+    at.run()
+
+
+def refresh_expired(at: AppTest):
+    """Rerun con la caché expirada (TTL vencido) y sin cambios en las tablas"""
+    for namespace in TABLE_NAMESPACES.values():
+        database.snapshot_cache.invalidate(namespace)
+    at.run()
+
+
+def open_edit_category(at: AppTest):
+    """Navegar a Editar Categoría"""
+    navigate(at, "categories_edit")
+
+
+def select_edit_category(at: AppTest):
+    """Cambiar la categoría seleccionada en Editar Categoría"""
+    selectbox = next(s for s in at.selectbox if s.label == "Seleccionar categoría a editar:")
+    selectbox.set_value(selectbox.options[-1]).run()
+
+
+def open_add_work(at: AppTest):
+    """Navegar a Agregar Trabajo"""
+    navigate(at, "works_add")
+
+
+def submit_add_work(at: AppTest):
+    """Completar y enviar el formulario Agregar Trabajo"""
+    inputs = {t.label: t for t in at.text_input}
+    inputs["Nombre del trabajo *"].input("Trabajo de benchmark")
+    inputs["URL del Trabajo *"].input("https://benchmark.run.app")
+    next(b for b in at.button if b.label == "Agregar Trabajo").click().run()
+
+
+def search_works(at: AppTest):
+    """Navegar a la lista de trabajos y buscar (carga el catálogo completo una vez)"""
+    navigate(at, "works_list")
+    at.text_input(key="works_search").input("trabajo").run()
+
+
+def refine_search(at: AppTest):
+    """Cambiar la búsqueda: responde el índice en memoria, sin consultas"""
+    at.text_input(key="works_search").input("trabajo 1").run()
+
+
+FLOWS = [
+    ("open_app", open_app),
+    ("rerun_app", rerun_app),
+    ("open_edit_category", open_edit_category),
+    ("select_edit_category", select_edit_category),
+    ("open_add_work", open_add_work),
+    ("submit_add_work", submit_add_work),
+    ("refresh_expired", refresh_expired),
+    ("search_works", search_works),
+    ("refine_search", refine_search)
+]
+
+
+def run_size(n_works: int) -> list:
+    """Ejecutar todos los flujos contra un catálogo de n_works trabajos"""
+    client = RecordingBigQueryClient(BIGQUERY_PROJECT, make_catalog(n_works))
+    register_client(BIGQUERY_PROJECT, client)
+    backends.set_backend(None)
+    database.snapshot_cache.clear()
+    cost_guard.clear()
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    results = []
+    for flow_name, flow in FLOWS:
+        client.reset_calls()
+        tracemalloc.start()
+        started = time.perf_counter()
+        flow(at)
+        wall_ms = (time.perf_counter() - started) * 1000
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        if at.exception:
+            raise RuntimeError(f"{flow_name} ({n_works} trabajos): {at.exception[0].value}")
+
+        queries = [c for c in client.calls if c["method"] == "query"]
+        results.append({
+            "n_works": n_works,
+            "flow": flow_name,
+            "queries": len(queries),
+            "api_calls": len(client.calls),
+            "bytes_processed": sum(c["bytes_processed"] for c in client.calls),
+            "simulated_ms": round(sum(c["simulated_ms"] for c in client.calls), 1),
+            "wall_ms": round(wall_ms, 1),
+            "peak_mb": round(peak_bytes / 1e6, 1)
+        })
+    return results
+
+
+def check_section_loads(n_works: int = 10) -> list:
+    """Visitar cada sección con la caché vacía y comparar las tablas leídas con las declaradas"""
+    client = RecordingBigQueryClient(BIGQUERY_PROJECT, make_catalog(n_works))
+    register_client(BIGQUERY_PROJECT, client)
+    backends.set_backend(None)
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    violations = []
+    for section_id, section in admin_main.SECTIONS.items():
+        navigate(at, section_id)
+        # Segundo rerun ya dentro de la sección, con la caché vacía
+        database.snapshot_cache.clear()
+        client.reset_calls()
+        at.run()
+        loaded = {TABLE_NAMESPACES[c["table"]] for c in client.calls if c["table"] in TABLE_NAMESPACES}
+        undeclared = loaded - set(section["loads"])
+        if undeclared:
+            violations.append(f"la sección {section_id} lee datos no declarados: {', '.join(sorted(undeclared))}")
+    return violations
+
+
+def print_report(results: list):
+    """Imprimir tabla de resultados"""
+    header = f"{'trabajos':>9} {'flujo':<22} {'consultas':>9} {'llamadas':>8} {'MB escaneados':>13} " \
+             f"{'ms simulados':>12} {'ms reales':>9} {'pico MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['n_works']:>9} {r['flow']:<22} {r['queries']:>9} {r['api_calls']:>8} "
+              f"{r['bytes_processed'] / 1e6:>13.1f} {r['simulated_ms']:>12.1f} {r['wall_ms']:>9.1f} {r['peak_mb']:>8.1f}")
+
+
+def check_budget(results: list) -> list:
+    """Comparar consultas por flujo con el presupuesto; devuelve las violaciones"""
+    with open(BUDGET_PATH) as f:
+        budget = json.load(f)
+    violations = []
+    for r in results:
+        limit = budget.get(r["flow"])
+        if limit is not None and r["queries"] > limit:
+            violations.append(f"{r['flow']} con {r['n_works']} trabajos: {r['queries']} consultas (máximo {limit})")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="tamaños del catálogo de trabajos")
+    parser.add_argument("--check", action="store_true", help="fallar si se supera query_budget.json")
+    parser.add_argument("--json", help="guardar los resultados en este archivo")
+    args = parser.parse_args()
+
+    results = []
+    for n_works in args.sizes:
+        results.extend(run_size(n_works))
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.check:
+        violations = check_budget(results) + check_section_loads()
+        if violations:
+            print("\nPresupuesto de consultas superado:")
+            for violation in violations:
+                print(f"  - {violation}")
+            sys.exit(1)
+        print("\nPresupuesto de consultas respetado.")
+
+
+if __name__ == "__main__":
+    main()
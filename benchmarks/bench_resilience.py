@@ -0,0 +1,175 @@
+"""
+Escenarios de fallo contra el doble de BigQuery: reintentos, lecturas duplicadas, plazos, escrituras idempotentes
+y consultas autorizadas sobre presupuesto
+
+Uso:
+    python benchmarks/bench_resilience.py
+    python benchmarks/bench_resilience.py --check
+
+Cada escenario inyecta fallos en los próximos jobs del doble (RecordingBigQueryClient.inject_faults):
+errores transitorios, jobs lentos (duermen de verdad hasta terminar o ser cancelados) y respuestas
+perdidas de jobs que sí se ejecutaron. Muestra lo esperado y lo observado a partir del resumen
+kind="resilience" de shared/resilience.py. Con --check el proceso termina con código 1 si algún
+escenario no se cumple.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("BIGQUERY_FETCH_ENGINE", "rest")
+os.environ["STORAGE_BACKEND"] = "bigquery"
+os.environ["BIGQUERY_BULK_MODE"] = "load"
+os.environ.setdefault("COST_GUARD_ENABLED", "false")
+os.environ.setdefault("HEDGE_AFTER_SECONDS", "0.2")
+
+import backends
+from backends import WORKS_TABLE
+from config import BIGQUERY_PROJECT, COST_GUARD_CONFIG, RESILIENCE_CONFIG
+from connection import register_client
+from cost_guard import QueryBudgetExceeded, SessionBudget, set_session_budget
+from fake_bigquery import RecordingBigQueryClient, make_catalog
+from instrumentation import get_rerun_calls, logger, start_rerun
+from resilience import DeadlineExceeded
+
+# Los logs JSON por llamada no aportan al informe
+logger.setLevel("CRITICAL")
+
+N_WORKS = 1000
+SLOW_SECONDS = 2.0
+
+
+def resilience_summary() -> dict:
+    """Resumen kind="resilience" de la última operación ({} si no hubo reintentos ni duplicados)"""
+    summaries = [c for c in get_rerun_calls() if c.get("kind") == "resilience"]
+    return summaries[-1] if summaries else {}
+
+
+def cancelled_jobs(client: RecordingBigQueryClient) -> int:
+    return sum(job.cancelled for job in list(client.jobs.values()))
+
+
+def run_scenario(client: RecordingBigQueryClient, faults, call, slow_seconds: float = SLOW_SECONDS) -> dict:
+    """Inyectar los fallos, ejecutar call y devolver lo observado"""
+    client.faults.clear()
+    client.inject_faults(*faults, slow_seconds=slow_seconds)
+    cancelled_before = cancelled_jobs(client)
+    loads_before = sum(c["method"] == "load_table_from_json" for c in client.calls)
+    start_rerun()
+    started = time.monotonic()
+    error = None
+    result = None
+    try:
+        result = call()
+    except Exception as e:
+        error = e
+    # Los jobs abandonados se cancelan en segundo plano: margen para que sus hilos terminen
+    time.sleep(0.05)
+    return {
+        "result": result,
+        "error": error,
+        "wall_s": time.monotonic() - started,
+        "summary": resilience_summary(),
+        "cancelled": cancelled_jobs(client) - cancelled_before,
+        "loads": sum(c["method"] == "load_table_from_json" for c in client.calls) - loads_before
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="terminar con código 1 si algún escenario falla")
+    args = parser.parse_args()
+
+    client = RecordingBigQueryClient(BIGQUERY_PROJECT, make_catalog(N_WORKS))
+    register_client(BIGQUERY_PROJECT, client)
+    backends.set_backend(None)
+    backend = backends.get_backend()
+    works_df = client.tables[WORKS_TABLE.name]
+    work_id = works_df["work_id"].iloc[0]
+    results = []
+
+    # 1. Error transitorio: un reintento con backoff y la lectura termina bien
+    observed = run_scenario(client, ["fail"], lambda: backend.get_by_id(WORKS_TABLE, work_id))
+    results.append(("reintento (get_by_id, 503)", "1 reintento, resultado correcto",
+                    observed["summary"].get("retries") == 1 and observed["result"].get("work_id") == work_id,
+                    observed))
+
+    # 2. Job lento: el duplicado gana y el job original se cancela
+    observed = run_scenario(client, ["slow"], lambda: backend.get_by_id(WORKS_TABLE, work_id))
+    results.append(("hedge (get_by_id lento)", f"gana el duplicado en < {SLOW_SECONDS:.0f} s, 1 job cancelado",
+                    observed["summary"].get("hedge_won") is True and observed["wall_s"] < SLOW_SECONDS
+                    and observed["cancelled"] == 1, observed))
+
+    # 3. Lectura completa lenta: no se duplica (escanearía la tabla dos veces)
+    observed = run_scenario(client, ["slow"], lambda: backend.get_all(WORKS_TABLE), slow_seconds=0.5)
+    results.append(("sin hedge (get_all lento)", "1 solo intento, resultado completo",
+                    observed["summary"] == {} and observed["error"] is None
+                    and len(observed["result"]) == N_WORKS, observed))
+
+    # 4. Todos los intentos lentos: DeadlineExceeded al vencer el plazo y los jobs en curso se cancelan
+    deadline = 0.6
+    previous_deadline = RESILIENCE_CONFIG["deadline_seconds"]["get_by_id"]
+    RESILIENCE_CONFIG["deadline_seconds"]["get_by_id"] = deadline
+    try:
+        observed = run_scenario(client, ["slow", "slow"], lambda: backend.get_by_id(WORKS_TABLE, work_id))
+    finally:
+        RESILIENCE_CONFIG["deadline_seconds"]["get_by_id"] = previous_deadline
+    results.append(("plazo (get_by_id, todo lento)", f"DeadlineExceeded en ~{deadline} s, 2 jobs cancelados",
+                    isinstance(observed["error"], DeadlineExceeded) and observed["wall_s"] < deadline + 0.5
+                    and observed["cancelled"] == 2, observed))
+
+    # 5. Exportación: el job de la consulta por lotes se reintenta
+    observed = run_scenario(client, ["fail"], lambda: sum(
+        len(batch) for batch in backend.iter_batches(WORKS_TABLE, ["work_id", "work_name"], {}, 250)
+    ))
+    results.append(("reintento (iter_batches, 503)", f"1 reintento, {N_WORKS} filas",
+                    observed["summary"].get("retries") == 1 and observed["result"] == N_WORKS, observed))
+
+    # 6. Carga cuya respuesta se pierde: el reintento encuentra el job por su ID y no vuelve a cargar
+    row = works_df.iloc[0].to_dict()
+    new_rows = [{**row, "work_id": f"nuevo-{i}", "created_date": row["created_date"].isoformat(),
+                 "updated_date": row["updated_date"].isoformat()} for i in range(3)]
+    observed = run_scenario(client, ["lost"], lambda: backend.create_bulk(WORKS_TABLE, new_rows))
+    written = client.tables[WORKS_TABLE.name]["work_id"].str.startswith("nuevo-").sum()
+    results.append(("escritura idempotente (load perdido)", "1 job de carga, 3 filas escritas una vez",
+                    observed["result"] == 3 and observed["loads"] == 1 and written == 3, observed))
+
+    # 7. Consulta sobre presupuesto autorizada una vez: el reintento no vuelve a pedir autorización
+    COST_GUARD_CONFIG["enabled"] = True
+    session = SessionBudget(limit_bytes=1)
+    set_session_budget(session)
+    try:
+        try:
+            backend.get_all(WORKS_TABLE)
+        except QueryBudgetExceeded as e:
+            session.allow_once(e.fingerprint)
+        observed = run_scenario(client, ["fail"], lambda: backend.get_all(WORKS_TABLE))
+    finally:
+        set_session_budget(None)
+        COST_GUARD_CONFIG["enabled"] = False
+    results.append(("autorización (get_all, 503)", "1 reintento sin nuevo bloqueo, tabla completa",
+                    observed["summary"].get("retries") == 1 and observed["error"] is None
+                    and len(observed["result"]) == len(client.tables[WORKS_TABLE.name]), observed))
+
+    print(f"{'escenario':<38} {'esperado':<48} {'observado':<50} ok")
+    for name, expected, ok, observed in results:
+        summary = observed["summary"]
+        seen = (f"{type(observed['error']).__name__} " if observed["error"] else "") + (
+            f"intentos={summary.get('attempts', 1)} reintentos={summary.get('retries', 0)} "
+            f"hedges={summary.get('hedges', 0)} cancelados={observed['cancelled']} {observed['wall_s']:.2f} s"
+        )
+        print(f"{name:<38} {expected:<48} {seen:<50} {'sí' if ok else 'NO'}")
+
+    if args.check:
+        if not all(ok for _, _, ok, _ in results):
+            print("Algún escenario de resiliencia no se cumple.")
+            sys.exit(1)
+        print("Escenarios de resiliencia correctos.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Prueba de carga: N sesiones concurrentes de admin_main.py en un mismo proceso
+
+Uso:
+    python benchmarks/bench_sessions.py                           # 1, 5, 10 y 20 sesiones, 30 s cada nivel
+    python benchmarks/bench_sessions.py --sessions 10 --duration 60 --latency-scale 2
+    python benchmarks/bench_sessions.py --sessions 5 10 --max-p95-ms 3000
+
+Streamlit ejecuta el script de cada sesión en un hilo del mismo proceso. Aquí cada
+sesión es un hilo con un AppTest que repite un guion de clics (recorrer listados,
+editar categorías o crear trabajos) con una pausa entre clics. El almacenamiento es
+un SQLite temporal envuelto en LatencyBackend (benchmarks/fake_backend.py), que duerme
+en cada llamada como lo haría un job de BigQuery; la caché, la cola de escritura y la
+presentación son las reales. Por cada nivel informa la latencia de los reruns
+(p50/p95/p99), el throughput, las llamadas al backend y la memoria (RSS) por sesión.
+La RSS casi nunca baja entre niveles: para medir la memoria por sesión con precisión,
+ejecute un nivel por proceso.
+Con --max-p95-ms el proceso termina con código 1 si algún nivel la supera.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["STORAGE_BACKEND"] = "sqlite"
+
+import numpy as np
+from streamlit import config as streamlit_config
+from streamlit.runtime.runtime import Runtime
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest, app_test, local_script_runner
+
+import admin_main
+import backends
+import database
+from fake_backend import LatencyBackend, seed_sqlite
+from instrumentation import logger
+
+# Los logs JSON por llamada no aportan al informe
+logger.setLevel("WARNING")
+
+APP_PATH = os.path.join(ROOT, "admin_main.py")
+DEFAULT_SESSIONS = [1, 5, 10, 20]
+
+
+def share_streamlit_runtime():
+    """Permitir varios AppTest a la vez en el proceso, como el servidor de Streamlit.
+
+    AppTest crea un Runtime y una ScriptCache por rerun y los descarta al terminar:
+    con sesiones concurrentes, un rerun que termina deja sin Runtime a los que siguen
+    en curso, y compilar el script en paralelo falla en CPython 3.11. El servidor real
+    tiene un solo Runtime y una sola ScriptCache por proceso; aquí se hace lo mismo.
+    """
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    streamlit_config.set_option("global.appTest", True)
+
+    last_runtime = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last_runtime[:] = [cls._instance]
+        if not last_runtime:
+            raise RuntimeError("Runtime hasn't been created!")
+        return last_runtime[0]
+
+    Runtime.instance = classmethod(instance)
+
+
+class TimedAppTest(AppTest):
+    """AppTest que registra la duración de cada rerun"""
+
+    def __init__(self, script_path: str, default_timeout: float):
+        super().__init__(script_path, default_timeout=default_timeout)
+        self.rerun_ms: List[float] = []
+
+    def _run(self, widget_state=None, timeout=None) -> AppTest:
+        started = time.perf_counter()
+        try:
+            return super()._run(widget_state, timeout)
+        finally:
+            self.rerun_ms.append((time.perf_counter() - started) * 1000)
+
+
+def navigate(at: AppTest, section_id: str):
+    """Ir a una sección con el selector de la barra lateral y el de vista (sin reruns si ya está ahí)"""
+    group = admin_main.SECTIONS[section_id]["group"]
+    group_sections = [sid for sid, section in admin_main.SECTIONS.items() if section["group"] == group]
+    if at.radio(key="nav_group").value != group:
+        at.radio(key="nav_group").set_value(group).run()
+    section_radio = at.radio(key=f"nav_section_{group_sections[0]}")
+    if section_radio.value != section_id:
+        section_radio.set_value(section_id).run()
+
+
+def open_works_list(at: AppTest, rng: random.Random):
+    """Abrir la lista de trabajos"""
+    navigate(at, "works_list")
+
+
+def search_works(at: AppTest, rng: random.Random):
+    """Buscar por nombre en la lista de trabajos"""
+    at.text_input(key="works_search").input(f"trabajo {rng.randint(1, 99)}").run()
+
+
+def clear_search(at: AppTest, rng: random.Random):
+    """Vaciar la búsqueda: vuelve el listado paginado"""
+    at.text_input(key="works_search").input("").run()
+
+
+def next_page(at: AppTest, rng: random.Random):
+    """Pasar a la página siguiente del listado si la hay"""
+    button = at.button(key="works_page_next")
+    if not button.disabled:
+        button.click().run()
+
+
+def toggle_gallery(at: AppTest, rng: random.Random):
+    """Alternar entre tabla y galería"""
+    view = at.radio(key="works_view")
+    view.set_value("Galería" if view.value == "Tabla" else "Tabla").run()
+
+
+def open_categories_list(at: AppTest, rng: random.Random):
+    """Abrir la lista de categorías"""
+    navigate(at, "categories_list")
+
+
+def open_edit_category(at: AppTest, rng: random.Random):
+    """Abrir Editar Categoría"""
+    navigate(at, "categories_edit")
+
+
+def select_category(at: AppTest, rng: random.Random):
+    """Elegir una categoría al azar en Editar Categoría"""
+    selectbox = next(s for s in at.selectbox if s.label == "Seleccionar categoría a editar:")
+    selectbox.set_value(rng.choice(selectbox.options)).run()
+
+
+def submit_category_edit(at: AppTest, rng: random.Random):
+    """Cambiar la descripción de la categoría y guardar"""
+    description = next(t for t in at.text_area if t.label == "Descripción científica de la categoría *")
+    description.input(f"Descripción científica revisada {rng.randint(1, 10 ** 6)}")
+    next(b for b in at.button if b.label == "💾 Actualizar Categoría").click().run()
+
+
+def open_add_work(at: AppTest, rng: random.Random):
+    """Abrir Agregar Trabajo"""
+    navigate(at, "works_add")
+
+
+def submit_add_work(at: AppTest, rng: random.Random):
+    """Completar y enviar el formulario Agregar Trabajo"""
+    inputs = {t.label: t for t in at.text_input}
+    inputs["Nombre del trabajo *"].input(f"Trabajo de carga {rng.randint(1, 10 ** 6)}")
+    inputs["URL del Trabajo *"].input("https://carga.run.app")
+    next(b for b in at.button if b.label == "Agregar Trabajo").click().run()
+
+
+# Guiones de clics; la sesión i repite el guion i % len(SCRIPTS) hasta que termina el nivel
+SCRIPTS = {
+    "browse": [open_works_list, search_works, clear_search, next_page, toggle_gallery, toggle_gallery,
+               open_categories_list],
+    "edit_category": [open_edit_category, select_category, submit_category_edit],
+    "create_work": [open_add_work, submit_add_work, open_works_list]
+}
+
+
+def rss_bytes() -> int:
+    """Memoria residente actual del proceso (pico del proceso si no hay /proc)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_session(index: int, script_names: List[str], deadline: float, think_ms: float, seed: int) -> Dict:
+    """Repetir el guion de la sesión hasta deadline; devuelve duraciones de reruns y errores"""
+    script_name = script_names[index % len(script_names)]
+    rng = random.Random(seed + index)
+    at = TimedAppTest(APP_PATH, default_timeout=120)
+    rerun_ms: List[float] = []
+    errors: List[str] = []
+    at.run()
+    while time.monotonic() < deadline:
+        for step in SCRIPTS[script_name]:
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(think_ms * rng.uniform(0.5, 1.5) / 1000)
+            try:
+                step(at, rng)
+                if at.exception:
+                    raise RuntimeError(at.exception[0].value)
+            except Exception as e:
+                # La sesión se abandona y se abre otra, como un usuario que recarga la página
+                errors.append(f"{script_name}.{step.__name__}: {e}")
+                rerun_ms.extend(at.rerun_ms)
+                at = TimedAppTest(APP_PATH, default_timeout=120)
+                at.run()
+                break
+    rerun_ms.extend(at.rerun_ms)
+    return {"script": script_name, "rerun_ms": rerun_ms, "errors": errors}
+
+
+def run_level(n_sessions: int, backend: LatencyBackend, script_names: List[str], duration: float,
+              think_ms: float, seed: int) -> Dict:
+    """Ejecutar n_sessions sesiones concurrentes durante duration segundos"""
+    backend.reset_calls()
+    baseline_rss = rss_bytes()
+    peak_rss = [baseline_rss]
+    stop = threading.Event()
+
+    def sample_memory():
+        while not stop.wait(0.1):
+            peak_rss[0] = max(peak_rss[0], rss_bytes())
+
+    sampler = threading.Thread(target=sample_memory, daemon=True)
+    sampler.start()
+    results: List[Dict] = [{}] * n_sessions
+
+    def session(index: int):
+        results[index] = run_session(index, script_names, deadline, think_ms, seed)
+
+    started = time.monotonic()
+    deadline = started + duration
+    threads = [threading.Thread(target=session, args=(i,), name=f"session-{i}") for i in range(n_sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    stop.set()
+    sampler.join()
+
+    rerun_ms = np.array([ms for r in results for ms in r.get("rerun_ms", [])])
+    p50, p95, p99 = np.percentile(rerun_ms, [50, 95, 99]) if len(rerun_ms) else (0.0, 0.0, 0.0)
+    return {
+        "sessions": n_sessions,
+        "reruns": len(rerun_ms),
+        "reruns_per_s": round(len(rerun_ms) / elapsed, 2),
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "backend_calls": sum(backend.calls.values()),
+        "errors": [e for r in results for e in r.get("errors", [])],
+        "peak_rss_mb": round(peak_rss[0] / 1e6, 1),
+        "mb_per_session": round((peak_rss[0] - baseline_rss) / 1e6 / n_sessions, 2)
+    }
+
+
+def print_report(levels: List[Dict]):
+    """Imprimir tabla de resultados"""
+    header = f"{'sesiones':>8} {'reruns':>7} {'rerun/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} " \
+             f"{'backend':>8} {'errores':>7} {'RSS MB':>7} {'MB/sesión':>9}"
+    print(header)
+    print("-" * len(header))
+    for level in levels:
+        print(f"{level['sessions']:>8} {level['reruns']:>7} {level['reruns_per_s']:>8.2f} {level['p50_ms']:>8.0f} "
+              f"{level['p95_ms']:>8.0f} {level['p99_ms']:>8.0f} {level['backend_calls']:>8} "
+              f"{len(level['errors']):>7} {level['peak_rss_mb']:>7.0f} {level['mb_per_session']:>9.2f}")
+    for level in levels:
+        for error in level["errors"][:3]:
+            print(f"  {level['sessions']} sesiones: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=DEFAULT_SESSIONS,
+                        help="niveles de sesiones concurrentes")
+    parser.add_argument("--duration", type=float, default=30.0, help="segundos por nivel")
+    parser.add_argument("--think-ms", type=float, default=1000.0, help="pausa media entre clics de una sesión")
+    parser.add_argument("--works", type=int, default=1000, help="trabajos del catálogo")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="multiplicador de la latencia del backend (0 sin latencia)")
+    parser.add_argument("--jitter", type=float, default=0.35, help="sigma del ruido lognormal de la latencia")
+    parser.add_argument("--scripts", nargs="+", choices=list(SCRIPTS), default=list(SCRIPTS),
+                        help="guiones que se reparten entre las sesiones")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="p95 máximo de los reruns en cada nivel")
+    parser.add_argument("--json", help="guardar los resultados en este archivo")
+    args = parser.parse_args()
+
+    share_streamlit_runtime()
+    with tempfile.TemporaryDirectory() as directory:
+        inner = seed_sqlite(os.path.join(directory, "load_test.db"), args.works)
+        backend = LatencyBackend(inner, scale=args.latency_scale, jitter=args.jitter, seed=args.seed)
+        backends.set_backend(backend)
+        database.snapshot_cache.clear()
+        # Primera sesión sola: compila el script y carga los snapshots compartidos
+        TimedAppTest(APP_PATH, default_timeout=120).run()
+
+        levels = [run_level(n_sessions, backend, args.scripts, args.duration, args.think_ms, args.seed)
+                  for n_sessions in args.sessions]
+        database.write_queue.drain()
+        inner.connection.close()
+    print_report(levels)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(levels, f, indent=2)
+
+    if args.max_p95_ms is not None:
+        slow = [level["sessions"] for level in levels if level["p95_ms"] > args.max_p95_ms]
+        if slow:
+            print(f"\np95 por encima de {args.max_p95_ms:.0f} ms con {', '.join(map(str, slow))} sesiones")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
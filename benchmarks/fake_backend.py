@@ -0,0 +1,116 @@
+"""
+Backend de almacenamiento que agrega latencia simulada a otro backend (pruebas de carga)
+"""
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from backends import CATEGORIES_TABLE, WORKS_TABLE, StorageBackend, TableSpec
+from fake_bigquery import make_catalog
+from sqlite_backend import SQLiteBackend
+
+# Latencia mediana por método (ms), del orden de un job de BigQuery; las escrituras síncronas son DML
+LATENCY_PROFILE = {
+    "get_all": 600.0,
+    "get_keys": 350.0,
+    "get_by_id": 350.0,
+    "list_page": 450.0,
+    "get_max_updated": 300.0,
+    "get_changed": 400.0,
+    "create": 150.0,  # streaming insert
+    "create_bulk": 1500.0,  # load job
+    "update": 900.0,
+    "archive": 900.0
+}
+
+
+class LatencyBackend(StorageBackend):
+    """Delega en otro backend y duerme antes de cada llamada.
+
+    La latencia de cada llamada es la mediana de LATENCY_PROFILE por scale, con
+    ruido lognormal (jitter = sigma): la cola larga de la red y de BigQuery. El
+    sueño no retiene el GIL, igual que una espera de red real.
+    """
+
+    def __init__(self, inner: StorageBackend, scale: float = 1.0, jitter: float = 0.35, seed: int = 7,
+                 profile: Optional[Dict[str, float]] = None):
+        self.inner = inner
+        self.scale = scale
+        self.jitter = jitter
+        self.profile = profile or LATENCY_PROFILE
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.injected_ms = 0.0
+
+    def get_all(self, table: TableSpec, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        self._wait("get_all")
+        return self.inner.get_all(table, columns)
+
+    def get_keys(self, table: TableSpec) -> List[str]:
+        self._wait("get_keys")
+        return self.inner.get_keys(table)
+
+    def get_by_id(self, table: TableSpec, key: str, columns: Optional[List[str]] = None) -> Dict:
+        self._wait("get_by_id")
+        return self.inner.get_by_id(table, key, columns)
+
+    def list_page(self, table: TableSpec, columns: List[str], filters: Dict,
+                  page_size: int, cursor: Optional[Dict]) -> Tuple[pd.DataFrame, Optional[Dict]]:
+        self._wait("list_page")
+        return self.inner.list_page(table, columns, filters, page_size, cursor)
+
+    def create(self, table: TableSpec, rows: List[Dict]) -> bool:
+        self._wait("create")
+        return self.inner.create(table, rows)
+
+    def create_bulk(self, table: TableSpec, rows: List[Dict]) -> int:
+        self._wait("create_bulk")
+        return self.inner.create_bulk(table, rows)
+
+    def update(self, table: TableSpec, updates: List[Tuple[str, Dict]]):
+        self._wait("update")
+        return self.inner.update(table, updates)
+
+    def archive(self, table: TableSpec, keys: List[str],
+                children: Optional[Tuple[TableSpec, str]] = None):
+        self._wait("archive")
+        return self.inner.archive(table, keys, children)
+
+    def get_max_updated(self, table: TableSpec) -> Optional[pd.Timestamp]:
+        self._wait("get_max_updated")
+        return self.inner.get_max_updated(table)
+
+    def get_changed(self, table: TableSpec, since: pd.Timestamp,
+                    columns: Optional[List[str]] = None) -> pd.DataFrame:
+        self._wait("get_changed")
+        return self.inner.get_changed(table, since, columns)
+
+    def connection_stats(self) -> Dict[str, int]:
+        return self.inner.connection_stats()
+
+    def reset_calls(self):
+        """Vaciar los contadores de llamadas y de latencia inyectada"""
+        with self._lock:
+            self.calls = {}
+            self.injected_ms = 0.0
+
+    def _wait(self, method: str):
+        with self._lock:
+            delay_ms = self.profile[method] * self.scale * self._rng.lognormvariate(0.0, self.jitter)
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self.injected_ms += delay_ms
+        time.sleep(delay_ms / 1000)
+
+
+def seed_sqlite(path: str, n_works: int) -> SQLiteBackend:
+    """SQLite con el catálogo sintético de fake_bigquery (categorías y n_works trabajos)"""
+    backend = SQLiteBackend(path)
+    catalog = make_catalog(n_works)
+    for table in (CATEGORIES_TABLE, WORKS_TABLE):
+        df = catalog[table.name].astype(object).where(catalog[table.name].notna(), None)
+        backend.create_bulk(table, df.to_dict("records"))
+    return backend
@@ -0,0 +1,331 @@
+"""
+Doble de bigquery.Client que responde desde DataFrames en memoria y registra cada job
+"""
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from google.api_core import exceptions
+
+from backends import CATEGORIES_TABLE, WORKS_LATEST_VIEW, WORKS_TABLE
+
+# Vistas filtradas: se resuelven sobre el DataFrame de la tabla base
+VIEWS = {WORKS_LATEST_VIEW.name: WORKS_LATEST_VIEW}
+
+# Modelo de latencia simulada (no se duerme: se acumula en cada job)
+LATENCY_MODEL = {
+    "base_ms": 400.0,  # planificación + round trip de un job
+    "ms_per_mb_scanned": 2.0,
+    "ms_per_1k_rows_returned": 8.0,
+    "load_job_ms": 1500.0,
+    "dry_run_ms": 100.0,
+    "streaming_insert_ms": 150.0
+}
+
+
+class FakeJob:
+    """Job con los atributos que expone QueryJob; termina al instante salvo que se le inyecte un fallo"""
+
+    def __init__(self, result_df: pd.DataFrame, bytes_processed: int, simulated_ms: float,
+                 job_id: Optional[str] = None):
+        self.job_id = job_id or f"fake_{uuid.uuid4().hex[:12]}"
+        self.error_result = None
+        self.total_bytes_processed = bytes_processed
+        self.total_bytes_billed = bytes_processed
+        self.slot_millis = int(simulated_ms)
+        self.cache_hit = False
+        self.simulated_ms = simulated_ms
+        self._result_df = result_df
+        self.total_rows = len(result_df)
+        self.cancelled = False
+        self._page_size: Optional[int] = None
+        self._finishes_at = time.monotonic()
+        self._lose_response = False
+        self._cancel_event = threading.Event()
+
+    def inject(self, fault: Optional[str], slow_seconds: float):
+        """Aplicar un fallo de RecordingBigQueryClient.inject_faults ("slow" o "lost")"""
+        if fault == "slow":
+            self._finishes_at = time.monotonic() + slow_seconds
+        elif fault == "lost":
+            self._lose_response = True
+
+    def done(self) -> bool:
+        return self.cancelled or time.monotonic() >= self._finishes_at
+
+    def cancel(self) -> bool:
+        self.cancelled = True
+        self._cancel_event.set()
+        return True
+
+    def result(self, *args, page_size: Optional[int] = None, timeout: Optional[float] = None,
+               **kwargs) -> "FakeJob":
+        remaining = self._finishes_at - time.monotonic()
+        if remaining > 0:
+            # Espera real (sin GIL) que se corta al cancelar el job
+            self._cancel_event.wait(remaining if timeout is None else min(remaining, timeout))
+            if not self.cancelled and not self.done():
+                raise FutureTimeoutError()
+        if self.cancelled:
+            self.error_result = {"reason": "stopped", "message": "Job execution was cancelled"}
+            raise exceptions.BadRequest("Job execution was cancelled", errors=[self.error_result])
+        if self._lose_response:
+            # El job terminó bien pero la respuesta no llegó; consultarlo de nuevo funciona
+            self._lose_response = False
+            raise ConnectionError("Connection reset before the job response arrived")
+        self._page_size = page_size
+        return self
+
+    def to_dataframe(self, *args, **kwargs) -> pd.DataFrame:
+        return self._result_df.copy()
+
+    def to_dataframe_iterable(self, *args, **kwargs) -> Iterator[pd.DataFrame]:
+        page_size = self._page_size or max(len(self._result_df), 1)
+        for start in range(0, len(self._result_df), page_size):
+            yield self._result_df.iloc[start:start + page_size].reset_index(drop=True)
+
+
+class RecordingBigQueryClient:
+    """Responde las consultas de bigquery_backend sobre DataFrames y registra cada llamada"""
+
+    def __init__(self, project: str, tables: Dict[str, pd.DataFrame]):
+        self.project = project
+        self.tables = tables  # nombre de tabla -> DataFrame
+        self.calls: List[Dict] = []
+        self.jobs: Dict[str, FakeJob] = {}
+        self.faults: List[str] = []
+        self.slow_seconds = 2.0
+        self._lock = threading.Lock()
+
+    def inject_faults(self, *faults: str, slow_seconds: float = 2.0):
+        """Programar fallos para los próximos jobs, uno por job y en orden (pruebas de resiliencia).
+
+        "fail": error transitorio (503) sin ejecutar nada; "slow": el job tarda slow_seconds
+        de verdad (o hasta que se cancele); "lost": el job se ejecuta pero su primera respuesta
+        se pierde; "ok": sin fallo. Los dry runs no consumen fallos.
+        """
+        with self._lock:
+            self.faults.extend(faults)
+            self.slow_seconds = slow_seconds
+
+    def query(self, query: str, job_config=None, job_id: Optional[str] = None, **kwargs) -> FakeJob:
+        self._check_job_id(job_id)
+        fault = None if getattr(job_config, "dry_run", False) else self._next_fault()
+        params = {p.name: p for p in (job_config.query_parameters if job_config else [])}
+        table_name = self._table_name(query)
+        statement = query.strip().split(None, 1)[0].upper()
+
+        if statement == "SELECT":
+            result_df, bytes_processed = self._select(query, table_name, params)
+            if getattr(job_config, "dry_run", False):
+                # Dry run: solo la estimación, sin resultado ni facturación
+                self._record("dry_run", statement, table_name, 0, 0, LATENCY_MODEL["dry_run_ms"], query)
+                return FakeJob(pd.DataFrame(), bytes_processed, LATENCY_MODEL["dry_run_ms"])
+            maximum_bytes_billed = getattr(job_config, "maximum_bytes_billed", None)
+            if maximum_bytes_billed is not None and bytes_processed > maximum_bytes_billed:
+                self._record("query", statement, table_name, 0, 0, LATENCY_MODEL["base_ms"], query)
+                raise exceptions.BadRequest(
+                    f"Query exceeded limit for bytes billed: {maximum_bytes_billed}. "
+                    f"{bytes_processed} or higher required."
+                )
+        elif statement == "INSERT":
+            # INSERT ... FROM UNNEST(@rows): DML facturado por las filas insertadas
+            rows = [self._struct_to_row(struct) for struct in params["rows"].values]
+            self._append(table_name, rows)
+            result_df = pd.DataFrame()
+            bytes_processed = 0
+        else:
+            # MERGE / UPDATE / BEGIN: DML sin resultado; se factura el escaneo de la tabla
+            result_df = pd.DataFrame()
+            bytes_processed = self._table_bytes(table_name)
+
+        simulated_ms = (LATENCY_MODEL["base_ms"]
+                        + LATENCY_MODEL["ms_per_mb_scanned"] * bytes_processed / 1e6
+                        + LATENCY_MODEL["ms_per_1k_rows_returned"] * len(result_df) / 1000)
+        job = self._register(FakeJob(result_df, bytes_processed, simulated_ms, job_id), fault)
+        self._record("query", statement, table_name, bytes_processed, len(result_df), simulated_ms, query)
+        return job
+
+    def insert_rows_json(self, table_ref: str, rows: List[Dict], **kwargs) -> List:
+        self._append(table_ref, rows)
+        self._record("insert_rows_json", "INSERT", table_ref.split(".")[-1], 0, len(rows),
+                     LATENCY_MODEL["streaming_insert_ms"])
+        return []
+
+    def load_table_from_json(self, rows: List[Dict], table_ref: str, job_config=None,
+                             job_id: Optional[str] = None, **kwargs) -> FakeJob:
+        self._check_job_id(job_id)
+        fault = self._next_fault()
+        self._append(table_ref, rows)
+        self._record("load_table_from_json", "LOAD", table_ref.split(".")[-1], 0, len(rows),
+                     LATENCY_MODEL["load_job_ms"])
+        return self._register(FakeJob(pd.DataFrame(), 0, LATENCY_MODEL["load_job_ms"], job_id), fault)
+
+    def get_job(self, job_id: str, **kwargs) -> FakeJob:
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            raise exceptions.NotFound(f"Not found: Job {self.project}:{job_id}")
+        return job
+
+    def get_table(self, table_ref: str):
+        self._record("get_table", "GET", table_ref.split(".")[-1], 0, 0, LATENCY_MODEL["base_ms"] / 4)
+        return type("FakeTable", (), {"schema": []})()
+
+    def close(self):
+        pass
+
+    def reset_calls(self):
+        """Vaciar el registro de llamadas"""
+        with self._lock:
+            self.calls.clear()
+
+    def _select(self, query: str, table_name: str, params: Dict):
+        """Resolver los SELECT que genera bigquery_backend"""
+        view = VIEWS.get(table_name)
+        if view is not None:
+            table_df = self.tables.get(view.view_of.name, pd.DataFrame())
+            for column, value in view.view_filter.items():
+                table_df = table_df[table_df[column] == value]
+        else:
+            table_df = self.tables.get(table_name, pd.DataFrame())
+        spec = CATEGORIES_TABLE if table_name == CATEGORIES_TABLE.name else WORKS_TABLE
+        if "MAX(updated_date)" in query:
+            max_updated = table_df["updated_date"].max() if not table_df.empty else pd.NaT
+            return pd.DataFrame({"max_updated": [max_updated]}), self._table_bytes(table_name, ["updated_date"])
+        selected = self._selected_columns(query, table_df)
+        result_df = table_df
+
+        if spec.active_column and f"{spec.active_column} = true" in query:
+            result_df = result_df[result_df[spec.active_column]]
+        if "since" in params:
+            result_df = result_df[result_df["updated_date"] > params["since"].value]
+        if "key" in params:
+            result_df = result_df[result_df[spec.key_column] == params["key"].value]
+        for name, param in params.items():
+            if name in spec.columns and f"{name} = @{name}" in query:
+                result_df = result_df[result_df[name] == param.value]
+        if "page_limit" in params:
+            result_df = result_df.head(params["page_limit"].value)
+        elif "LIMIT 1" in query:
+            result_df = result_df.head(1)
+
+        # BigQuery factura las columnas leídas completas, no las filas devueltas; en una vista,
+        # el clustering de la base limita el escaneo a las filas que cumplen el filtro
+        bytes_processed = self._frame_bytes(table_df, selected)
+        return result_df[selected].reset_index(drop=True), bytes_processed
+
+    def _check_job_id(self, job_id: Optional[str]):
+        """Un ID de job repetido se rechaza sin ejecutar nada, como en BigQuery"""
+        with self._lock:
+            if job_id is not None and job_id in self.jobs:
+                raise exceptions.Conflict(f"Already Exists: Job {self.project}:{job_id}")
+
+    def _next_fault(self) -> Optional[str]:
+        """Consumir el próximo fallo inyectado; "fail" se lanza aquí, antes de ejecutar el job"""
+        with self._lock:
+            fault = self.faults.pop(0) if self.faults else None
+        if fault == "fail":
+            raise exceptions.ServiceUnavailable("Service temporarily unavailable")
+        return fault
+
+    def _register(self, job: FakeJob, fault: Optional[str] = None) -> FakeJob:
+        """Guardar el job para get_job, con el fallo inyectado que le toque"""
+        job.inject(fault, self.slow_seconds)
+        with self._lock:
+            self.jobs[job.job_id] = job
+        return job
+
+    def _struct_to_row(self, struct) -> Dict:
+        """Fila de un STRUCT parametrizado (los ARRAY anidados traen su lista en .values)"""
+        return {name: getattr(value, "values", value) for name, value in struct.struct_values.items()}
+
+    def _selected_columns(self, query: str, table_df: pd.DataFrame) -> List[str]:
+        select_list = re.search(r"SELECT\s+(.*?)\s+FROM", query, re.S | re.I).group(1).strip()
+        if select_list == "*":
+            return list(table_df.columns)
+        return [c.strip() for c in select_list.split(",")]
+
+    def _table_bytes(self, table_name: Optional[str], columns: Optional[List[str]] = None) -> int:
+        return self._frame_bytes(self.tables.get(table_name), columns)
+
+    def _frame_bytes(self, table_df: Optional[pd.DataFrame], columns: Optional[List[str]] = None) -> int:
+        if table_df is None or table_df.empty:
+            return 0
+        usage = table_df[columns or list(table_df.columns)].memory_usage(deep=True, index=False)
+        return int(usage.sum())
+
+    def _table_name(self, query: str) -> Optional[str]:
+        match = re.search(r"`[^`]*\.([^`.]+)`", query)
+        return match.group(1) if match else None
+
+    def _append(self, table_ref: str, rows: List[Dict]):
+        table_name = table_ref.split(".")[-1]
+        with self._lock:
+            new_rows = pd.DataFrame(rows)
+            for column in ("created_date", "updated_date"):
+                if column in new_rows:
+                    new_rows[column] = pd.to_datetime(new_rows[column], utc=True)
+            self.tables[table_name] = pd.concat([self.tables[table_name], new_rows], ignore_index=True)
+
+    def _record(self, method: str, statement: str, table_name: Optional[str], bytes_processed: int,
+                rows: int, simulated_ms: float, query: str = ""):
+        with self._lock:
+            self.calls.append({
+                "method": method,
+                "statement": statement,
+                "table": table_name,
+                "bytes_processed": bytes_processed,
+                "rows": rows,
+                "simulated_ms": simulated_ms,
+                "query": query
+            })
+
+
+def make_catalog(n_works: int, n_categories: int = 20, seed: int = 7) -> Dict[str, pd.DataFrame]:
+    """Generar un catálogo sintético determinista con n_works trabajos"""
+    rng = np.random.default_rng(seed)
+    now = pd.Timestamp("2025-01-01", tz="UTC")
+
+    category_ids = [f"categoria_{i:03d}" for i in range(n_categories)]
+    categories = pd.DataFrame({
+        "category_id": category_ids,
+        "category_name": [f"Categoría {i}" for i in range(n_categories)],
+        "category_icon": "📊",
+        "description": "Descripción científica de la categoría " * 5,
+        "display_order": np.arange(1, n_categories + 1),
+        "is_active": True,
+        "created_date": now,
+        "updated_date": now
+    })
+
+    created = now - pd.to_timedelta(rng.integers(0, 3 * 365 * 24 * 3600, n_works), unit="s")
+    statuses = np.array(["active", "paused", "archived", "maintenance"])
+    works = pd.DataFrame({
+        "work_id": [f"trabajo-{i:07d}" for i in range(n_works)],
+        "work_name": [f"Trabajo {i}" for i in range(n_works)],
+        "work_slug": [f"trabajo-{i:07d}" for i in range(n_works)],
+        "category": np.array(category_ids)[rng.integers(0, n_categories, n_works)],
+        "subcategory": "general",
+        "status": statuses[rng.integers(0, len(statuses), n_works)],
+        "version": "1.0",
+        "is_latest": rng.random(n_works) < 0.8,
+        "description": "Descripción detallada del análisis realizado " * 10,
+        "short_description": "Resumen del trabajo",
+        "image_preview_url": "",
+        "created_date": created,
+        "updated_date": created,
+        "activated_date": pd.NaT,
+        "archived_date": pd.NaT,
+        "work_url": "https://example.run.app",
+        "config_json": "{}",
+        "notes": "",
+        "tags": [["ventas", "pronóstico"]] * n_works
+    }).sort_values(["category", "created_date"], ascending=[True, False], ignore_index=True)
+
+    return {CATEGORIES_TABLE.name: categories, WORKS_TABLE.name: works}
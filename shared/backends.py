@@ -0,0 +1,267 @@
+"""
+Interfaz de almacenamiento para categorías y trabajos y selección del backend configurado
+"""
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from config import (BIGQUERY_CATEGORIES_TABLE, BIGQUERY_DATASET, BIGQUERY_PROJECT,
+                    BIGQUERY_WORKS_TABLE, STORAGE_BACKEND)
+
+# Marcador para "hora actual del servidor" en los valores de archivo
+CURRENT_TIMESTAMP = object()
+
+_ARROW_TYPES = {
+    "STRING": pa.string(),
+    "INT64": pa.int64(),
+    "BOOL": pa.bool_(),
+    "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+    "ARRAY<STRING>": pa.list_(pa.string())
+}
+
+
+class TableSpec:
+    """Descripción de una tabla, independiente del motor que la almacena"""
+
+    def __init__(self, name: str, key_column: str, columns: Dict[str, str],
+                 order_by: List[Tuple[str, bool]], archive_values: Dict[str, Any],
+                 active_column: Optional[str] = None, view_of: Optional["TableSpec"] = None,
+                 view_filter: Optional[Dict[str, Any]] = None, categorical_columns: Tuple[str, ...] = (),
+                 detail_columns: Tuple[str, ...] = ()):
+        self.name = name
+        self.key_column = key_column
+        self.columns = columns  # columna -> tipo BigQuery
+        self.order_by = order_by  # [(columna, descendente)]
+        self.archive_values = archive_values
+        self.active_column = active_column  # si existe, get_all solo devuelve filas activas
+        # Vistas de solo lectura: las filas de view_of que cumplen view_filter (igualdad por columna)
+        self.view_of = view_of
+        self.view_filter = view_filter or {}
+        # Columnas con pocos valores distintos: en los snapshots se guardan como categóricas
+        self.categorical_columns = tuple(categorical_columns)
+        # Texto largo que los snapshots no cargan: se lee al abrir un registro (get_by_id)
+        self.detail_columns = tuple(detail_columns)
+
+    @property
+    def snapshot_columns(self) -> List[str]:
+        """Columnas que se cargan en los snapshots en memoria (todas salvo las de detalle)"""
+        return [c for c in self.columns if c not in self.detail_columns]
+
+    @property
+    def update_columns(self) -> Dict[str, str]:
+        """Columnas editables (todas salvo la clave y las fechas de auditoría)"""
+        fixed = {self.key_column, "created_date", "updated_date"}
+        return {c: t for c, t in self.columns.items() if c not in fixed}
+
+    @property
+    def keyset_order(self) -> List[Tuple[str, bool]]:
+        """Orden de paginación: el orden de la tabla más la clave como desempate"""
+        return self.order_by + [(self.key_column, False)]
+
+
+CATEGORIES_TABLE = TableSpec(
+    name=BIGQUERY_CATEGORIES_TABLE,
+    key_column="category_id",
+    columns={
+        "category_id": "STRING",
+        "category_name": "STRING",
+        "category_icon": "STRING",
+        "description": "STRING",
+        "display_order": "INT64",
+        "is_active": "BOOL",
+        "created_date": "TIMESTAMP",
+        "updated_date": "TIMESTAMP"
+    },
+    order_by=[("display_order", False), ("category_name", False)],
+    archive_values={"is_active": False},
+    active_column="is_active",
+    categorical_columns=("category_icon",)
+)
+
+WORKS_TABLE = TableSpec(
+    name=BIGQUERY_WORKS_TABLE,
+    key_column="work_id",
+    columns={
+        "work_id": "STRING",
+        "work_name": "STRING",
+        "work_slug": "STRING",
+        "category": "STRING",
+        "subcategory": "STRING",
+        "status": "STRING",
+        "version": "STRING",
+        "is_latest": "BOOL",
+        "description": "STRING",
+        "short_description": "STRING",
+        "image_preview_url": "STRING",
+        "created_date": "TIMESTAMP",
+        "updated_date": "TIMESTAMP",
+        "activated_date": "TIMESTAMP",
+        "archived_date": "TIMESTAMP",
+        "work_url": "STRING",
+        "config_json": "STRING",
+        "notes": "STRING",
+        "tags": "ARRAY<STRING>"
+    },
+    order_by=[("category", False), ("created_date", True)],
+    archive_values={"status": "archived", "archived_date": CURRENT_TIMESTAMP},
+    categorical_columns=("category", "subcategory", "status", "version"),
+    detail_columns=("description", "notes", "config_json")
+)
+
+# Solo la última versión de cada trabajo; los listados con is_latest = true leen de aquí
+WORKS_LATEST_VIEW = TableSpec(
+    name=f"{BIGQUERY_WORKS_TABLE}_latest",
+    key_column=WORKS_TABLE.key_column,
+    columns=WORKS_TABLE.columns,
+    order_by=WORKS_TABLE.order_by,
+    archive_values={},
+    view_of=WORKS_TABLE,
+    view_filter={"is_latest": True}
+)
+
+
+class StorageBackend(ABC):
+    """Operaciones que la capa de datos necesita de un motor de almacenamiento.
+
+    Los métodos de escritura lanzan excepción ante un error; la capa de datos
+    decide cómo informarlo.
+    """
+
+    @abstractmethod
+    def get_all(self, table: TableSpec, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Todas las filas (solo activas si la tabla tiene active_column), en el orden de la tabla.
+
+        columns limita la proyección (None: todas las columnas).
+        """
+
+    @abstractmethod
+    def get_keys(self, table: TableSpec) -> List[str]:
+        """Todas las claves primarias, incluidas las filas inactivas o archivadas; solo lee esa columna"""
+
+    @abstractmethod
+    def get_by_id(self, table: TableSpec, key: str, columns: Optional[List[str]] = None) -> Dict:
+        """Fila por clave primaria ({} si no existe), con las columnas indicadas o todas"""
+
+    @abstractmethod
+    def list_page(self, table: TableSpec, columns: List[str], filters: Dict,
+                  page_size: int, cursor: Optional[Dict]) -> Tuple[pd.DataFrame, Optional[Dict]]:
+        """Página por keyset con proyección y filtros.
+
+        filters: igualdad por columna, más "tag" (contenido en tags) y
+        "created_from"/"created_to" (rango sobre created_date).
+        """
+
+    @abstractmethod
+    def create(self, table: TableSpec, rows: List[Dict]) -> bool:
+        """Insertar pocas filas (alta desde formulario)"""
+
+    @abstractmethod
+    def create_bulk(self, table: TableSpec, rows: List[Dict]) -> int:
+        """Insertar muchas filas; devuelve la cantidad insertada"""
+
+    @abstractmethod
+    def update(self, table: TableSpec, updates: List[Tuple[str, Dict]]):
+        """Aplicar pares (clave, cambios) en una sola operación"""
+
+    @abstractmethod
+    def archive(self, table: TableSpec, keys: List[str],
+                children: Optional[Tuple[TableSpec, str]] = None):
+        """Archivar filas; children=(tabla, columna FK) archiva también sus hijas en la misma operación"""
+
+    @abstractmethod
+    def get_max_updated(self, table: TableSpec) -> Optional[pd.Timestamp]:
+        """Mayor updated_date de la tabla (None si está vacía); solo lee esa columna"""
+
+    @abstractmethod
+    def get_changed(self, table: TableSpec, since: pd.Timestamp,
+                    columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Filas con updated_date > since, incluidas las inactivas o archivadas.
+
+        columns limita la proyección (None: todas las columnas).
+        """
+
+    def iter_batches(self, table: TableSpec, columns: List[str], filters: Dict,
+                     batch_rows: int) -> Iterator[pd.DataFrame]:
+        """Todas las filas que cumplen los filtros, en lotes de hasta batch_rows (exportaciones).
+
+        Por defecto recorre las páginas por keyset: cada lote es una lectura aparte y
+        solo uno está en memoria a la vez. Mismos filtros que list_page.
+        """
+        cursor = None
+        while True:
+            page_df, cursor = self.list_page(table, columns, filters, batch_rows, cursor)
+            if not page_df.empty:
+                yield page_df
+            if cursor is None:
+                return
+
+    def check_batches_cost(self, table: TableSpec, columns: List[str], filters: Dict):
+        """Validar el costo de iter_batches sin leer filas (lanza QueryBudgetExceeded).
+
+        Por defecto no hace nada: solo los backends que facturan por consulta lo implementan.
+        """
+
+    def connection_stats(self) -> Dict[str, int]:
+        """Contadores de clientes/conexiones del backend (vacío si no aplica)"""
+        return {}
+
+
+def build_arrow_schema(table: TableSpec, columns: Optional[List[str]] = None) -> pa.Schema:
+    """Esquema Arrow equivalente a las columnas de la tabla (o a las indicadas, en ese orden)"""
+    return pa.schema([(column, _ARROW_TYPES[table.columns[column]]) for column in (columns or table.columns)])
+
+
+def build_keyset_condition(order: List[Tuple[str, bool]],
+                           placeholder: Callable[[str], str]) -> str:
+    """Condición "fila posterior al cursor" para un orden con direcciones mixtas"""
+    alternatives = []
+    for position, (column, descending) in enumerate(order):
+        terms = [f"{prev} = {placeholder(prev)}" for prev, _ in order[:position]]
+        terms.append(f"{column} {'<' if descending else '>'} {placeholder(column)}")
+        alternatives.append(f"({' AND '.join(terms)})")
+    return f"({' OR '.join(alternatives)})"
+
+
+def build_next_cursor(page_df: pd.DataFrame, table: TableSpec) -> Dict:
+    """Cursor de la página siguiente a partir de la última fila de la página"""
+    last_row = page_df.iloc[-1]
+    cursor = {}
+    for column, _ in table.keyset_order:
+        value = last_row[column]
+        if table.columns[column] == "TIMESTAMP":
+            value = pd.Timestamp(value).to_pydatetime()
+        cursor[column] = value
+    return cursor
+
+
+_backend: Optional[StorageBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> StorageBackend:
+    """Obtener el backend configurado en STORAGE_BACKEND (uno por proceso)"""
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    with _backend_lock:
+        if _backend is None:
+            if STORAGE_BACKEND == "sqlite":
+                from sqlite_backend import SQLiteBackend
+                _backend = SQLiteBackend()
+            elif STORAGE_BACKEND == "bigquery":
+                from bigquery_backend import BigQueryBackend
+                _backend = BigQueryBackend(BIGQUERY_PROJECT, BIGQUERY_DATASET)
+            else:
+                raise ValueError(f"Backend de almacenamiento desconocido: {STORAGE_BACKEND}")
+        return _backend
+
+
+def set_backend(backend: Optional[StorageBackend]):
+    """Reemplazar el backend del proceso (None vuelve a leer la configuración)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,479 @@
+"""
+Backend de almacenamiento sobre BigQuery
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from google.cloud import bigquery
+
+from backends import (CURRENT_TIMESTAMP, StorageBackend, TableSpec,
+                      build_keyset_condition, build_next_cursor)
+from config import BIGQUERY_FETCH_CONFIG, BIGQUERY_WRITE_CONFIG, BULK_CONFIG, COST_GUARD_CONFIG
+from connection import get_bigquery_client, get_bqstorage_client, get_pool_stats
+from cost_guard import cost_guard
+from instrumentation import logger, record_job_stats, track_call
+from resilience import Attempt, attempt_fields, call_with_resilience, run_idempotent_job
+
+
+def fetch_dataframe(client: bigquery.Client, operation: str, query: str,
+                    job_config: Optional[bigquery.QueryJobConfig] = None,
+                    attempt: Optional[Attempt] = None) -> pd.DataFrame:
+    """Ejecutar consulta y descargar el resultado con el motor configurado.
+
+    Con la Storage Read API el resultado llega en lotes Arrow y el DataFrame se arma
+    sin decodificar JSON fila a fila; los resultados pequeños siguen por REST, donde
+    abrir una sesión de lectura cuesta más que la propia descarga. attempt (de
+    call_with_resilience) limita la espera del job al plazo de la operación y permite
+    cancelarlo si el intento se abandona. El control de costo lo hace quien llama, una vez
+    por operación (ver BigQueryBackend._read).
+    """
+    with track_call(operation, kind="query", **attempt_fields(attempt)) as call:
+        job = client.query(query, job_config=job_config)
+        if attempt:
+            attempt.track_job(job)
+        rows = job.result(timeout=attempt.timeout() if attempt else None)
+        if COST_GUARD_CONFIG["enabled"]:
+            cost_guard.record(job)
+        engine = BIGQUERY_FETCH_CONFIG["engine"]
+
+        use_storage = engine == "storage" or (
+            engine == "auto" and (rows.total_rows or 0) >= BIGQUERY_FETCH_CONFIG["storage_min_rows"]
+        )
+        bqstorage_client = get_bqstorage_client() if use_storage else None
+        if bqstorage_client is None:
+            result = rows.to_dataframe(create_bqstorage_client=False)
+        else:
+            result = rows.to_dataframe(bqstorage_client=bqstorage_client)
+
+        record_job_stats(call, job)
+        call["engine"] = "rest" if bqstorage_client is None else "storage"
+        call["rows"] = len(result)
+        return result
+
+
+def fetch_dataframe_batches(client: bigquery.Client, operation: str, query: str,
+                            job_config: Optional[bigquery.QueryJobConfig], batch_rows: int) -> Iterator[pd.DataFrame]:
+    """Ejecutar consulta y entregar el resultado en DataFrames sucesivos, sin armarlo entero.
+
+    Por REST cada lote es una página de batch_rows filas; con la Storage Read API, un
+    mensaje Arrow del stream. Pasa por cost_guard igual que fetch_dataframe. Lanzar el job y
+    esperarlo tiene plazo y reintentos (call_with_resilience, sin duplicados); la descarga
+    no se reintenta, porque el consumidor ya recibió los lotes anteriores.
+    """
+    if COST_GUARD_CONFIG["enabled"]:
+        job_config = cost_guard.check(client, operation, query, job_config)
+
+    def start(attempt: Attempt):
+        job = attempt.track_job(client.query(query, job_config=job_config))
+        return job, job.result(page_size=batch_rows, timeout=attempt.timeout())
+
+    with track_call(operation, kind="query_batches") as call:
+        job, rows = call_with_resilience(operation, start)
+        if COST_GUARD_CONFIG["enabled"]:
+            cost_guard.record(job)
+        record_job_stats(call, job)
+        use_storage = BIGQUERY_FETCH_CONFIG["engine"] != "rest"
+        bqstorage_client = get_bqstorage_client() if use_storage else None
+        call["engine"] = "rest" if bqstorage_client is None else "storage"
+        call["rows"] = 0
+        call["batches"] = 0
+        for batch in rows.to_dataframe_iterable(bqstorage_client=bqstorage_client):
+            call["rows"] += len(batch)
+            call["batches"] += 1
+            yield batch
+
+
+def run_dml(client: bigquery.Client, operation: str, query: str,
+            job_config: Optional[bigquery.QueryJobConfig] = None, job_id: Optional[str] = None,
+            attempt: Optional[Attempt] = None):
+    """Ejecutar una sentencia DML (o script) y esperar a que termine"""
+    with track_call(operation, kind="dml", **attempt_fields(attempt)) as call:
+        job = client.query(query, job_config=job_config, job_id=job_id)
+        if attempt:
+            attempt.track_job(job)
+        job.result(timeout=attempt.timeout() if attempt else None)
+        record_job_stats(call, job)
+        call["rows"] = getattr(job, "num_dml_affected_rows", None)
+    return job
+
+
+def run_idempotent_dml(client: bigquery.Client, operation: str, query: str,
+                       job_config: Optional[bigquery.QueryJobConfig] = None):
+    """run_dml con plazo y reintentos; el ID determinista del job evita aplicar dos veces la sentencia"""
+    return run_idempotent_job(
+        client, operation, lambda job_id, attempt: run_dml(client, operation, query, job_config, job_id, attempt)
+    )
+
+
+def load_rows_in_chunks(client: bigquery.Client, table_ref: str, rows: List[Dict]) -> int:
+    """Cargar filas con jobs de carga (un job por bloque) en vez de una llamada HTTP por fila.
+
+    Los jobs de carga no pasan por el buffer de streaming, así que las filas quedan
+    editables de inmediato. Devuelve la cantidad de filas cargadas antes del primer error.
+    """
+    if not rows:
+        return 0
+
+    job_config = bigquery.LoadJobConfig(
+        schema=client.get_table(table_ref).schema,
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND
+    )
+    chunk_size = BULK_CONFIG["load_chunk_rows"]
+    operation = f"{table_ref.split('.')[-1]}.load"
+    loaded = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+
+        def submit(job_id: str, attempt: Attempt):
+            with track_call(operation, kind="load", rows=len(chunk), **attempt_fields(attempt)) as call:
+                job = attempt.track_job(
+                    client.load_table_from_json(chunk, table_ref, job_config=job_config, job_id=job_id)
+                )
+                job.result(timeout=attempt.timeout())
+                call["job_id"] = getattr(job, "job_id", None)
+            return job
+
+        try:
+            run_idempotent_job(client, operation, submit)
+        except Exception as e:
+            logger.error("Error loading rows", extra={"fields": {
+                "table": table_ref, "first_row": start, "last_row": start + len(chunk) - 1, "error": str(e)
+            }})
+            break
+        loaded += len(chunk)
+    return loaded
+
+
+def insert_rows_dml(client: bigquery.Client, table_ref: str, table: TableSpec, rows: List[Dict]) -> int:
+    """Insertar filas con INSERT ... SELECT FROM UNNEST(@rows), un job por bloque.
+
+    Las filas insertadas por DML no pasan por el buffer de streaming: admiten UPDATE/MERGE
+    de inmediato. Devuelve la cantidad de filas insertadas antes del primer error.
+    """
+    columns = list(table.columns)
+    query = f"""
+    INSERT INTO `{table_ref}` ({', '.join(columns)})
+    SELECT {', '.join(columns)}
+    FROM UNNEST(@rows)
+    """
+    chunk_size = BIGQUERY_WRITE_CONFIG["dml_batch_rows"]
+    inserted = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ArrayQueryParameter("rows", "STRUCT", [build_row_struct(table.columns, row) for row in chunk])
+        ])
+        try:
+            run_idempotent_dml(client, f"{table.name}.create", query, job_config)
+        except Exception as e:
+            logger.error("Error inserting rows", extra={"fields": {
+                "table": table_ref, "first_row": start, "last_row": start + len(chunk) - 1, "error": str(e)
+            }})
+            break
+        inserted += len(chunk)
+    return inserted
+
+
+def build_row_struct(column_types: Dict[str, str], values: Dict,
+                     extra_fields: Optional[List] = None) -> bigquery.StructQueryParameter:
+    """Fila como STRUCT parametrizado con todas las columnas indicadas (las ausentes, NULL)"""
+    fields = list(extra_fields or [])
+    for column, column_type in column_types.items():
+        value = values.get(column)
+        if column_type.startswith("ARRAY<"):
+            fields.append(bigquery.ArrayQueryParameter(column, column_type[6:-1], list(value or [])))
+        else:
+            if column_type == "TIMESTAMP" and isinstance(value, str):
+                value = pd.Timestamp(value).to_pydatetime()
+            fields.append(bigquery.ScalarQueryParameter(column, column_type, value))
+    return bigquery.StructQueryParameter(None, *fields)
+
+
+def build_merge_updates_query(table_ref: str, key_column: str, column_types: Dict[str, str]) -> str:
+    """Armar el MERGE masivo; el texto depende solo de la tabla, nunca de los valores.
+
+    Cada elemento de @updates trae todas las columnas editables más la lista "changed"
+    con las que realmente se modifican; el resto conserva el valor de la fila destino.
+    """
+    set_clauses = [
+        f"{column} = IF('{column}' IN UNNEST(source.changed), source.{column}, target.{column})"
+        for column in column_types
+    ]
+    return f"""
+    MERGE `{table_ref}` AS target
+    USING (SELECT * FROM UNNEST(@updates)) AS source
+    ON target.{key_column} = source.{key_column}
+    WHEN MATCHED THEN
+        UPDATE SET {', '.join(set_clauses)}, updated_date = CURRENT_TIMESTAMP()
+    """
+
+
+def build_updates_parameter(key_column: str, column_types: Dict[str, str],
+                            updates: List[Tuple[str, Dict]]) -> bigquery.ArrayQueryParameter:
+    """Convertir pares (id, cambios) en el parámetro ARRAY<STRUCT> @updates"""
+    # MERGE exige a lo sumo una fila origen por fila destino: se combinan los cambios por ID
+    merged: Dict[str, Dict] = {}
+    for key, changes in updates:
+        merged.setdefault(key, {}).update(changes)
+
+    structs = []
+    for key, changes in merged.items():
+        changed = [column for column in changes if column != key_column]
+        unknown = [column for column in changed if column not in column_types]
+        if unknown:
+            raise ValueError(f"Columnas no editables: {', '.join(unknown)}")
+
+        structs.append(build_row_struct(column_types, changes, extra_fields=[
+            bigquery.ScalarQueryParameter(key_column, "STRING", key),
+            bigquery.ArrayQueryParameter("changed", "STRING", changed)
+        ]))
+    return bigquery.ArrayQueryParameter("updates", "STRUCT", structs)
+
+
+class BigQueryBackend(StorageBackend):
+    """Tablas en BigQuery, con el cliente compartido del proceso"""
+
+    def __init__(self, project_id: str, dataset_id: str):
+        self.project_id = project_id
+        self.dataset_id = dataset_id
+        self.client = get_bigquery_client(project_id)
+
+    def table_ref(self, table: TableSpec) -> str:
+        """Referencia completa proyecto.dataset.tabla"""
+        return f"{self.project_id}.{self.dataset_id}.{table.name}"
+
+    def get_all(self, table: TableSpec, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        where_clause = f"WHERE {table.active_column} = true" if table.active_column else ""
+        query = f"""
+        SELECT {', '.join(columns) if columns else '*'}
+        FROM `{self.table_ref(table)}`
+        {where_clause}
+        ORDER BY {self._order_clause(table.order_by)}
+        """
+        return self._read(f"{table.name}.get_all", query)
+
+    def get_keys(self, table: TableSpec) -> List[str]:
+        query = f"SELECT {table.key_column} FROM `{self.table_ref(table)}`"
+        return self._read(f"{table.name}.get_keys", query)[table.key_column].tolist()
+
+    def get_by_id(self, table: TableSpec, key: str, columns: Optional[List[str]] = None) -> Dict:
+        query = f"""
+        SELECT {', '.join(columns) if columns else '*'}
+        FROM `{self.table_ref(table)}`
+        WHERE {table.key_column} = @key
+        LIMIT 1
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("key", "STRING", key)
+            ]
+        )
+        result = self._read(f"{table.name}.get_by_id", query, job_config)
+        return result.to_dict('records')[0] if not result.empty else {}
+
+    def get_max_updated(self, table: TableSpec) -> Optional[pd.Timestamp]:
+        query = f"""
+        SELECT MAX(updated_date) AS max_updated
+        FROM `{self.table_ref(table)}`
+        """
+        result = self._read(f"{table.name}.get_max_updated", query)
+        value = result["max_updated"].iloc[0] if not result.empty else None
+        return None if pd.isna(value) else pd.Timestamp(value)
+
+    def get_changed(self, table: TableSpec, since: pd.Timestamp,
+                    columns: Optional[List[str]] = None) -> pd.DataFrame:
+        # La tabla se particiona por created_date: el filtro no poda particiones, pero el clustering
+        # por updated_date salta bloques, y la proyección deja fuera las columnas de texto largo
+        query = f"""
+        SELECT {', '.join(columns) if columns else '*'}
+        FROM `{self.table_ref(table)}`
+        WHERE updated_date > @since
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("since", "TIMESTAMP", since)
+            ]
+        )
+        return self._read(f"{table.name}.get_changed", query, job_config)
+
+    def list_page(self, table: TableSpec, columns: List[str], filters: Dict,
+                  page_size: int, cursor: Optional[Dict]) -> Tuple[pd.DataFrame, Optional[Dict]]:
+        keyset_columns = [column for column, _ in table.keyset_order]
+        select_columns = columns + [c for c in keyset_columns if c not in columns]
+        conditions, params = self._filter_conditions(table, filters)
+        params.append(bigquery.ScalarQueryParameter("page_limit", "INT64", page_size + 1))
+
+        if cursor:
+            conditions.append(build_keyset_condition(table.keyset_order, lambda c: f"@cursor_{c}"))
+            params.extend(
+                bigquery.ScalarQueryParameter(f"cursor_{column}", table.columns[column], cursor[column])
+                for column in keyset_columns
+            )
+
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+        SELECT {', '.join(select_columns)}
+        FROM `{self.table_ref(table)}`
+        {where_clause}
+        ORDER BY {self._order_clause(table.keyset_order)}
+        LIMIT @page_limit
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        result = self._read(f"{table.name}.list_page", query, job_config)
+
+        next_cursor = None
+        if len(result) > page_size:
+            result = result.iloc[:page_size]
+            next_cursor = build_next_cursor(result, table)
+        return result[columns].reset_index(drop=True), next_cursor
+
+    def iter_batches(self, table: TableSpec, columns: List[str], filters: Dict,
+                     batch_rows: int) -> Iterator[pd.DataFrame]:
+        query, job_config = self._batches_query(table, columns, filters)
+        yield from fetch_dataframe_batches(self.client, f"{table.name}.iter_batches", query, job_config, batch_rows)
+
+    def check_batches_cost(self, table: TableSpec, columns: List[str], filters: Dict):
+        if COST_GUARD_CONFIG["enabled"]:
+            query, job_config = self._batches_query(table, columns, filters)
+            cost_guard.check(self.client, f"{table.name}.iter_batches", query, job_config, consume_allowance=False)
+
+    def create(self, table: TableSpec, rows: List[Dict]) -> bool:
+        mode = BIGQUERY_WRITE_CONFIG["insert_mode"]
+        if mode == "streaming":
+            # insertAll heredado: las filas no se pueden editar mientras sigan en el buffer de streaming.
+            # insertId = clave de la fila: BigQuery descarta (best effort) las filas repetidas por un reintento
+            row_ids = [row.get(table.key_column) for row in rows]
+
+            def insert(attempt: Attempt) -> List:
+                with track_call(f"{table.name}.create", kind="streaming_insert", rows=len(rows),
+                                **attempt_fields(attempt)) as call:
+                    errors = self.client.insert_rows_json(self.table_ref(table), rows, row_ids=row_ids,
+                                                          timeout=attempt.timeout())
+                    call["insert_errors"] = len(errors)
+                return errors
+
+            errors = call_with_resilience(f"{table.name}.create", insert, kind="write")
+            return len(errors) == 0
+        return self._insert(table, rows, mode) == len(rows)
+
+    def create_bulk(self, table: TableSpec, rows: List[Dict]) -> int:
+        return self._insert(table, rows, BIGQUERY_WRITE_CONFIG["bulk_mode"])
+
+    def _insert(self, table: TableSpec, rows: List[Dict], mode: str) -> int:
+        """Insertar filas con el motor indicado; devuelve cuántas quedaron escritas"""
+        if not rows:
+            return 0
+        if mode == "dml":
+            return insert_rows_dml(self.client, self.table_ref(table), table, rows)
+        if mode == "load":
+            return load_rows_in_chunks(self.client, self.table_ref(table), rows)
+        if mode == "storage_write":
+            # Import diferido: la Storage Write API es una dependencia opcional y pesada
+            from storage_write import append_rows
+            return append_rows(self.project_id, self.dataset_id, table, rows)
+        raise ValueError(f"Modo de escritura desconocido: {mode}")
+
+    def update(self, table: TableSpec, updates: List[Tuple[str, Dict]]):
+        query = build_merge_updates_query(self.table_ref(table), table.key_column, table.update_columns)
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            build_updates_parameter(table.key_column, table.update_columns, updates)
+        ])
+        run_idempotent_dml(self.client, f"{table.name}.update", query, job_config)
+
+    def archive(self, table: TableSpec, keys: List[str],
+                children: Optional[Tuple[TableSpec, str]] = None):
+        params = [bigquery.ArrayQueryParameter("keys", "STRING", list(keys))]
+        query = self._archive_statement(table, f"{table.key_column} IN UNNEST(@keys)", params)
+        if children:
+            # Ambas tablas en una transacción multi-sentencia: un solo job
+            child_table, foreign_key = children
+            query = f"""
+            BEGIN TRANSACTION;
+            {query}
+            {self._archive_statement(child_table, f"{foreign_key} IN UNNEST(@keys)", params)}
+            COMMIT TRANSACTION;
+            """
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        run_idempotent_dml(self.client, f"{table.name}.archive", query, job_config)
+
+    def connection_stats(self) -> Dict[str, int]:
+        return get_pool_stats()
+
+    def _batches_query(self, table: TableSpec, columns: List[str],
+                       filters: Dict) -> Tuple[str, bigquery.QueryJobConfig]:
+        """Consulta de iter_batches; check_batches_cost estima exactamente la misma.
+
+        Una sola consulta (un escaneo) descargada por partes, en lugar de una consulta por página.
+        Sin ORDER BY: ordenar todo el resultado obliga a BigQuery a hacerlo en un solo worker
+        y a servirlo en un único stream de lectura.
+        """
+        conditions, params = self._filter_conditions(table, filters)
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+        SELECT {', '.join(columns)}
+        FROM `{self.table_ref(table)}`
+        {where_clause}
+        """
+        return query, bigquery.QueryJobConfig(query_parameters=params)
+
+    def _read(self, operation: str, query: str,
+              job_config: Optional[bigquery.QueryJobConfig] = None) -> pd.DataFrame:
+        """fetch_dataframe con plazo, reintentos y lectura duplicada si el job tarda (call_with_resilience).
+
+        Con el control de costo activo, la consulta pasa antes por cost_guard (puede lanzar
+        QueryBudgetExceeded) una sola vez: los reintentos y duplicados usan el mismo job_config.
+        """
+        if COST_GUARD_CONFIG["enabled"]:
+            job_config = cost_guard.check(self.client, operation, query, job_config)
+        return call_with_resilience(
+            operation, lambda attempt: fetch_dataframe(self.client, operation, query, job_config, attempt)
+        )
+
+    def _archive_statement(self, table: TableSpec, condition: str, params: List) -> str:
+        """UPDATE que aplica los valores de archivo de la tabla (agrega sus parámetros a params).
+
+        Las filas que ya están archivadas no se tocan, para no pisar su archived_date.
+        """
+        set_clauses = []
+        pending_clauses = []
+        for column, value in table.archive_values.items():
+            if value is CURRENT_TIMESTAMP:
+                set_clauses.append(f"{column} = CURRENT_TIMESTAMP()")
+            else:
+                param_name = f"archive_{table.name}_{column}"
+                set_clauses.append(f"{column} = @{param_name}")
+                pending_clauses.append(f"IFNULL({column} != @{param_name}, true)")
+                params.append(bigquery.ScalarQueryParameter(param_name, table.columns[column], value))
+        set_clauses.append("updated_date = CURRENT_TIMESTAMP()")
+        if pending_clauses:
+            condition = f"{condition} AND ({' OR '.join(pending_clauses)})"
+        return f"""
+            UPDATE `{self.table_ref(table)}`
+            SET {', '.join(set_clauses)}
+            WHERE {condition};
+            """
+
+    def _filter_conditions(self, table: TableSpec, filters: Dict) -> Tuple[List[str], List]:
+        """Condiciones WHERE y parámetros de los filtros de list_page"""
+        conditions = []
+        params = []
+        for name, value in filters.items():
+            if name == "tag":
+                conditions.append("@tag IN UNNEST(tags)")
+                params.append(bigquery.ScalarQueryParameter("tag", "STRING", value))
+            elif name == "created_from":
+                conditions.append("created_date >= @created_from")
+                params.append(bigquery.ScalarQueryParameter("created_from", "TIMESTAMP", value))
+            elif name == "created_to":
+                conditions.append("created_date < @created_to")
+                params.append(bigquery.ScalarQueryParameter("created_to", "TIMESTAMP", value))
+            elif name in table.columns:
+                conditions.append(f"{name} = @{name}")
+                params.append(bigquery.ScalarQueryParameter(name, table.columns[name], value))
+            else:
+                raise ValueError(f"Filtro desconocido: {name}")
+        return conditions, params
+
+    def _order_clause(self, order: List[Tuple[str, bool]]) -> str:
+        """ORDER BY a partir de [(columna, descendente)]"""
+        return ", ".join(f"{column} DESC" if descending else column for column, descending in order)
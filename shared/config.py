@@ -4,8 +4,10 @@ Configuraciones del sistema de administración
 import os
 from dotenv import load_dotenv
 
-# Cargar variables de entorno
-load_dotenv()
+# Cargar variables de entorno desde .env (solo en local: Cloud Run, que define K_SERVICE,
+# las recibe de la configuración del servicio y no necesita buscar el archivo)
+if not os.getenv("K_SERVICE"):
+    load_dotenv()
 
 # Configuración de BigQuery
 BIGQUERY_PROJECT = "platform-partners-des"
@@ -13,6 +15,153 @@ BIGQUERY_DATASET = "settings"
 BIGQUERY_CATEGORIES_TABLE = "works_categories"
 BIGQUERY_WORKS_TABLE = "works_index"
 
+# Backend de almacenamiento: "bigquery" (producción) o "sqlite" (local, sin red ni facturación)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "bigquery")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "local_admin.db")
+
+# Pool de conexiones HTTP compartido por todos los clientes BigQuery del proceso
+BIGQUERY_POOL_CONFIG = {
+    "pool_connections": int(os.getenv("BIGQUERY_POOL_CONNECTIONS", "10")),  # hosts distintos
+    "pool_maxsize": int(os.getenv("BIGQUERY_POOL_MAXSIZE", "20")),  # conexiones por host
+    "keep_alive": os.getenv("BIGQUERY_KEEP_ALIVE", "true").lower() == "true",
+    "keep_alive_idle_seconds": 60,
+    "keep_alive_interval_seconds": 15
+}
+
+# Motor de lectura de resultados: "rest" (paginado JSON), "storage" (Storage Read API en Arrow)
+# o "auto" (Storage Read API solo cuando el resultado supera storage_min_rows)
+BIGQUERY_FETCH_CONFIG = {
+    "engine": os.getenv("BIGQUERY_FETCH_ENGINE", "auto"),
+    "storage_min_rows": int(os.getenv("BIGQUERY_STORAGE_MIN_ROWS", "5000"))
+}
+
+# Motor de escritura de filas nuevas. Las filas del buffer de streaming heredado (insertAll)
+# no admiten UPDATE/MERGE durante ~90 minutos; DML, Storage Write API y jobs de carga sí.
+BIGQUERY_WRITE_CONFIG = {
+    "insert_mode": os.getenv("BIGQUERY_INSERT_MODE", "dml"),  # altas: "dml", "storage_write" o "streaming"
+    "bulk_mode": os.getenv("BIGQUERY_BULK_MODE", "load"),  # importaciones: "load", "storage_write" o "dml"
+    "dml_batch_rows": 500,  # filas por INSERT parametrizado
+    "storage_write_stream": os.getenv("BIGQUERY_STORAGE_WRITE_STREAM", "pending"),  # "pending" o "committed"
+    "storage_write_batch_rows": 500,  # filas por AppendRows
+    "append_retries": 2  # reenvíos de un lote con el mismo offset
+}
+
+# Diseño físico de las tablas (shared/schema.py): particiones por created_date, clustering y
+# vista de última versión. Los listados con "Solo última versión" leen de la vista.
+TABLE_LAYOUT_CONFIG = {
+    "partition_granularity": os.getenv("BIGQUERY_PARTITION_GRANULARITY", "MONTH"),  # "DAY", "MONTH" o "YEAR"
+    "latest_view": os.getenv("BIGQUERY_LATEST_VIEW", "view"),  # "view" o "materialized"
+    "use_latest_view": os.getenv("USE_LATEST_VIEW", "true").lower() == "true"
+}
+
+# Control de costo de las lecturas (shared/cost_guard.py). Cada forma de consulta se estima con un
+# dry run; si supera el presupuesto por consulta o lo que le queda a la sesión, se bloquea y la UI
+# avisa antes de ejecutarla. maximum_bytes_billed es el techo duro que aplica BigQuery a cada job.
+COST_GUARD_CONFIG = {
+    "enabled": os.getenv("COST_GUARD_ENABLED", "true").lower() == "true",
+    "query_budget_bytes": int(os.getenv("QUERY_BUDGET_BYTES", str(1 * 10**9))),
+    "session_budget_bytes": int(os.getenv("SESSION_BUDGET_BYTES", str(20 * 10**9))),
+    "maximum_bytes_billed": int(os.getenv("MAXIMUM_BYTES_BILLED", str(5 * 10**9))),
+    "estimate_ttl_seconds": 3600  # las tablas crecen: la estimación se renueva cada hora
+}
+
+# Plazos, reintentos y lecturas duplicadas de las llamadas a BigQuery (shared/resilience.py)
+RESILIENCE_CONFIG = {
+    "enabled": os.getenv("RESILIENCE_ENABLED", "true").lower() == "true",
+    # Plazo total de cada operación (s), reintentos incluidos; las no listadas usan el de su tipo
+    "read_deadline_seconds": float(os.getenv("READ_DEADLINE_SECONDS", "20")),
+    "write_deadline_seconds": float(os.getenv("WRITE_DEADLINE_SECONDS", "60")),
+    "deadline_seconds": {
+        "get_by_id": 10.0,
+        "get_max_updated": 10.0,
+        "list_page": 15.0,
+        "get_all": 30.0,
+        "iter_batches": 120.0,  # hasta que termina el job de la exportación; la descarga no tiene plazo
+        "load": 300.0
+    },
+    "max_attempts": 4,
+    "initial_backoff_seconds": 0.25,  # espera máxima antes del primer reintento; se duplica en cada uno
+    "max_backoff_seconds": 4.0,
+    # Lectura duplicada: si la primera no respondió en este tiempo (s) se lanza otra y gana la que termine
+    # antes. Solo lecturas puntuales: duplicar get_all, get_changed o iter_batches escanearía la tabla dos veces
+    "hedge_enabled": os.getenv("HEDGED_READS_ENABLED", "true").lower() == "true",
+    "hedge_after_seconds": {
+        method: float(os.getenv("HEDGE_AFTER_SECONDS", "3"))
+        for method in ("get_by_id", "get_max_updated", "list_page")
+    },
+    "max_hedges": 1,
+    "max_workers": 16
+}
+
+# Caché de lecturas compartida por todas las sesiones del proceso
+CACHE_CONFIG = {
+    "ttl_seconds": int(os.getenv("CACHE_TTL_SECONDS", "300")),
+    "max_entries": int(os.getenv("CACHE_MAX_ENTRIES", "64"))  # lecturas puntuales; los snapshots "all" no cuentan
+}
+
+# Sincronización incremental de los snapshots por marca de agua en updated_date
+DELTA_SYNC_CONFIG = {
+    "enabled": os.getenv("DELTA_SYNC_ENABLED", "true").lower() == "true",
+    "overlap_seconds": 300,  # se relee este margen antes de la marca de agua (relojes, commits en curso)
+    "full_refresh_seconds": int(os.getenv("DELTA_FULL_REFRESH_SECONDS", "3600"))  # recarga completa periódica
+}
+
+# Escritura diferida: ediciones y archivos se confirman en segundo plano (desactivada por defecto)
+WRITE_BEHIND_CONFIG = {
+    "enabled": os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true",
+    "max_pending": 500,  # con la cola llena se escribe de forma síncrona
+    "batch_window_seconds": 0.5,  # espera para juntar escrituras en un mismo lote
+    "max_batch": 200
+}
+
+# Búsqueda de trabajos en memoria (índice invertido sobre el snapshot de works_index)
+SEARCH_CONFIG = {
+    "fields": {  # campo -> peso en la relevancia
+        "work_name": 3.0,
+        "tags": 2.0,
+        "subcategory": 1.5,
+        "short_description": 1.5,
+        "description": 1.0
+    },
+    "prefix_factor": 0.6,  # peso de una coincidencia por prefijo frente a una exacta
+    "prefix_min_chars": 2,  # términos más cortos solo coinciden con palabras completas
+    "max_results": 200
+}
+
+# Precarga concurrente de datos al inicio de cada rerun
+PREFETCH_CONFIG = {
+    "enabled": os.getenv("PREFETCH_ENABLED", "true").lower() == "true",
+    "max_workers": 4
+}
+
+# Imágenes de preview (shared/images.py): se guardan por hash de contenido junto con miniaturas
+# WebP/JPEG; image_preview_url apunta a la miniatura "md" en WebP, nunca al original
+IMAGE_CONFIG = {
+    "blob_store": os.getenv("IMAGE_BLOB_STORE", "local"),  # "local" (desarrollo) o "gcs" (producción)
+    "local_dir": os.getenv("IMAGE_LOCAL_DIR", "local_images"),
+    "bucket": os.getenv("IMAGE_BUCKET", ""),
+    "thumbnail_sizes": {"sm": 320, "md": 960},  # nombre -> lado mayor en px
+    "quality": 80,
+    "max_pixels": 40_000_000,  # imágenes más grandes se rechazan (protección contra bombas de descompresión)
+    "max_workers": 4,
+    "cache_max_bytes": 64 * 1024 * 1024  # miniaturas en memoria para las galerías
+}
+
+# Exportaciones (shared/export.py): las tablas se leen por lotes y se escriben a un archivo temporal,
+# así que la memoria del proceso no crece con el tamaño de la tabla
+EXPORT_CONFIG = {
+    "batch_rows": 5000,
+    # En Cloud Run /tmp vive en memoria: apuntar a un volumen montado para exportaciones grandes
+    "temp_dir": os.getenv("EXPORT_TEMP_DIR") or None,
+    "parquet_compression": "zstd"
+}
+
+# Altas masivas (importación CSV/JSONL)
+BULK_CONFIG = {
+    "load_chunk_rows": 10000,  # filas por job de carga
+    "max_import_rows": 50000
+}
+
 # Configuración de Streamlit
 STREAMLIT_CONFIG = {
     "page_title": "Data Science Admin",
@@ -27,8 +176,10 @@ APP_CONFIG = {
     "subtitle": "Sistema de Administración - Categorías y Trabajos",
     "page_icon": "⚙️",
     "admin_password": os.getenv("ADMIN_PASSWORD", "admin123"),
+    "works_page_size": 50,
+    "gallery_columns": 5,
     "max_image_size": 5 * 1024 * 1024,  # 5MB
-    "allowed_image_types": ["jpg", "jpeg", "png", "gif"]
+    "allowed_image_types": ["jpg", "jpeg", "png", "gif", "webp"]
 }
 
 # Estados de trabajos
@@ -39,6 +190,14 @@ WORK_STATUS = {
     "MAINTENANCE": "maintenance"
 }
 
+# Emoji de cada estado de trabajo
+STATUS_BADGES = {
+    "active": "🟢",
+    "paused": "⏸️",
+    "archived": "📁",
+    "maintenance": "🔧"
+}
+
 # Iconos disponibles para categorías
 CATEGORY_ICONS = [
     "📊", "📈", "📉", "📋", "📞", "💰", "👥", "🌡️", "📱", 
@@ -0,0 +1,175 @@
+"""
+Pool de clientes BigQuery compartido por todo el proceso
+"""
+import atexit
+import socket
+import threading
+from typing import Dict
+
+import google.auth
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import bigquery
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from config import BIGQUERY_POOL_CONFIG
+from instrumentation import logger
+
+# Streamlit ejecuta cada sesión en un hilo distinto del mismo proceso, por lo que
+# el estado del pool vive a nivel de módulo y se protege con un lock
+_lock = threading.Lock()
+_clients: Dict[str, bigquery.Client] = {}
+_sessions: Dict[str, AuthorizedSession] = {}
+_bqstorage_client = None
+_bqwrite_client = None
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """Adaptador HTTP con tamaño de pool y opciones TCP keep-alive configurables"""
+
+    def __init__(self, socket_options, **kwargs):
+        self._socket_options = socket_options
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self._socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _build_socket_options() -> list:
+    """Construir opciones de socket según la configuración de keep-alive"""
+    options = list(HTTPConnection.default_socket_options)
+    if not BIGQUERY_POOL_CONFIG["keep_alive"]:
+        return options
+
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    # TCP_KEEPIDLE / TCP_KEEPINTVL solo existen en Linux (Cloud Run)
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE,
+                        BIGQUERY_POOL_CONFIG["keep_alive_idle_seconds"]))
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL,
+                        BIGQUERY_POOL_CONFIG["keep_alive_interval_seconds"]))
+    return options
+
+
+def _build_session() -> AuthorizedSession:
+    """Crear sesión HTTP autenticada con el pool de conexiones configurado"""
+    credentials, _ = google.auth.default(scopes=bigquery.Client.SCOPE)
+    session = AuthorizedSession(credentials)
+
+    adapter = _KeepAliveAdapter(
+        _build_socket_options(),
+        pool_connections=BIGQUERY_POOL_CONFIG["pool_connections"],
+        pool_maxsize=BIGQUERY_POOL_CONFIG["pool_maxsize"]
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    if not BIGQUERY_POOL_CONFIG["keep_alive"]:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def get_bigquery_client(project_id: str) -> bigquery.Client:
+    """Obtener el cliente BigQuery compartido del proyecto (se crea una sola vez por proceso)"""
+    client = _clients.get(project_id)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(project_id)
+        if client is None:
+            session = _build_session()
+            client = bigquery.Client(project=project_id, _http=session)
+            _sessions[project_id] = session
+            _clients[project_id] = client
+        return client
+
+
+def register_client(project_id: str, client):
+    """Registrar un cliente ya construido para el proyecto (p. ej. un doble en benchmarks)"""
+    with _lock:
+        _clients[project_id] = client
+        _sessions.pop(project_id, None)
+
+
+def get_bqstorage_client():
+    """Obtener el cliente compartido de la Storage Read API (None si no está instalada)"""
+    global _bqstorage_client
+    if _bqstorage_client is not None:
+        return _bqstorage_client
+
+    # Import diferido: la Storage Read API tarda en importarse y solo la usan los resultados grandes
+    try:
+        from google.cloud import bigquery_storage
+    except ImportError:  # dependencia opcional: sin ella las lecturas usan REST
+        return None
+
+    with _lock:
+        if _bqstorage_client is None:
+            credentials, _ = google.auth.default(scopes=bigquery.Client.SCOPE)
+            _bqstorage_client = bigquery_storage.BigQueryReadClient(credentials=credentials)
+        return _bqstorage_client
+
+
+def get_bqwrite_client():
+    """Obtener el cliente compartido de la Storage Write API"""
+    global _bqwrite_client
+    if _bqwrite_client is not None:
+        return _bqwrite_client
+
+    # Import diferido, como en get_bqstorage_client; aquí es obligatorio: el modo storage_write lo requiere
+    from google.cloud import bigquery_storage_v1
+
+    with _lock:
+        if _bqwrite_client is None:
+            credentials, _ = google.auth.default(scopes=bigquery.Client.SCOPE)
+            _bqwrite_client = bigquery_storage_v1.BigQueryWriteClient(credentials=credentials)
+        return _bqwrite_client
+
+
+def get_pool_stats() -> Dict[str, int]:
+    """Obtener contadores de clientes y conexiones HTTP vivas"""
+    with _lock:
+        sessions = list(_sessions.values())
+        grpc_clients = sum(1 for client in (_bqstorage_client, _bqwrite_client) if client is not None)
+        stats = {"clients": len(_clients) + grpc_clients,
+                 "connections_opened": 0, "connections_idle": 0}
+
+    for session in sessions:
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                stats["connections_opened"] += pool.num_connections
+                stats["connections_idle"] += sum(
+                    1 for conn in list(pool.pool.queue) if conn is not None
+                ) if pool.pool is not None else 0
+    return stats
+
+
+def shutdown_clients():
+    """Cerrar todos los clientes y sus conexiones HTTP"""
+    global _bqstorage_client, _bqwrite_client
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        _sessions.clear()
+        # Los clientes gRPC de la Storage Read/Write API se cierran a través de su transporte
+        for grpc_client in (_bqstorage_client, _bqwrite_client):
+            if grpc_client is not None:
+                clients.append(grpc_client.transport)
+        _bqstorage_client = None
+        _bqwrite_client = None
+
+    for client in clients:
+        try:
+            client.close()
+        except Exception:
+            logger.exception("Error closing BigQuery client")
+
+
+atexit.register(shutdown_clients)
@@ -0,0 +1,204 @@
+"""
+Control de costo de las consultas: estimación por dry run, presupuestos por consulta y por sesión
+"""
+import contextvars
+import hashlib
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    # Solo para las anotaciones: el cliente se importa al validar la primera consulta (el
+    # arranque y el backend SQLite no lo cargan)
+    from google.cloud import bigquery
+
+from config import COST_GUARD_CONFIG
+from instrumentation import logger, track_call
+
+
+class QueryBudgetExceeded(Exception):
+    """Consulta bloqueada porque su estimación supera un presupuesto"""
+
+    def __init__(self, operation: str, fingerprint: str, estimated_bytes: int, limit_bytes: int, scope: str):
+        self.operation = operation
+        self.fingerprint = fingerprint
+        self.estimated_bytes = estimated_bytes
+        self.limit_bytes = limit_bytes
+        self.scope = scope  # "query" o "session"
+        detail = "por consulta" if scope == "query" else "restante de la sesión"
+        super().__init__(
+            f"{operation} escanearía ~{format_bytes(estimated_bytes)} "
+            f"(presupuesto {detail}: {format_bytes(limit_bytes)})"
+        )
+
+
+class SessionBudget:
+    """Bytes consumidos por una sesión de Streamlit y consultas bloqueadas pendientes de aviso"""
+
+    def __init__(self, limit_bytes: int):
+        self.limit_bytes = limit_bytes
+        self.spent_bytes = 0
+        self.blocked: Dict[str, QueryBudgetExceeded] = {}  # huella -> bloqueo sin avisar
+        self._allowed: Set[str] = set()  # huellas autorizadas una vez por el usuario
+        self._lock = threading.Lock()
+
+    def clear_blocked(self):
+        """Olvidar los bloqueos anotados hasta ahora"""
+        with self._lock:
+            self.blocked.clear()
+
+    def allow_once(self, fingerprint: str):
+        """Autorizar la próxima ejecución de una consulta bloqueada"""
+        with self._lock:
+            self._allowed.add(fingerprint)
+
+    def remaining_bytes(self) -> int:
+        """Bytes que la sesión todavía puede consumir"""
+        with self._lock:
+            return max(self.limit_bytes - self.spent_bytes, 0)
+
+    def is_allowed(self, fingerprint: str) -> bool:
+        """True si el usuario autorizó esta consulta (sin gastar la autorización)"""
+        with self._lock:
+            return fingerprint in self._allowed
+
+    def consume_allowance(self, fingerprint: str) -> bool:
+        """True (una sola vez) si el usuario autorizó esta consulta"""
+        with self._lock:
+            if fingerprint in self._allowed:
+                self._allowed.discard(fingerprint)
+                return True
+            return False
+
+    def block(self, error: QueryBudgetExceeded):
+        """Anotar una consulta bloqueada para avisar en la UI"""
+        with self._lock:
+            self.blocked[error.fingerprint] = error
+
+    def add(self, bytes_billed: int):
+        """Sumar bytes facturados al consumo"""
+        with self._lock:
+            self.spent_bytes += bytes_billed
+
+
+# Presupuesto de la sesión del rerun en curso; los hilos de precarga lo heredan con copy_context
+_session_budget: contextvars.ContextVar[Optional[SessionBudget]] = contextvars.ContextVar(
+    "session_budget", default=None
+)
+
+
+def set_session_budget(budget: Optional[SessionBudget]):
+    """Asociar el rerun actual a un presupuesto de sesión (None: solo límites por consulta)"""
+    _session_budget.set(budget)
+
+
+def format_bytes(value: int) -> str:
+    """Bytes en la unidad más legible (MB o GB)"""
+    return f"{value / 1e9:.2f} GB" if value >= 1e9 else f"{value / 1e6:.1f} MB"
+
+
+def query_fingerprint(query: str, job_config: Optional["bigquery.QueryJobConfig"]) -> str:
+    """Huella de la forma de una consulta: texto normalizado y nombres/tipos de parámetros, sin valores"""
+    shape = re.sub(r"\s+", " ", query).strip()
+    params = sorted(
+        (getattr(p, "name", None) or "", type(p).__name__, str(getattr(p, "type_", getattr(p, "array_type", ""))))
+        for p in (job_config.query_parameters if job_config else [])
+    )
+    return hashlib.sha1(f"{shape}|{params}".encode()).hexdigest()[:16]
+
+
+class CostGuard:
+    """Estimaciones por dry run cacheadas por huella y control de presupuestos antes de cada consulta"""
+
+    def __init__(self, query_budget_bytes: int, maximum_bytes_billed: int, estimate_ttl_seconds: float):
+        self.query_budget_bytes = query_budget_bytes
+        self.maximum_bytes_billed = maximum_bytes_billed
+        self.estimate_ttl_seconds = estimate_ttl_seconds
+        self._estimates: Dict[str, Tuple[int, float]] = {}  # huella -> (bytes, vence)
+        self._lock = threading.Lock()
+
+    def estimate(self, client: "bigquery.Client", operation: str, query: str,
+                 job_config: Optional["bigquery.QueryJobConfig"]) -> Tuple[str, int]:
+        """Huella y bytes estimados; el dry run (gratuito) se hace una vez por forma de consulta y TTL"""
+        fingerprint = query_fingerprint(query, job_config)
+        with self._lock:
+            cached = self._estimates.get(fingerprint)
+            if cached is not None and cached[1] >= time.monotonic():
+                return fingerprint, cached[0]
+
+        from google.cloud import bigquery
+        dry_run_config = bigquery.QueryJobConfig(
+            dry_run=True, use_query_cache=False,
+            query_parameters=job_config.query_parameters if job_config else []
+        )
+        with track_call(f"{operation}.dry_run", kind="dry_run", fingerprint=fingerprint) as call:
+            job = client.query(query, job_config=dry_run_config)
+            estimated = int(getattr(job, "total_bytes_processed", None) or 0)
+            call["estimated_bytes"] = estimated
+        with self._lock:
+            self._estimates[fingerprint] = (estimated, time.monotonic() + self.estimate_ttl_seconds)
+        return fingerprint, estimated
+
+    def check(self, client: "bigquery.Client", operation: str, query: str,
+              job_config: Optional["bigquery.QueryJobConfig"],
+              consume_allowance: bool = True) -> "bigquery.QueryJobConfig":
+        """Validar la consulta contra los presupuestos y devolver su job_config con maximum_bytes_billed.
+
+        Lanza QueryBudgetExceeded (y lo anota en la sesión para avisar en la UI) si la
+        estimación supera el presupuesto por consulta o lo que le queda a la sesión, salvo
+        que el usuario la haya autorizado. maximum_bytes_billed es el techo duro: BigQuery
+        rechaza el job si fuera a facturar más, aun autorizado o con la estimación desactualizada.
+        Con consume_allowance=False (validar antes de ofrecer una descarga) la autorización
+        queda para la ejecución real. Se llama una vez por operación lógica, fuera de
+        call_with_resilience: los reintentos y las lecturas duplicadas reutilizan el job_config
+        validado en lugar de volver a gastar la autorización.
+        """
+        from google.cloud import bigquery
+        job_config = job_config or bigquery.QueryJobConfig()
+        job_config.maximum_bytes_billed = self.maximum_bytes_billed
+
+        fingerprint, estimated = self.estimate(client, operation, query, job_config)
+        session = _session_budget.get()
+        error = None
+        if estimated > self.query_budget_bytes:
+            error = QueryBudgetExceeded(operation, fingerprint, estimated, self.query_budget_bytes, "query")
+        elif session is not None and estimated > session.remaining_bytes():
+            error = QueryBudgetExceeded(operation, fingerprint, estimated, session.remaining_bytes(), "session")
+
+        if error is not None:
+            allowed = session is not None and (session.consume_allowance(fingerprint) if consume_allowance
+                                               else session.is_allowed(fingerprint))
+            if allowed:
+                logger.warning("Over-budget query allowed by user", extra={"fields": {
+                    "operation": operation, "fingerprint": fingerprint, "estimated_bytes": estimated
+                }})
+                return job_config
+            if session is not None:
+                session.block(error)
+            logger.warning("Query blocked by cost guard", extra={"fields": {
+                "operation": operation, "fingerprint": fingerprint, "estimated_bytes": estimated,
+                "limit_bytes": error.limit_bytes, "scope": error.scope
+            }})
+            raise error
+        return job_config
+
+    def record(self, job):
+        """Sumar al consumo de la sesión los bytes facturados por un job terminado"""
+        session = _session_budget.get()
+        if session is not None:
+            billed = getattr(job, "total_bytes_billed", None) or getattr(job, "total_bytes_processed", None) or 0
+            session.add(int(billed))
+
+    def clear(self):
+        """Olvidar las estimaciones (p. ej. tras migrar el diseño de las tablas)"""
+        with self._lock:
+            self._estimates.clear()
+
+
+# Estimaciones compartidas por todas las sesiones del proceso
+cost_guard = CostGuard(
+    COST_GUARD_CONFIG["query_budget_bytes"],
+    COST_GUARD_CONFIG["maximum_bytes_billed"],
+    COST_GUARD_CONFIG["estimate_ttl_seconds"]
+)
@@ -1,48 +1,595 @@
 """
-Conexión y operaciones con BigQuery para el sistema de administración
+Operaciones sobre categorías y trabajos para el sistema de administración.
+
+El motor de almacenamiento (BigQuery o SQLite local) se elige en config.STORAGE_BACKEND;
+esta capa agrega la caché compartida y el índice por clave primaria.
 """
-import os
-from google.cloud import bigquery
-from google.oauth2 import service_account
+import atexit
+import contextvars
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Optional
+import pyarrow as pa
+from typing import Any, BinaryIO, Callable, Iterable, List, Dict, Optional, Tuple
+
+from backends import (CATEGORIES_TABLE, CURRENT_TIMESTAMP, WORKS_LATEST_VIEW, WORKS_TABLE, StorageBackend,
+                      TableSpec, get_backend)
+from config import (CACHE_CONFIG, DELTA_SYNC_CONFIG, EXPORT_CONFIG, PREFETCH_CONFIG, SEARCH_CONFIG,
+                    TABLE_LAYOUT_CONFIG, WRITE_BEHIND_CONFIG)
+from instrumentation import logger, record_call
+from search import SearchIndex
+from write_queue import WriteBehindQueue
+
+class SnapshotCache:
+    """Caché LRU con TTL compartida por todas las sesiones del proceso.
+
+    Las claves son tuplas cuyo primer elemento es el espacio de nombres
+    ("categories", "works"), lo que permite invalidar todo lo derivado de una tabla.
+    Los snapshots completos (namespace, "all") no cuentan para max_entries ni se
+    desalojan: hay uno por tabla, y muchas lecturas puntuales chicas no deben sacar
+    de memoria el más caro de recargar.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Tuple, List] = {}  # clave -> [lock, cargas que lo usan]
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """Obtener valor vigente o None si no existe o expiró"""
+        with self._lock:
+            entry = self._entries.get(key)
+            # Las entradas expiradas se conservan (hasta que el LRU las desaloje) como base
+            # de get_or_refresh
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple, value: Any, generation: Optional[int] = None):
+        """Guardar valor y desalojar las entradas menos usadas si se supera el límite"""
+        with self._lock:
+            # Una escritura invalidó el espacio de nombres durante la carga: el valor ya es viejo
+            if generation is not None and generation != self._generations.get(key[0], 0):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            # Orden del OrderedDict: de la menos a la más usada
+            evictable = [k for k in self._entries if k[1:2] != ("all",)]
+            for k in evictable[:max(len(evictable) - self.max_entries, 0)]:
+                del self._entries[k]
+
+    @contextmanager
+    def _load_lock(self, key: Tuple):
+        """Lock de carga de la clave; se elimina cuando ninguna carga lo usa, así el mapa
+        no crece con cada página, ID o detalle leído"""
+        with self._lock:
+            entry = self._load_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._load_locks[key]
+
+    def get_or_load(self, key: Tuple, loader: Callable[[], Any]) -> Any:
+        """Lectura read-through: una sola carga concurrente por clave"""
+        value = self.get(key)
+        record_call("cache", logging.DEBUG, kind="cache", key=":".join(map(str, key[:2])),
+                    cache="hit" if value is not None else "miss")
+        if value is not None:
+            return value
+
+        with self._load_lock(key):
+            # Otra sesión pudo haber cargado el valor mientras esperábamos
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] >= time.monotonic():
+                    return entry[1]
+                generation = self._generations.get(key[0], 0)
+            value = loader()
+            self.put(key, value, generation)
+            return value
+
+    def get_or_refresh(self, key: Tuple, loader: Callable[[], Any],
+                       refresher: Callable[[Any], Any]) -> Any:
+        """Como get_or_load, pero si hay un valor expirado lo actualiza con refresher(valor)
+        en lugar de volver a cargarlo completo"""
+        value = self.get(key)
+        record_call("cache", logging.DEBUG, kind="cache", key=":".join(map(str, key[:2])),
+                    cache="hit" if value is not None else "miss")
+        if value is not None:
+            return value
+
+        with self._load_lock(key):
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] >= time.monotonic():
+                    return entry[1]
+                stale = entry[1] if entry is not None else None
+                generation = self._generations.get(key[0], 0)
+            value = refresher(stale) if stale is not None else loader()
+            self.put(key, value, generation)
+            return value
+
+    def update_entry(self, key: Tuple, transform: Callable[[Any], Any]):
+        """Reemplazar el valor de una entrada existente (vigente o expirada) por transform(valor)"""
+        with self._lock:
+            # Una carga en curso leyó los datos anteriores: su resultado no debe pisar este
+            self._generations[key[0]] = self._generations.get(key[0], 0) + 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], transform(entry[1]))
+
+    def update_entries(self, prefix: Tuple, transform: Callable[[Tuple, Any], Optional[Any]]):
+        """Como update_entry, para todas las entradas cuya clave empieza por prefix; si
+        transform(clave, valor) devuelve None, la entrada se elimina"""
+        with self._lock:
+            self._generations[prefix[0]] = self._generations.get(prefix[0], 0) + 1
+            for key in [k for k in self._entries if k[:len(prefix)] == prefix]:
+                expires_at, value = self._entries[key]
+                value = transform(key, value)
+                if value is None:
+                    del self._entries[key]
+                else:
+                    self._entries[key] = (expires_at, value)
+
+    def discard(self, namespace: str):
+        """Eliminar todas las entradas de un espacio de nombres (la próxima lectura es completa)"""
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[key]
+
+    def invalidate(self, namespace: str):
+        """Expirar todas las entradas de un espacio de nombres"""
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for key in [k for k in self._entries if k[0] == namespace]:
+                self._entries[key] = (0.0, self._entries[key][1])
+
+    def clear(self):
+        """Vaciar la caché completa"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Obtener contadores de uso de la caché"""
+        with self._lock:
+            pinned = sum(1 for key in self._entries if key[1:2] == ("all",))
+            return {"entries": len(self._entries), "pinned": pinned, "hits": self.hits, "misses": self.misses}
+    
+    def memory_report(self) -> List[Dict]:
+        """Filas y bytes de cada snapshot en caché (vigente o expirado), de mayor a menor"""
+        with self._lock:
+            snapshots = [(key, value) for key, (_, value) in self._entries.items() if isinstance(value, Snapshot)]
+        report = [{"key": ":".join(map(str, key[:2])), "rows": len(snapshot.dataframe),
+                   "bytes": snapshot.memory_bytes()} for key, snapshot in snapshots]
+        return sorted(report, key=lambda entry: entry["bytes"], reverse=True)
+
+
+# Texto en Arrow con NaN como faltante: el tipo "str" por defecto de pandas >= 3 (requirements.txt)
+TEXT_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+
+_SNAPSHOT_DTYPES = {
+    "STRING": TEXT_DTYPE,
+    "INT64": "Int64",
+    "BOOL": "boolean",
+    "ARRAY<STRING>": pd.ArrowDtype(pa.list_(pa.string()))
+}
+
+def compact_dataframe(df: pd.DataFrame, table: TableSpec) -> pd.DataFrame:
+    """DataFrame con los tipos compactos de los snapshots.
+    
+    Las columnas de table.categorical_columns pasan a categóricas (con las categorías
+    ordenadas, para que ordenar por ellas equivalga al ORDER BY), el resto del texto y las
+    listas a Arrow, las fechas a datetime UTC y enteros y booleanos a tipos con nulos.
+    Las columnas que ya tienen el tipo destino no se copian.
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        column_type = table.columns.get(column)
+        if column in table.categorical_columns:
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype("category")
+            elif not values.cat.categories.is_monotonic_increasing:
+                values = values.cat.set_categories(values.cat.categories.sort_values())
+        elif column_type == "TIMESTAMP":
+            if not isinstance(values.dtype, pd.DatetimeTZDtype):
+                values = pd.to_datetime(values, utc=True)
+        elif column_type in _SNAPSHOT_DTYPES and values.dtype != _SNAPSHOT_DTYPES[column_type]:
+            values = values.astype(_SNAPSHOT_DTYPES[column_type])
+        columns[column] = values
+    return pd.DataFrame(columns, index=df.index)
+
+def _missing_to_none(value: Any) -> Any:
+    """None en lugar de NaN, NaT o pd.NA (los registros se usan como valores de formularios)"""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return value
+    return None if pd.isna(value) else value
+
+def _apply_row_changes(dataframe: pd.DataFrame, mask: pd.Series, row_changes: Dict, now: pd.Timestamp):
+    """Asignar row_changes a las filas de mask, en el mismo DataFrame (las columnas que no tiene se omiten)"""
+    for target, new_value in row_changes.items():
+        if target not in dataframe:
+            continue
+        if isinstance(new_value, (list, tuple)):
+            # Arreglos (tags): mask() los interpretaría como una columna completa, y las
+            # listas Arrow no se asignan por celda
+            dataframe[target] = dataframe[target].astype(object)
+            location = dataframe.columns.get_loc(target)
+            for position in mask.to_numpy().nonzero()[0]:
+                dataframe.iat[position, location] = list(new_value)
+        else:
+            new_value = now if new_value is CURRENT_TIMESTAMP else new_value
+            values = dataframe[target]
+            if (isinstance(values.dtype, pd.CategoricalDtype) and not pd.isna(new_value)
+                    and new_value not in values.cat.categories):
+                values = values.cat.add_categories([new_value])
+            dataframe[target] = values.mask(mask, new_value)
+
+class Snapshot:
+    """Copia en memoria de una tabla con índice hash por clave primaria"""
+
+    def __init__(self, dataframe: pd.DataFrame, key_column: str, full_load_at: Optional[float] = None):
+        self.dataframe = dataframe
+        self.key_column = key_column
+        self._memory_bytes: Optional[int] = None
+        self._positions: Optional[pd.Index] = None
+        self._search_index: Optional[SearchIndex] = None
+        self._document_positions: Optional[np.ndarray] = None  # documento del índice -> fila
+        self._search_lock = threading.Lock()
+        # Marca de agua: el mayor updated_date presente en el snapshot
+        watermark = dataframe["updated_date"].max() if "updated_date" in dataframe else None
+        self.watermark = None if pd.isna(watermark) else watermark
+        self.full_load_at = full_load_at if full_load_at is not None else time.monotonic()
+
+    def memory_bytes(self) -> int:
+        """Bytes que ocupa el DataFrame (incluido el contenido del texto)"""
+        if self._memory_bytes is None:
+            self._memory_bytes = int(self.dataframe.memory_usage(deep=True).sum())
+        return self._memory_bytes
+
+    def _key_positions(self) -> pd.Index:
+        """Índice clave -> posición en el DataFrame"""
+        if self._positions is None:
+            self._positions = pd.Index(self.dataframe[self.key_column])
+        return self._positions
+
+    def rows(self, keys: List[str]) -> pd.DataFrame:
+        """Filas de las claves indicadas, en ese orden (las que no están se omiten)"""
+        positions = self._key_positions().get_indexer(keys)
+        return self.dataframe.iloc[positions[positions >= 0]]
+
+    def search_index(self, fields: Dict[str, float],
+                     detail_batches: Optional[Callable[[], Iterable[pd.DataFrame]]] = None) -> SearchIndex:
+        """Índice de búsqueda del snapshot; se construye en la primera búsqueda.
+        
+        Los campos que el snapshot no tiene (columnas de detalle) se indexan desde
+        detail_batches(), lotes con la clave y esos campos que se descartan tras tokenizarlos.
+        """
+        with self._search_lock:
+            if self._search_index is None:
+                self._search_index = SearchIndex.from_dataframe(
+                    self.dataframe, self.key_column, fields, detail_batches() if detail_batches else ()
+                )
+            return self._search_index
+
+    def search(self, query: str, fields: Dict[str, float],
+               detail_batches: Optional[Callable[[], Iterable[pd.DataFrame]]] = None) -> np.ndarray:
+        """Posiciones en el DataFrame de los registros que coinciden con la consulta, por relevancia"""
+        index = self.search_index(fields, detail_batches)
+        ordinals, _ = index.rank(query)
+        with self._search_lock:
+            # El índice puede haber sumado documentos desde el último cálculo (snapshots derivados)
+            if self._document_positions is None or len(self._document_positions) <= ordinals.max(initial=-1):
+                self._document_positions = self._key_positions().get_indexer(index.keys())
+            positions = self._document_positions[ordinals]
+        return positions[positions >= 0]
+
+    def _carry_search_index(self, snapshot: "Snapshot", changed_keys: List[str],
+                            changed_rows: Optional[pd.DataFrame] = None) -> "Snapshot":
+        """Pasar el índice de búsqueda ya construido a un snapshot derivado, reindexando solo lo que cambió.
+        
+        changed_rows (por defecto las filas del snapshot nuevo) puede traer además las
+        columnas de detalle, que el snapshot no guarda.
+        """
+        if self._search_index is not None:
+            self._search_index.remove(changed_keys)
+            rows = changed_rows if changed_rows is not None else snapshot.rows(changed_keys)
+            self._search_index.add_rows(rows, self.key_column)
+            snapshot._search_index = self._search_index
+        return snapshot
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """Buscar registro por clave (índice hash de posiciones); devuelve una copia"""
+        position = self._key_positions().get_indexer([key])[0]
+        if position < 0:
+            return None
+        record = self.dataframe.iloc[[position]].to_dict('records')[0]
+        return {column: _missing_to_none(value) for column, value in record.items()}
+
+    def merge(self, changes: pd.DataFrame, table: TableSpec) -> "Snapshot":
+        """Nuevo snapshot con las filas cambiadas reemplazadas por clave primaria.
+        
+        Las filas que dejaron de estar activas (categorías archivadas) salen del snapshot;
+        el resultado conserva el orden de la tabla.
+        """
+        changed_keys = list(changes[self.key_column])
+        unchanged = self.dataframe[~self.dataframe[self.key_column].isin(changed_keys)]
+        if table.active_column:
+            changes = changes[changes[table.active_column].fillna(False).astype(bool)]
+        # Las categóricas con categorías distintas se combinan como object: se vuelven a compactar
+        merged = compact_dataframe(pd.concat([unchanged, changes[self.dataframe.columns]], ignore_index=True), table)
+        order = table.keyset_order
+        merged = merged.sort_values([column for column, _ in order],
+                                    ascending=[not descending for _, descending in order],
+                                    ignore_index=True)
+        # Las filas cambiadas traen las columnas de detalle que indexa la búsqueda (delta_columns)
+        snapshot = Snapshot(merged, self.key_column, self.full_load_at)
+        return self._carry_search_index(snapshot, changed_keys, changes)
+
+    def delta_columns(self, table: TableSpec) -> List[str]:
+        """Columnas a leer en una sincronización incremental: las del snapshot y, solo si el índice
+        de búsqueda ya existe, las de detalle que indexa (el resto se lee al abrir el registro)"""
+        indexed = self._search_index.fields if self._search_index is not None else {}
+        return table.snapshot_columns + [column for column in table.detail_columns if column in indexed]
+    
+    def apply_changes(self, table: TableSpec, changes: List[Tuple[str, Dict]],
+                      column: Optional[str] = None) -> "Snapshot":
+        """Nuevo snapshot con los cambios aplicados en memoria (escritura optimista).
+        
+        Cada par (valor, cambios) modifica las filas cuya columna column (por defecto la
+        clave) tiene ese valor; updated_date no cambia, así la sincronización incremental
+        trae la fila real cuando la escritura se confirma.
+        """
+        column = column or self.key_column
+        dataframe = self.dataframe.copy()
+        now = pd.Timestamp.now(tz="UTC")
+        changed_keys = list(dataframe.loc[dataframe[column].isin([value for value, _ in changes]), self.key_column])
+        for value, row_changes in changes:
+            _apply_row_changes(dataframe, dataframe[column] == value, row_changes, now)
+        if table.active_column:
+            dataframe = dataframe[dataframe[table.active_column].fillna(False).astype(bool)]
+        snapshot = Snapshot(compact_dataframe(dataframe.reset_index(drop=True), table), self.key_column,
+                            self.full_load_at)
+        # Las columnas de detalle no están en el snapshot: se reindexan con lo que traen los cambios.
+        # Las que no cambian quedan fuera del índice hasta que la sincronización traiga la fila real
+        changed_rows = snapshot.rows(changed_keys)
+        detail_fields = [field for field in table.detail_columns
+                         if any(field in row_changes for _, row_changes in changes)]
+        if detail_fields and column == self.key_column:
+            changed_rows = changed_rows.copy()
+            details = dict(changes)
+            for field in detail_fields:
+                changed_rows[field] = changed_rows[self.key_column].map(lambda key: details.get(key, {}).get(field))
+        return self._carry_search_index(snapshot, changed_keys, changed_rows)
+
+# Columnas de works_index que se pueden proyectar en el listado paginado
+WORKS_LIST_COLUMNS = [
+    "work_id", "work_name", "work_slug", "category", "subcategory", "status",
+    "version", "is_latest", "short_description", "image_preview_url",
+    "created_date", "updated_date", "activated_date", "archived_date",
+    "work_url", "tags"
+]
+
+# Caché única del proceso, compartida por todas las sesiones de Streamlit
+snapshot_cache = SnapshotCache(CACHE_CONFIG["max_entries"], CACHE_CONFIG["ttl_seconds"])
+
+# Vistas filtradas (shared/schema.py) a las que se redirigen los listados que piden su filtro
+READ_VIEWS = [WORKS_LATEST_VIEW]
+
+def read_source(table: TableSpec, filters: Dict) -> Tuple[TableSpec, Dict]:
+    """Tabla o vista de la que leer un listado y los filtros que quedan por aplicar.
+    
+    Si una vista de la tabla ya aplica parte de los filtros (p. ej. is_latest = true), el
+    listado la lee a ella: la consulta escanea solo esas filas y el filtro sale del WHERE.
+    """
+    if not TABLE_LAYOUT_CONFIG["use_latest_view"]:
+        return table, filters
+    for view in READ_VIEWS:
+        if view.view_of is table and all(filters.get(c) == v for c, v in view.view_filter.items()):
+            return view, {c: v for c, v in filters.items() if c not in view.view_filter}
+    return table, filters
+
+def load_snapshot(backend: StorageBackend, table: TableSpec, snapshot: Optional[Snapshot] = None) -> Snapshot:
+    """Cargar la tabla completa o, si hay un snapshot previo, solo lo que cambió desde su marca de agua.
+    
+    Primero se consulta MAX(updated_date), que lee una sola columna: si no supera la marca
+    de agua, el snapshot se reutiliza tal cual. Si no, se leen las filas con updated_date
+    posterior a la marca (menos un margen de solapamiento) y se combinan por clave, con las
+    columnas del snapshot (ver Snapshot.delta_columns).
+    """
+    stale_after = time.monotonic() - DELTA_SYNC_CONFIG["full_refresh_seconds"]
+    if (snapshot is None or not DELTA_SYNC_CONFIG["enabled"] or snapshot.watermark is None
+            or snapshot.full_load_at < stale_after):
+        return Snapshot(compact_dataframe(backend.get_all(table, table.snapshot_columns), table), table.key_column)
+    
+    max_updated = backend.get_max_updated(table)
+    if max_updated is None or max_updated <= snapshot.watermark:
+        return snapshot
+    
+    since = snapshot.watermark - pd.Timedelta(seconds=DELTA_SYNC_CONFIG["overlap_seconds"])
+    changes = backend.get_changed(table, since, snapshot.delta_columns(table))
+    logger.debug("Delta sync", extra={"fields": {"table": table.name, "since": since, "rows": len(changes)}})
+    return snapshot.merge(changes, table)
+
+# Espacio de nombres de la caché de cada tabla
+TABLE_NAMESPACES = {CATEGORIES_TABLE.name: "categories", WORKS_TABLE.name: "works"}
+
+def _on_writes_flushed(table: TableSpec, ok: bool):
+    """Tras confirmar un lote, la sincronización incremental trae las filas reales; si falló,
+    se descarta el snapshot optimista"""
+    namespace = TABLE_NAMESPACES[table.name]
+    if ok:
+        snapshot_cache.invalidate(namespace)
+    else:
+        snapshot_cache.discard(namespace)
+
+def patch_page(page: Tuple[pd.DataFrame, Optional[Dict]], filters: Dict, table: TableSpec,
+               changes: List[Tuple[str, Dict]], column: Optional[str] = None) -> Optional[Tuple]:
+    """Página de list_works en caché con los cambios aplicados (escritura optimista).
+    
+    Como en Snapshot.apply_changes, cada par (valor, cambios) modifica las filas cuya columna
+    column (por defecto la clave) tiene ese valor. Las filas que dejan de cumplir un filtro de
+    igualdad de la página salen de ella; el orden y el cursor se corrigen cuando la escritura
+    se confirma. Devuelve None (descartar la página) si no tiene la columna.
+    """
+    page_df, next_cursor = page
+    column = column or table.key_column
+    if column not in page_df:
+        return None
+    dataframe = page_df.copy()
+    now = pd.Timestamp.now(tz="UTC")
+    keep = np.ones(len(dataframe), dtype=bool)
+    for value, row_changes in changes:
+        mask = dataframe[column].eq(value).fillna(False).astype(bool)
+        if not mask.any():
+            continue
+        _apply_row_changes(dataframe, mask, row_changes, now)
+        if any(name in row_changes and row_changes[name] != filter_value
+               for name, filter_value in filters.items() if name in table.columns):
+            keep &= ~mask.to_numpy()
+    return dataframe[keep].reset_index(drop=True), next_cursor
+
+# Cola única del proceso para las escrituras diferidas
+write_queue = WriteBehindQueue(WRITE_BEHIND_CONFIG["max_pending"], WRITE_BEHIND_CONFIG["batch_window_seconds"],
+                               WRITE_BEHIND_CONFIG["max_batch"])
+write_queue.on_flushed = _on_writes_flushed
+atexit.register(write_queue.drain)
+
+def enqueue_writes(table: TableSpec, kind: str, changes: List[Tuple[str, Dict]],
+                   children: Optional[Tuple[TableSpec, str]] = None) -> Optional[List[str]]:
+    """Encolar escrituras y aplicarlas de inmediato al snapshot y a las páginas en caché.
+    
+    Devuelve los IDs para seguir su estado, o None si la escritura diferida está
+    desactivada o la cola está llena: en ese caso quien llama escribe de forma síncrona.
+    """
+    if not WRITE_BEHIND_CONFIG["enabled"]:
+        return None
+    try:
+        write_ids = write_queue.submit(table, kind, changes, children)
+    except queue.Full:
+        logger.warning("Write queue full, writing synchronously", extra={"fields": {"table": table.name}})
+        return None
+    
+    namespace = TABLE_NAMESPACES[table.name]
+    try:
+        snapshot_cache.update_entry((namespace, "all"), lambda snapshot: snapshot.apply_changes(table, changes))
+        # Cache key de una página: (namespace, "page", columnas, filtros, tamaño, cursor)
+        snapshot_cache.update_entries((namespace, "page"),
+                                      lambda key, page: patch_page(page, dict(key[3]), table, changes))
+        for key, row_changes in changes:
+            detail_changes = {c: v for c, v in row_changes.items() if c in table.detail_columns}
+            if detail_changes:
+                snapshot_cache.update_entry((namespace, "details", key),
+                                            lambda details, detail_changes=detail_changes: {**details, **detail_changes})
+        if children:
+            child_table, foreign_key = children
+            child_changes = [(key, child_table.archive_values) for key, _ in changes]
+            namespace = TABLE_NAMESPACES[child_table.name]
+            snapshot_cache.update_entry((namespace, "all"),
+                                        lambda snapshot: snapshot.apply_changes(child_table, child_changes, foreign_key))
+            snapshot_cache.update_entries(
+                (namespace, "page"),
+                lambda key, page: patch_page(page, dict(key[3]), child_table, child_changes, foreign_key)
+            )
+    except Exception:
+        # Las escrituras ya están encoladas: sin copia optimista, la próxima lectura es completa
+        logger.exception("Error applying queued writes to cache", extra={"fields": {"namespace": namespace}})
+        snapshot_cache.discard(namespace)
+    return write_ids
+
+# Pool de hilos para lanzar consultas independientes a la vez
+_prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_CONFIG["max_workers"],
+                                    thread_name_prefix="db-prefetch")
+
+def prefetch(loaders: Dict[str, Callable[[], Any]]) -> Dict[str, Exception]:
+    """Ejecutar cargas en paralelo y esperar a que terminen todas.
+    
+    Los resultados quedan en snapshot_cache, donde los leen después las funciones de
+    render; la espera total es la de la carga más lenta y no la suma de todas. Los
+    errores se registran y se devuelven para que el render los reintente y los muestre.
+    """
+    futures = {
+        # copy_context mantiene el registro de instrumentación del rerun en los hilos
+        name: _prefetch_pool.submit(contextvars.copy_context().run, loader)
+        for name, loader in loaders.items()
+    }
+    errors = {}
+    for name, future in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            logger.exception("Error prefetching data", extra={"fields": {"namespace": name}})
+            errors[name] = e
+    return errors
 
 class CategoriesDatabase:
     def __init__(self):
-        """Inicializar conexión a BigQuery para categorías"""
-        self.project_id = "platform-partners-des"
-        self.dataset_id = "settings"
-        self.table_id = "works_categories"
-        self.table_ref = f"{self.project_id}.{self.dataset_id}.{self.table_id}"
-        
-        # Inicializar cliente BigQuery
-        self.client = bigquery.Client(project=self.project_id)
+        """Inicializar acceso a categorías con el backend configurado"""
+        self.backend = get_backend()
+        self.table = CATEGORIES_TABLE
+        self.last_write_ids: List[str] = []  # escrituras diferidas de la última operación
     
     def get_all_categories(self) -> pd.DataFrame:
-        """Obtener todas las categorías activas"""
-        query = f"""
-        SELECT *
-        FROM `{self.table_ref}`
-        WHERE is_active = true
-        ORDER BY display_order, category_name
-        """
-        return self.client.query(query).to_dataframe()
+        """Obtener todas las categorías activas (desde caché si está vigente)"""
+        snapshot = snapshot_cache.get_or_refresh(
+            ("categories", "all"), self._load_all_categories, self._load_all_categories
+        )
+        # Copia superficial: comparte los datos con el snapshot; con Copy-on-Write (pandas >= 3,
+        # requirements.txt) modificarla no lo toca
+        return snapshot.dataframe.copy(deep=False)
+    
+    def _load_all_categories(self, snapshot: Optional[Snapshot] = None) -> Snapshot:
+        """Consultar las categorías activas en el backend (solo los cambios si hay snapshot previo)"""
+        return load_snapshot(self.backend, self.table, snapshot)
+    
+    def export_categories(self, fmt: str, compress: bool = True) -> BinaryIO:
+        """Exportar todas las categorías, incluidas las inactivas, a un archivo temporal (ver export_table)"""
+        from export import export_table
+        return export_table(self.backend, self.table, {}, fmt, compress)
+    
+    def check_export_cost(self):
+        """Validar el costo de export_categories antes de ofrecerla (lanza QueryBudgetExceeded)"""
+        from export import check_export_cost
+        check_export_cost(self.backend, self.table, {})
+    
+    def get_all_category_ids(self) -> List[str]:
+        """IDs de todas las categorías, incluidas las inactivas (consulta solo de claves, sin caché)"""
+        return self.backend.get_keys(self.table)
     
     def get_category_by_id(self, category_id: str) -> Optional[Dict]:
-        """Obtener categoría por ID"""
-        query = f"""
-        SELECT *
-        FROM `{self.table_ref}`
-        WHERE category_id = @category_id
-        LIMIT 1
-        """
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("category_id", "STRING", category_id)
-            ]
+        """Obtener categoría por ID (índice en memoria; backend solo si no está cargada)"""
+        snapshot = snapshot_cache.get(("categories", "all"))
+        if snapshot is not None:
+            category = snapshot.lookup(category_id)
+            if category is not None:
+                return category
+        
+        # Fuera del snapshot (p. ej. categorías archivadas): consulta puntual cacheada
+        category = snapshot_cache.get_or_load(
+            ("categories", "by_id", category_id),
+            lambda: self.backend.get_by_id(self.table, category_id)
         )
-        result = self.client.query(query, job_config=job_config).to_dataframe()
-        return result.to_dict('records')[0] if not result.empty else None
+        return dict(category) if category else None
     
     def create_category(self, category_data: Dict) -> bool:
         """Crear nueva categoría"""
@@ -50,121 +597,221 @@ class CategoriesDatabase:
             from datetime import datetime
             
             current_time = datetime.now().isoformat()
-            row_to_insert = {
-                "category_id": category_data["category_id"],
-                "category_name": category_data["category_name"],
-                "category_icon": category_data.get("category_icon", "📊"),
-                "description": category_data.get("description", ""),
-                "display_order": category_data.get("display_order", 999),
-                "is_active": True,
-                "created_date": current_time,
-                "updated_date": current_time
-            }
-            
-            errors = self.client.insert_rows_json(self.table_ref, [row_to_insert])
-            return len(errors) == 0
+            row_to_insert = self._build_category_row(category_data, current_time)
             
-        except Exception as e:
-            print(f"Error creating category: {e}")
+            created = self.backend.create(self.table, [row_to_insert])
+            snapshot_cache.invalidate("categories")
+            return created
+            
+        except Exception:
+            logger.exception("Error creating category")
             return False
     
+    def create_categories_bulk(self, categories: List[Dict]) -> int:
+        """Crear muchas categorías en lotes; devuelve filas cargadas"""
+        from datetime import datetime
+        
+        current_time = datetime.now().isoformat()
+        rows = [self._build_category_row(category, current_time) for category in categories]
+        try:
+            return self.backend.create_bulk(self.table, rows)
+        except Exception:
+            logger.exception("Error creating categories")
+            return 0
+        finally:
+            snapshot_cache.invalidate("categories")
+    
+    def _build_category_row(self, category_data: Dict, current_time: str) -> Dict:
+        """Armar la fila a insertar con los valores por defecto de la tabla"""
+        return {
+            "category_id": category_data["category_id"],
+            "category_name": category_data["category_name"],
+            "category_icon": category_data.get("category_icon", "📊"),
+            "description": category_data.get("description", ""),
+            "display_order": category_data.get("display_order", 999),
+            "is_active": True,
+            "created_date": current_time,
+            "updated_date": current_time
+        }
+    
     def update_category(self, category_id: str, update_data: Dict) -> bool:
-        """Actualizar categoría existente usando MERGE"""
+        """Actualizar categoría existente"""
+        return self.update_categories_bulk([(category_id, update_data)])
+    
+    def update_categories_bulk(self, updates: List[Tuple[str, Dict]]) -> bool:
+        """Actualizar muchas categorías en una sola operación (un MERGE en BigQuery).
+        
+        Con escritura diferida, el cambio se ve al instante en la caché y se confirma en
+        segundo plano; sus IDs quedan en last_write_ids.
+        """
         try:
-            set_clauses = []
-            for key, value in update_data.items():
-                if key != "category_id":
-                    if isinstance(value, str):
-                        set_clauses.append(f"{key} = source.{key}")
-                    else:
-                        set_clauses.append(f"{key} = source.{key}")
-            
-            if not set_clauses:
+            updates = [(category_id, data) for category_id, data in updates
+                       if any(key != "category_id" for key in data)]
+            if not updates:
+                return True
+            
+            write_ids = enqueue_writes(self.table, "update", updates)
+            if write_ids is not None:
+                self.last_write_ids = write_ids
                 return True
             
-            # Construir valores para el MERGE
-            values = []
-            for key, value in update_data.items():
-                if key != "category_id":
-                    if isinstance(value, str):
-                        values.append(f"'{value}' as {key}")
-                    else:
-                        values.append(f"{value} as {key}")
-            
-            query = f"""
-            MERGE `{self.table_ref}` AS target
-            USING (
-                SELECT '{category_id}' as category_id, {', '.join(values)}
-            ) AS source
-            ON target.category_id = source.category_id
-            WHEN MATCHED THEN
-                UPDATE SET {', '.join(set_clauses)}, updated_date = CURRENT_TIMESTAMP()
-            """
-            
-            job = self.client.query(query)
-            job.result()
+            self.backend.update(self.table, updates)
+            snapshot_cache.invalidate("categories")
             return True
             
-        except Exception as e:
-            print(f"Error updating category: {e}")
+        except Exception:
+            logger.exception("Error updating categories")
             return False
     
     def archive_category(self, category_id: str) -> bool:
-        """Archivar categoría (soft delete) usando MERGE"""
+        """Archivar categoría (soft delete)"""
+        return self.archive_categories_bulk([category_id])
+    
+    def archive_categories_bulk(self, category_ids: List[str], include_works: bool = False) -> bool:
+        """Archivar muchas categorías en una sola operación.
+        
+        Con include_works también se archivan sus trabajos en la misma operación
+        (una transacción multi-sentencia en BigQuery) en lugar de una por trabajo.
+        """
         try:
-            query = f"""
-            MERGE `{self.table_ref}` AS target
-            USING (
-                SELECT '{category_id}' as category_id
-            ) AS source
-            ON target.category_id = source.category_id
-            WHEN MATCHED THEN
-                UPDATE SET is_active = false, updated_date = CURRENT_TIMESTAMP()
-            """
-            
-            job = self.client.query(query)
-            job.result()
+            if not category_ids:
+                return True
+            
+            children = (WORKS_TABLE, "category") if include_works else None
+            write_ids = enqueue_writes(self.table, "archive",
+                                       [(category_id, self.table.archive_values) for category_id in category_ids],
+                                       children)
+            if write_ids is not None:
+                self.last_write_ids = write_ids
+                return True
+            
+            self.backend.archive(self.table, list(category_ids), children)
+            snapshot_cache.invalidate("categories")
+            if include_works:
+                snapshot_cache.invalidate("works")
             return True
             
-        except Exception as e:
-            print(f"Error archiving category: {e}")
+        except Exception:
+            logger.exception("Error archiving categories")
             return False
 
 class WorksDatabase:
     def __init__(self):
-        """Inicializar conexión a BigQuery para trabajos"""
-        self.project_id = "platform-partners-des"
-        self.dataset_id = "settings"
-        self.table_id = "works_index"
-        self.table_ref = f"{self.project_id}.{self.dataset_id}.{self.table_id}"
-        
-        # Inicializar cliente BigQuery
-        self.client = bigquery.Client(project=self.project_id)
+        """Inicializar acceso a trabajos con el backend configurado"""
+        self.backend = get_backend()
+        self.table = WORKS_TABLE
+        self.last_write_ids: List[str] = []  # escrituras diferidas de la última operación
     
     def get_all_works(self) -> pd.DataFrame:
-        """Obtener todos los trabajos"""
-        query = f"""
-        SELECT *
-        FROM `{self.table_ref}`
-        ORDER BY category, created_date DESC
+        """Obtener todos los trabajos sin las columnas de detalle (desde caché si está vigente)"""
+        snapshot = snapshot_cache.get_or_refresh(
+            ("works", "all"), self._load_all_works, self._load_all_works
+        )
+        # Copia superficial: comparte los datos con el snapshot; con Copy-on-Write (pandas >= 3,
+        # requirements.txt) modificarla no lo toca
+        return snapshot.dataframe.copy(deep=False)
+    
+    def _load_all_works(self, snapshot: Optional[Snapshot] = None) -> Snapshot:
+        """Consultar todos los trabajos en el backend (solo los cambios si hay snapshot previo)"""
+        return load_snapshot(self.backend, self.table, snapshot)
+    
+    def list_works(self, columns: Optional[List[str]] = None, filters: Optional[Dict] = None,
+                   page_size: int = 50, cursor: Optional[Dict] = None) -> Tuple[pd.DataFrame, Optional[Dict]]:
+        """Listar trabajos paginados por keyset con proyección y filtros en el servidor.
+        
+        filters admite: category, status, is_latest, tag, created_from, created_to.
+        Devuelve la página y el cursor de la siguiente (None si es la última).
+        """
+        columns = list(columns or WORKS_LIST_COLUMNS)
+        unknown = [c for c in columns if c not in WORKS_LIST_COLUMNS]
+        if unknown:
+            raise ValueError(f"Columnas no permitidas en el listado: {', '.join(unknown)}")
+        filters = {k: v for k, v in (filters or {}).items() if v is not None and v != ""}
+        
+        cache_key = (
+            "works", "page", tuple(columns), tuple(sorted(filters.items())), page_size,
+            tuple(cursor[c] for c, _ in self.table.keyset_order) if cursor else None
+        )
+        source, source_filters = read_source(self.table, filters)
+        # La página en caché guarda también la clave (la consulta ya la lee para el cursor), para
+        # aplicarle las escrituras diferidas (patch_page)
+        page_columns = columns + [self.table.key_column] if self.table.key_column not in columns else columns
+        page_df, next_cursor = snapshot_cache.get_or_load(
+            cache_key, lambda: self.backend.list_page(source, page_columns, source_filters, page_size, cursor)
+        )
+        return page_df[columns].copy(), next_cursor
+    
+    def export_works(self, fmt: str, filters: Optional[Dict] = None, compress: bool = True) -> BinaryIO:
+        """Exportar los trabajos que cumplen los filtros de list_works a un archivo temporal (ver export_table).
+        
+        Lee del backend por lotes sin pasar por la caché: la memoria no depende del tamaño de la tabla.
         """
-        return self.client.query(query).to_dataframe()
+        from export import export_table
+        source, source_filters = self._export_source(filters)
+        return export_table(self.backend, source, source_filters, fmt, compress)
+    
+    def check_export_cost(self, filters: Optional[Dict] = None):
+        """Validar el costo de export_works con esos filtros antes de ofrecerla (lanza QueryBudgetExceeded)"""
+        from export import check_export_cost
+        source, source_filters = self._export_source(filters)
+        check_export_cost(self.backend, source, source_filters)
+    
+    def _export_source(self, filters: Optional[Dict]) -> Tuple[TableSpec, Dict]:
+        """Tabla o vista que lee la exportación y los filtros que quedan por aplicar"""
+        filters = {k: v for k, v in (filters or {}).items() if v is not None and v != ""}
+        return read_source(self.table, filters)
+    
+    def search_works(self, query: str, filters: Optional[Dict] = None,
+                     limit: int = SEARCH_CONFIG["max_results"]) -> pd.DataFrame:
+        """Buscar trabajos por nombre, descripciones, subcategoría y tags en el snapshot en memoria.
+        
+        Coincide por prefijo y sin distinguir tildes; devuelve las filas ordenadas por relevancia.
+        filters admite los mismos category, status e is_latest que list_works.
+        """
+        snapshot = snapshot_cache.get_or_refresh(("works", "all"), self._load_all_works, self._load_all_works)
+        positions = snapshot.search(query, SEARCH_CONFIG["fields"], self._search_detail_batches)
+        # Filtros sobre las posiciones: solo se copian las filas que se devuelven
+        filters = {k: v for k, v in (filters or {}).items() if v is not None and v != ""}
+        for column in ("category", "status", "is_latest"):
+            if column in filters:
+                # Los nulos (p. ej. is_latest sin valor) no coinciden con ningún filtro
+                matches = snapshot.dataframe[column].iloc[positions].eq(filters[column])
+                positions = positions[matches.fillna(False).to_numpy(dtype=bool)]
+        return snapshot.dataframe.iloc[positions[:limit]].reset_index(drop=True)
+    
+    def _search_detail_batches(self):
+        """Lotes con las columnas de detalle que indexa la búsqueda (se leen una vez por índice)"""
+        fields = [field for field in SEARCH_CONFIG["fields"] if field in self.table.detail_columns]
+        if not fields:
+            return iter(())
+        return self.backend.iter_batches(self.table, [self.table.key_column] + fields, {}, EXPORT_CONFIG["batch_rows"])
+    
+    def get_all_work_ids(self) -> List[str]:
+        """IDs de todos los trabajos, incluidos los archivados (consulta solo de claves, sin caché)"""
+        return self.backend.get_keys(self.table)
     
     def get_work_by_id(self, work_id: str) -> Optional[Dict]:
-        """Obtener trabajo por ID"""
-        query = f"""
-        SELECT *
-        FROM `{self.table_ref}`
-        WHERE work_id = @work_id
-        LIMIT 1
+        """Obtener trabajo por ID con todas sus columnas.
+        
+        Las columnas del listado salen del snapshot en memoria; las de detalle (descripción,
+        notas, configuración) se leen solo para este registro y quedan en caché.
         """
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("work_id", "STRING", work_id)
-            ]
+        snapshot = snapshot_cache.get(("works", "all"))
+        if snapshot is not None:
+            work = snapshot.lookup(work_id)
+            if work is not None:
+                details = snapshot_cache.get_or_load(
+                    ("works", "details", work_id),
+                    lambda: self.backend.get_by_id(self.table, work_id, list(self.table.detail_columns))
+                )
+                work.update(details)
+                return work
+        
+        work = snapshot_cache.get_or_load(
+            ("works", "by_id", work_id),
+            lambda: self.backend.get_by_id(self.table, work_id)
         )
-        result = self.client.query(query, job_config=job_config).to_dataframe()
-        return result.to_dict('records')[0] if not result.empty else None
+        return dict(work) if work else None
     
     def create_work(self, work_data: Dict) -> bool:
         """Crear nuevo trabajo"""
@@ -172,81 +819,99 @@ class WorksDatabase:
             from datetime import datetime
             
             current_time = datetime.now().isoformat()
-            row_to_insert = {
-                "work_id": work_data["work_id"],
-                "work_name": work_data["work_name"],
-                "work_slug": work_data.get("work_slug", work_data["work_id"]),
-                "category": work_data["category"],
-                "subcategory": work_data.get("subcategory", ""),
-                "status": work_data["status"],
-                "version": work_data["version"],
-                "is_latest": work_data.get("is_latest", True),
-                "description": work_data.get("description", ""),
-                "short_description": work_data.get("short_description", ""),
-                "image_preview_url": work_data.get("image_preview_url", ""),
-                "created_date": current_time,
-                "updated_date": current_time,
-                "activated_date": work_data.get("activated_date"),
-                "archived_date": work_data.get("archived_date"),
-                "work_url": work_data["work_url"],
-                "config_json": work_data.get("config_json", "{}"),
-                "notes": work_data.get("notes", ""),
-                "tags": work_data.get("tags", [])
-            }
-            
-            errors = self.client.insert_rows_json(self.table_ref, [row_to_insert])
-            return len(errors) == 0
+            row_to_insert = self._build_work_row(work_data, current_time)
             
-        except Exception as e:
-            print(f"Error creating work: {e}")
+            created = self.backend.create(self.table, [row_to_insert])
+            snapshot_cache.invalidate("works")
+            return created
+            
+        except Exception:
+            logger.exception("Error creating work")
             return False
     
+    def create_works_bulk(self, works: List[Dict]) -> int:
+        """Crear muchos trabajos en lotes; devuelve filas cargadas"""
+        from datetime import datetime
+        
+        current_time = datetime.now().isoformat()
+        rows = [self._build_work_row(work, current_time) for work in works]
+        try:
+            return self.backend.create_bulk(self.table, rows)
+        except Exception:
+            logger.exception("Error creating works")
+            return 0
+        finally:
+            snapshot_cache.invalidate("works")
+    
+    def _build_work_row(self, work_data: Dict, current_time: str) -> Dict:
+        """Armar la fila a insertar con los valores por defecto de la tabla"""
+        return {
+            "work_id": work_data["work_id"],
+            "work_name": work_data["work_name"],
+            "work_slug": work_data.get("work_slug", work_data["work_id"]),
+            "category": work_data["category"],
+            "subcategory": work_data.get("subcategory", ""),
+            "status": work_data["status"],
+            "version": work_data["version"],
+            "is_latest": work_data.get("is_latest", True),
+            "description": work_data.get("description", ""),
+            "short_description": work_data.get("short_description", ""),
+            "image_preview_url": work_data.get("image_preview_url", ""),
+            "created_date": current_time,
+            "updated_date": current_time,
+            "activated_date": work_data.get("activated_date"),
+            "archived_date": work_data.get("archived_date"),
+            "work_url": work_data["work_url"],
+            "config_json": work_data.get("config_json", "{}"),
+            "notes": work_data.get("notes", ""),
+            "tags": work_data.get("tags", [])
+        }
+    
     def update_work(self, work_id: str, update_data: Dict) -> bool:
         """Actualizar trabajo existente"""
+        return self.update_works_bulk([(work_id, update_data)])
+    
+    def update_works_bulk(self, updates: List[Tuple[str, Dict]]) -> bool:
+        """Actualizar muchos trabajos en una sola operación (un MERGE en BigQuery)"""
         try:
-            set_clauses = []
-            for key, value in update_data.items():
-                if key != "work_id":
-                    if isinstance(value, str):
-                        set_clauses.append(f"{key} = '{value}'")
-                    elif isinstance(value, list):
-                        tags_str = "', '".join(value)
-                        set_clauses.append(f"{key} = ['{tags_str}']")
-                    else:
-                        set_clauses.append(f"{key} = {value}")
-            
-            if not set_clauses:
+            updates = [(work_id, data) for work_id, data in updates
+                       if any(key != "work_id" for key in data)]
+            if not updates:
                 return True
             
-            query = f"""
-            UPDATE `{self.table_ref}`
-            SET {', '.join(set_clauses)}, updated_date = CURRENT_TIMESTAMP()
-            WHERE work_id = '{work_id}'
-            """
+            write_ids = enqueue_writes(self.table, "update", updates)
+            if write_ids is not None:
+                self.last_write_ids = write_ids
+                return True
             
-            job = self.client.query(query)
-            job.result()
+            self.backend.update(self.table, updates)
+            snapshot_cache.invalidate("works")
             return True
             
-        except Exception as e:
-            print(f"Error updating work: {e}")
+        except Exception:
+            logger.exception("Error updating works")
             return False
     
     def archive_work(self, work_id: str) -> bool:
         """Archivar trabajo (soft delete)"""
+        return self.archive_works_bulk([work_id])
+    
+    def archive_works_bulk(self, work_ids: List[str]) -> bool:
+        """Archivar muchos trabajos en una sola operación"""
         try:
-            query = f"""
-            UPDATE `{self.table_ref}`
-            SET status = 'archived', 
-                archived_date = CURRENT_TIMESTAMP(),
-                updated_date = CURRENT_TIMESTAMP()
-            WHERE work_id = '{work_id}'
-            """
-            
-            job = self.client.query(query)
-            job.result()
+            if not work_ids:
+                return True
+            
+            write_ids = enqueue_writes(self.table, "archive",
+                                       [(work_id, self.table.archive_values) for work_id in work_ids])
+            if write_ids is not None:
+                self.last_write_ids = write_ids
+                return True
+            
+            self.backend.archive(self.table, list(work_ids))
+            snapshot_cache.invalidate("works")
             return True
             
-        except Exception as e:
-            print(f"Error archiving work: {e}")
+        except Exception:
+            logger.exception("Error archiving works")
             return False
@@ -0,0 +1,119 @@
+"""
+Exportación de tablas por lotes a CSV, JSONL o Parquet sobre un archivo temporal
+"""
+import gzip
+import io
+import json
+import tempfile
+from typing import BinaryIO, Dict, Iterable, List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from backends import StorageBackend, TableSpec, build_arrow_schema
+from config import EXPORT_CONFIG
+from instrumentation import track_call
+
+# Formato -> extensión y tipo de contenido
+EXPORT_FORMATS = {
+    "csv": {"extension": "csv", "mime": "text/csv"},
+    "jsonl": {"extension": "jsonl", "mime": "application/x-ndjson"},
+    "parquet": {"extension": "parquet", "mime": "application/vnd.apache.parquet"}
+}
+
+
+def export_file_name(table: TableSpec, fmt: str, compress: bool) -> str:
+    """Nombre del archivo descargado ("works_index.csv.gz"); una vista exporta con el nombre de su tabla"""
+    name = f"{(table.view_of or table).name}.{EXPORT_FORMATS[fmt]['extension']}"
+    # Parquet ya comprime cada columna internamente
+    return f"{name}.gz" if compress and fmt != "parquet" else name
+
+
+def export_mime(fmt: str, compress: bool) -> str:
+    """Tipo de contenido del archivo exportado"""
+    return "application/gzip" if compress and fmt != "parquet" else EXPORT_FORMATS[fmt]["mime"]
+
+
+def check_export_cost(backend: StorageBackend, table: TableSpec, filters: Dict):
+    """Validar el costo de export_table con esos filtros antes de ofrecer la descarga (lanza QueryBudgetExceeded)"""
+    backend.check_batches_cost(table, list(table.columns), filters)
+
+
+def export_table(backend: StorageBackend, table: TableSpec, filters: Dict, fmt: str,
+                 compress: bool = True) -> BinaryIO:
+    """Exportar las filas que cumplen los filtros y devolver el archivo, abierto y al inicio.
+
+    Las filas llegan del backend por lotes (iter_batches) y cada lote se escribe y se
+    descarta antes de leer el siguiente: la memoria usada depende de EXPORT_CONFIG["batch_rows"],
+    no del tamaño de la tabla. El archivo es anónimo y se borra al cerrarlo.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportación desconocido: {fmt}")
+    columns = list(table.columns)
+    out = tempfile.TemporaryFile(dir=EXPORT_CONFIG["temp_dir"])
+    try:
+        with track_call(f"{table.name}.export", kind="export", format=fmt, compress=compress) as call:
+            batches = backend.iter_batches(table, columns, filters, EXPORT_CONFIG["batch_rows"])
+            if fmt == "parquet":
+                call["rows"] = _write_parquet(batches, table, columns, out)
+            else:
+                call["rows"] = _write_text(batches, table, fmt, out, compress)
+            call["file_bytes"] = out.tell()
+        out.seek(0)
+        return out
+    except Exception:
+        out.close()
+        raise
+
+
+def _write_text(batches: Iterable[pd.DataFrame], table: TableSpec, fmt: str, out: BinaryIO,
+                compress: bool) -> int:
+    """CSV (con encabezado) o JSONL en UTF-8, opcionalmente comprimido con gzip"""
+    raw = gzip.GzipFile(fileobj=out, mode="wb", compresslevel=6) if compress else out
+    text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    rows = 0
+    for batch in batches:
+        if batch.empty:
+            continue
+        batch = _normalize_batch(batch, table)
+        if fmt == "csv":
+            # Las listas (tags) van como JSON en una celda
+            for column, column_type in table.columns.items():
+                if column_type.startswith("ARRAY"):
+                    batch[column] = batch[column].map(lambda value: json.dumps(list(value), ensure_ascii=False))
+            batch.to_csv(text, header=rows == 0, index=False)
+        else:
+            batch.to_json(text, orient="records", lines=True, date_format="iso", force_ascii=False)
+        rows += len(batch)
+    if fmt == "csv" and rows == 0:
+        text.write(",".join(table.columns) + "\n")
+    text.flush()
+    text.detach()  # cerrar el envoltorio de texto cerraría también el archivo
+    if compress:
+        raw.close()  # escribe el final del gzip; no cierra out
+    return rows
+
+
+def _write_parquet(batches: Iterable[pd.DataFrame], table: TableSpec, columns: List[str], out: BinaryIO) -> int:
+    """Parquet con el esquema de la tabla; cada lote queda como un row group"""
+    schema = build_arrow_schema(table, columns)
+    rows = 0
+    with pq.ParquetWriter(out, schema, compression=EXPORT_CONFIG["parquet_compression"]) as writer:
+        for batch in batches:
+            batch = _normalize_batch(batch, table)
+            writer.write_table(pa.Table.from_pandas(batch, schema=schema, preserve_index=False))
+            rows += len(batch)
+    return rows
+
+
+def _normalize_batch(batch: pd.DataFrame, table: TableSpec) -> pd.DataFrame:
+    """Fechas en UTC y listas como list, igual sea cual sea el backend que leyó el lote"""
+    batch = batch.copy()
+    for column in batch.columns:
+        column_type = table.columns.get(column)
+        if column_type == "TIMESTAMP":
+            batch[column] = pd.to_datetime(batch[column], utc=True)
+        elif column_type == "ARRAY<STRING>":
+            batch[column] = batch[column].map(lambda value: [] if value is None else list(value))
+    return batch
@@ -0,0 +1,281 @@
+"""
+Imágenes de preview: validación, deduplicación por hash, miniaturas WebP/JPEG y almacenamiento en blobs
+"""
+import hashlib
+import io
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from PIL import Image, ImageOps
+
+from config import IMAGE_CONFIG
+from instrumentation import track_call
+
+# Formatos que se aceptan al subir (los que Pillow reconoce al abrir el archivo)
+ALLOWED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+
+# Salidas de cada miniatura: formato de Pillow, extensión y tipo de contenido
+THUMBNAIL_FORMATS = [("WEBP", "webp", "image/webp"), ("JPEG", "jpg", "image/jpeg")]
+
+_IMAGE_KEY_PATTERN = re.compile(r"images/([0-9a-f]{64})/")
+
+# Pool compartido para generar miniaturas y leer blobs; Pillow libera el GIL al escalar y codificar
+_image_pool = ThreadPoolExecutor(max_workers=IMAGE_CONFIG["max_workers"], thread_name_prefix="images")
+
+
+class BlobStore(ABC):
+    """Almacenamiento de blobs por clave ("images/<hash>/md.webp")"""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str):
+        """Guardar (o reemplazar) un blob"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Contenido del blob (None si no existe)"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Si el blob existe"""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """URL con la que se publica el blob"""
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs como archivos bajo un directorio local (desarrollo y pruebas)"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def put(self, key: str, data: bytes, content_type: str):
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Escritura atómica: un lector concurrente nunca ve un archivo a medias
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return (self.root / key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key: str) -> bool:
+        return (self.root / key).is_file()
+
+    def url(self, key: str) -> str:
+        return (self.root / key).resolve().as_uri()
+
+
+class GCSBlobStore(BlobStore):
+    """Blobs en un bucket de Cloud Storage, servidos por su URL pública"""
+
+    def __init__(self, bucket_name: str):
+        # Import diferido: google-cloud-storage solo hace falta en producción
+        from google.cloud import storage
+        self.bucket_name = bucket_name
+        self.bucket = storage.Client().bucket(bucket_name)
+
+    def put(self, key: str, data: bytes, content_type: str):
+        blob = self.bucket.blob(key)
+        # Las claves llevan el hash del contenido: el blob nunca cambia y se puede cachear sin límite
+        blob.cache_control = "public, max-age=31536000, immutable"
+        blob.upload_from_string(data, content_type=content_type)
+
+    def get(self, key: str) -> Optional[bytes]:
+        from google.api_core import exceptions
+        try:
+            return self.bucket.blob(key).download_as_bytes()
+        except exceptions.NotFound:
+            return None
+
+    def exists(self, key: str) -> bool:
+        return self.bucket.blob(key).exists()
+
+    def url(self, key: str) -> str:
+        return f"https://storage.googleapis.com/{self.bucket_name}/{key}"
+
+
+_blob_store: Optional[BlobStore] = None
+_blob_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """Obtener el almacenamiento configurado en IMAGE_BLOB_STORE (uno por proceso)"""
+    global _blob_store
+    if _blob_store is not None:
+        return _blob_store
+
+    with _blob_store_lock:
+        if _blob_store is None:
+            if IMAGE_CONFIG["blob_store"] == "local":
+                _blob_store = LocalBlobStore(IMAGE_CONFIG["local_dir"])
+            elif IMAGE_CONFIG["blob_store"] == "gcs":
+                _blob_store = GCSBlobStore(IMAGE_CONFIG["bucket"])
+            else:
+                raise ValueError(f"Almacenamiento de imágenes desconocido: {IMAGE_CONFIG['blob_store']}")
+        return _blob_store
+
+
+def set_blob_store(store: Optional[BlobStore]):
+    """Reemplazar el almacenamiento del proceso (None vuelve a leer la configuración)"""
+    global _blob_store
+    with _blob_store_lock:
+        _blob_store = store
+
+
+def image_key(digest: str, name: str) -> str:
+    """Clave de un blob de la imagen: "original" o una miniatura ("md.webp")"""
+    return f"images/{digest}/{name}"
+
+
+def preview_url(digest: str, store: Optional[BlobStore] = None) -> str:
+    """URL que se guarda en image_preview_url: la miniatura "md" en WebP"""
+    return (store or get_blob_store()).url(image_key(digest, "md.webp"))
+
+
+def thumbnail_key(url: str, size: str = "sm", extension: str = "webp") -> Optional[str]:
+    """Clave de una miniatura a partir de cualquier URL de la misma imagen (None si no es de este almacenamiento)"""
+    match = _IMAGE_KEY_PATTERN.search(url or "")
+    return image_key(match.group(1), f"{size}.{extension}") if match else None
+
+
+def decode_image(data: bytes) -> Image.Image:
+    """Abrir y validar el contenido real de la imagen; lanza ValueError si no sirve.
+
+    El tipo se comprueba con los bytes y no con la extensión o el tipo MIME del navegador.
+    Las imágenes animadas quedan en su primer cuadro y se aplica la orientación EXIF.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Exception:
+        raise ValueError("El archivo no es una imagen válida")
+    if image.format not in ALLOWED_FORMATS:
+        raise ValueError(f"Formato de imagen no permitido: {image.format}")
+    if image.width * image.height > IMAGE_CONFIG["max_pixels"]:
+        raise ValueError(f"La imagen es demasiado grande ({image.width}x{image.height} px)")
+
+    largest = max(IMAGE_CONFIG["thumbnail_sizes"].values())
+    if image.format == "JPEG":
+        # Decodificar directamente a escala reducida (DCT) cuando el original es mucho mayor
+        image.draft("RGB", (largest, largest))
+    try:
+        image.load()
+    except Exception:
+        raise ValueError("La imagen está dañada o incompleta")
+    image = ImageOps.exif_transpose(image)
+    return image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+
+def render_thumbnails(image: Image.Image, max_side: int) -> Dict[str, bytes]:
+    """Miniatura con el lado mayor en max_side, en cada formato de THUMBNAIL_FORMATS ({extensión: bytes})"""
+    thumbnail = image.copy()
+    thumbnail.thumbnail((max_side, max_side), Image.LANCZOS)
+    rendered = {}
+    for pil_format, extension, _ in THUMBNAIL_FORMATS:
+        frame = thumbnail if pil_format == "WEBP" or thumbnail.mode == "RGB" else _flatten(thumbnail)
+        buffer = io.BytesIO()
+        frame.save(buffer, pil_format, quality=IMAGE_CONFIG["quality"], optimize=pil_format == "JPEG")
+        rendered[extension] = buffer.getvalue()
+    return rendered
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """RGBA sobre fondo blanco (JPEG no tiene transparencia)"""
+    background = Image.new("RGB", image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def store_image(data: bytes, store: Optional[BlobStore] = None) -> Dict:
+    """Validar, deduplicar y guardar una imagen con sus miniaturas; devuelve digest, url y reused.
+
+    La clave es el SHA-256 del contenido: si la misma imagen ya se subió, no se vuelve a
+    procesar ni a guardar. Las miniaturas se generan en paralelo y el original se guarda al
+    final, así que su presencia indica que la imagen quedó completa.
+    """
+    store = store or get_blob_store()
+    digest = hashlib.sha256(data).hexdigest()
+    original_key = image_key(digest, "original")
+    if store.exists(original_key):
+        return {"digest": digest, "url": preview_url(digest, store), "reused": True}
+
+    with track_call("images.store", kind="image", bytes=len(data)) as call:
+        image = decode_image(data)
+        original_type = Image.MIME.get(Image.open(io.BytesIO(data)).format, "application/octet-stream")
+        call["pixels"] = image.width * image.height
+
+        def store_size(size: str, max_side: int):
+            for extension, thumbnail in render_thumbnails(image, max_side).items():
+                content_type = next(ct for _, ext, ct in THUMBNAIL_FORMATS if ext == extension)
+                store.put(image_key(digest, f"{size}.{extension}"), thumbnail, content_type)
+
+        futures = [_image_pool.submit(store_size, size, max_side)
+                   for size, max_side in IMAGE_CONFIG["thumbnail_sizes"].items()]
+        for future in futures:
+            future.result()
+        store.put(original_key, data, original_type)
+    return {"digest": digest, "url": preview_url(digest, store), "reused": False}
+
+
+class ThumbnailCache:
+    """LRU de miniaturas en memoria acotada por bytes, compartida por todas las sesiones"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, loader: Callable[[str], Optional[bytes]]) -> Optional[bytes]:
+        """Miniatura desde la caché, o desde loader(key) si no está (las ausentes no se cachean)"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+        data = loader(key)
+        if data is not None and len(data) <= self.max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = data
+                    self._size += len(data)
+                while self._size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        return data
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de uso de la caché"""
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+thumbnail_cache = ThumbnailCache(IMAGE_CONFIG["cache_max_bytes"])
+
+
+def load_thumbnails(urls: List[str], size: str = "sm") -> List[Optional[bytes]]:
+    """Miniaturas WebP de las imágenes indicadas, en paralelo y a través de thumbnail_cache.
+
+    Las URL que no son de este almacenamiento (o sin miniatura) devuelven None.
+    """
+    store = get_blob_store()
+
+    def load(url: str) -> Optional[bytes]:
+        key = thumbnail_key(url, size)
+        return thumbnail_cache.get(key, store.get) if key else None
+
+    return list(_image_pool.map(load, urls))
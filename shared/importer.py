@@ -0,0 +1,161 @@
+"""
+Importación masiva de categorías y trabajos desde archivos CSV/JSONL
+"""
+from datetime import datetime
+from typing import Iterable, List, Tuple
+
+import pandas as pd
+
+from config import BULK_CONFIG, WORK_STATUS
+
+CATEGORY_IMPORT_REQUIRED = ["category_name", "description"]
+CATEGORY_IMPORT_OPTIONAL = ["category_id", "category_icon", "display_order"]
+
+WORK_IMPORT_REQUIRED = ["work_name", "category", "status", "version", "work_url"]
+WORK_IMPORT_OPTIONAL = [
+    "work_id", "work_slug", "subcategory", "is_latest", "description",
+    "short_description", "image_preview_url", "config_json", "notes", "tags"
+]
+
+_TRUE_VALUES = {"true", "1", "si", "sí", "yes"}
+_FALSE_VALUES = {"false", "0", "no"}
+
+
+def read_import_file(uploaded_file) -> pd.DataFrame:
+    """Leer archivo subido (CSV o JSONL) como DataFrame de texto"""
+    name = uploaded_file.name.lower()
+    if name.endswith(".csv"):
+        df = pd.read_csv(uploaded_file, dtype=str, keep_default_na=False)
+    elif name.endswith((".jsonl", ".json")):
+        df = pd.read_json(uploaded_file, lines=True, dtype=False)
+    else:
+        raise ValueError("Formato no soportado. Use CSV o JSONL")
+
+    if len(df) > BULK_CONFIG["max_import_rows"]:
+        raise ValueError(f"El archivo supera el máximo de {BULK_CONFIG['max_import_rows']} filas")
+
+    df.columns = df.columns.astype(str).str.strip().str.lower()
+    return df.reset_index(drop=True)
+
+
+def validate_categories_import(df: pd.DataFrame,
+                               existing_ids: Iterable[str] = ()) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Validar categorías columna a columna; devuelve (filas válidas, errores por fila)"""
+    df = _with_columns(df, CATEGORY_IMPORT_REQUIRED + CATEGORY_IMPORT_OPTIONAL)
+    errors: List[pd.DataFrame] = []
+
+    for column in CATEGORY_IMPORT_REQUIRED:
+        _add_errors(errors, _is_blank(df[column]), column, "Campo obligatorio vacío")
+
+    display_order = pd.to_numeric(df["display_order"].where(~_is_blank(df["display_order"]), 999),
+                                  errors="coerce")
+    _add_errors(errors, display_order.isna(), "display_order", "Debe ser numérico")
+    df["display_order"] = display_order.fillna(999).astype(int)
+
+    df["category_icon"] = df["category_icon"].where(~_is_blank(df["category_icon"]), "📊")
+    df["category_id"] = df["category_id"].where(
+        ~_is_blank(df["category_id"]), _generated_ids(df["category_name"], "_")
+    )
+    _add_duplicate_errors(errors, df["category_id"], existing_ids, "category_id")
+
+    df["description"] = df["description"].fillna("")
+    return _split_valid(df, CATEGORY_IMPORT_REQUIRED + CATEGORY_IMPORT_OPTIONAL, errors)
+
+
+def validate_works_import(df: pd.DataFrame, categories_df: pd.DataFrame,
+                          existing_ids: Iterable[str] = ()) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Validar trabajos columna a columna; devuelve (filas válidas, errores por fila).
+
+    La columna category acepta tanto el ID como el nombre de la categoría.
+    """
+    df = _with_columns(df, WORK_IMPORT_REQUIRED + WORK_IMPORT_OPTIONAL)
+    errors: List[pd.DataFrame] = []
+
+    for column in WORK_IMPORT_REQUIRED:
+        _add_errors(errors, _is_blank(df[column]), column, "Campo obligatorio vacío")
+
+    # Categoría por nombre o por ID
+    name_to_id = pd.Series(categories_df["category_id"].values, index=categories_df["category_name"].values)
+    df["category"] = df["category"].map(name_to_id).fillna(df["category"])
+    unknown_category = ~_is_blank(df["category"]) & ~df["category"].isin(categories_df["category_id"])
+    _add_errors(errors, unknown_category, "category", "Categoría inexistente")
+
+    df["status"] = df["status"].astype(str).str.strip().str.lower()
+    invalid_status = ~_is_blank(df["status"]) & ~df["status"].isin(list(WORK_STATUS.values()))
+    _add_errors(errors, invalid_status, "status", f"Estado inválido. Use: {', '.join(WORK_STATUS.values())}")
+
+    invalid_url = ~_is_blank(df["work_url"]) & ~df["work_url"].astype(str).str.match(r"^https?://")
+    _add_errors(errors, invalid_url, "work_url", "Debe comenzar con http:// o https://")
+
+    is_latest_text = df["is_latest"].astype(str).str.strip().str.lower()
+    is_latest = pd.Series(pd.NA, index=df.index, dtype="boolean")
+    is_latest[is_latest_text.isin(_TRUE_VALUES) | _is_blank(df["is_latest"])] = True
+    is_latest[is_latest_text.isin(_FALSE_VALUES)] = False
+    _add_errors(errors, is_latest.isna(), "is_latest", "Debe ser verdadero o falso")
+    df["is_latest"] = is_latest.fillna(True).astype(bool)
+
+    # Etiquetas: listas en JSONL, separadas por ";" o "," en CSV
+    split_tags = df["tags"].str.split(r"\s*[;,]\s*", regex=True)
+    tags = split_tags.where(split_tags.notna(), df["tags"])
+    df["tags"] = tags.map(lambda value: [t for t in value if t] if isinstance(value, list) else [])
+
+    df["work_id"] = df["work_id"].where(~_is_blank(df["work_id"]), _generated_ids(df["work_name"], "-"))
+    df["work_slug"] = df["work_slug"].where(~_is_blank(df["work_slug"]), df["work_id"])
+    _add_duplicate_errors(errors, df["work_id"], existing_ids, "work_id")
+
+    text_columns = ["subcategory", "description", "short_description", "image_preview_url", "notes"]
+    df[text_columns] = df[text_columns].fillna("")
+    df["config_json"] = df["config_json"].where(~_is_blank(df["config_json"]), "{}")
+    return _split_valid(df, WORK_IMPORT_REQUIRED + WORK_IMPORT_OPTIONAL, errors)
+
+
+def _with_columns(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Copiar el DataFrame agregando vacías las columnas que falten"""
+    df = df.copy()
+    for column in columns:
+        if column not in df.columns:
+            df[column] = None
+    return df
+
+
+def _is_blank(series: pd.Series) -> pd.Series:
+    """Máscara de valores nulos o cadenas vacías"""
+    return series.isna() | series.astype(str).str.strip().eq("")
+
+
+def _generated_ids(names: pd.Series, separator: str) -> pd.Series:
+    """Generar IDs como generate_*_id de utils, con el número de fila para que sean únicos en el lote"""
+    slug = (names.fillna("").astype(str).str.lower()
+            .str.replace(r"[^a-zA-Z0-9\s-]", "", regex=True)
+            .str.strip()
+            .str.replace(r"\s+", separator, regex=True))
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    row_numbers = pd.Series(names.index + 1, index=names.index).astype(str)
+    return slug + separator + timestamp + separator + row_numbers
+
+
+def _add_errors(errors: List[pd.DataFrame], mask: pd.Series, field: str, message: str):
+    """Registrar un error por cada fila marcada en la máscara"""
+    if mask.any():
+        errors.append(pd.DataFrame({"fila": mask.index[mask] + 1, "campo": field, "error": message}))
+
+
+def _add_duplicate_errors(errors: List[pd.DataFrame], ids: pd.Series,
+                          existing_ids: Iterable[str], field: str):
+    """Marcar IDs repetidos dentro del archivo o ya existentes en la tabla (incluidos los archivados).
+
+    Esas filas se rechazan una a una: si llegaran al lote, SQLite abortaría la carga
+    completa y en BigQuery quedaría una clave primaria duplicada.
+    """
+    _add_errors(errors, ids.duplicated(keep=False), field, "ID repetido en el archivo")
+    _add_errors(errors, ids.isin(set(existing_ids)), field, "El ID ya existe")
+
+
+def _split_valid(df: pd.DataFrame, columns: List[str],
+                 errors: List[pd.DataFrame]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Separar filas válidas de los errores acumulados"""
+    errors_df = (pd.concat(errors, ignore_index=True).sort_values("fila", kind="stable")
+                 if errors else pd.DataFrame(columns=["fila", "campo", "error"]))
+    invalid_rows = errors_df["fila"].unique() - 1
+    valid_df = df.loc[~df.index.isin(invalid_rows), columns].reset_index(drop=True)
+    return valid_df, errors_df.reset_index(drop=True)
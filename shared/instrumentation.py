@@ -0,0 +1,90 @@
+"""
+Instrumentación de llamadas a la base de datos: logs JSON estructurados y desglose por rerun
+"""
+import contextvars
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("data_science_admin")
+
+# Llamadas del rerun en curso; Streamlit ejecuta cada rerun en el hilo de su sesión
+_rerun_calls: contextvars.ContextVar[Optional[List[Dict]]] = contextvars.ContextVar("rerun_calls", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos que Cloud Logging interpreta"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "severity": record.levelname,
+            "message": record.getMessage(),
+            "logger": record.name,
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat()
+        }
+        payload.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+def configure_logging(level: int = logging.INFO):
+    """Enviar los logs de la aplicación a stdout en JSON (una sola vez por proceso)"""
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def start_rerun():
+    """Comenzar a acumular las llamadas de un nuevo rerun"""
+    _rerun_calls.set([])
+
+
+def get_rerun_calls() -> List[Dict]:
+    """Llamadas registradas desde el último start_rerun()"""
+    return list(_rerun_calls.get() or [])
+
+
+def record_call(operation: str, level: int = logging.INFO, **fields):
+    """Registrar una llamada en el rerun actual y emitirla como log estructurado"""
+    entry = {"operation": operation, **fields}
+    calls = _rerun_calls.get()
+    if calls is not None:
+        calls.append(entry)
+    logger.log(level, operation, extra={"fields": entry})
+
+
+@contextmanager
+def track_call(operation: str, **fields):
+    """Medir una llamada; el bloque puede completar el dict con job_id, bytes, filas, etc."""
+    entry = dict(fields)
+    started = time.perf_counter()
+    level = logging.INFO
+    try:
+        yield entry
+    except Exception as e:
+        entry["error"] = str(e)
+        level = logging.ERROR
+        raise
+    finally:
+        entry["wall_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        record_call(operation, level, **entry)
+
+
+def record_job_stats(entry: Dict, job):
+    """Copiar al registro las estadísticas de un job de BigQuery"""
+    entry["job_id"] = getattr(job, "job_id", None)
+    entry["bytes_processed"] = getattr(job, "total_bytes_processed", None)
+    entry["slot_millis"] = getattr(job, "slot_millis", None)
+    entry["bigquery_cache_hit"] = getattr(job, "cache_hit", None)
+
+
+configure_logging()
@@ -0,0 +1,83 @@
+"""
+Preparación de tablas para mostrar: operaciones por columna, sin recorrer filas en Python
+"""
+from typing import Callable, Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import STATUS_BADGES
+
+MISSING_DISPLAY = "N/A"
+UNKNOWN_BADGE = "❓"
+
+# Posición en "aaaa-mm-ddThh:mm" de cada carácter de "dd/mm/aaaa hh:mm" (separadores aparte)
+_ISO_TO_DISPLAY = [8, 9, 4, 5, 6, 7, 0, 1, 2, 3, 10, 11, 12, 13, 14, 15]
+
+
+def format_dates(values: pd.Series) -> pd.Series:
+    """Fechas UTC como texto dd/mm/aaaa hh:mm ("N/A" si faltan o no se pueden interpretar).
+    
+    dt.strftime formatea valor por valor en Python; aquí numpy genera el ISO
+    "aaaa-mm-ddThh:mm" de todo el arreglo y se reordenan sus caracteres.
+    """
+    dates = pd.to_datetime(values, errors="coerce", utc=True)
+    iso = np.datetime_as_string(dates.dt.tz_localize(None).to_numpy("datetime64[m]"), unit="m")
+    chars = iso.astype("U16").view("U1").reshape(-1, 16)[:, _ISO_TO_DISPLAY]
+    chars[:, [2, 5]] = "/"
+    chars[:, 10] = " "
+    formatted = pd.Series(chars.copy().view("U16").ravel(), index=values.index, dtype=object)
+    return formatted.where(dates.notna(), MISSING_DISPLAY)
+
+
+def per_category(values: pd.Series, transform: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """Aplicar transform a una columna; si es categórica, solo a sus categorías distintas.
+    
+    El resultado es texto (object); los faltantes reciben transform de un valor nulo.
+    """
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return transform(values)
+    # El código -1 (faltante) toma el último elemento: el resultado de transformar None
+    categories = pd.Series(list(values.cat.categories) + [None], dtype=object)
+    transformed = transform(categories).to_numpy(dtype=object)
+    return pd.Series(transformed[values.cat.codes.to_numpy()], index=values.index, dtype=object)
+
+
+def status_badges(statuses: pd.Series) -> pd.Series:
+    """Estado precedido de su emoji ("🟢 active")"""
+    return per_category(statuses, lambda values: values.map(STATUS_BADGES).fillna(UNKNOWN_BADGE)
+                        + " " + values.fillna(""))
+
+
+def category_names(category_ids: pd.Series, categories_df: pd.DataFrame) -> pd.Series:
+    """Nombre de cada categoría; las que no están en categories_df conservan su ID"""
+    names = pd.Series(categories_df["category_name"].to_numpy(), index=categories_df["category_id"].to_numpy())
+    return per_category(category_ids, lambda values: values.map(names).fillna(values))
+
+
+def option_map(df: pd.DataFrame, label_column: str, value_column: str,
+               first: Optional[Dict[str, Hashable]] = None) -> Dict[str, Hashable]:
+    """Diccionario etiqueta -> valor para un selectbox, con entradas fijas opcionales al inicio"""
+    options = dict(first or {})
+    options.update(zip(df[label_column].to_numpy(), df[value_column].to_numpy()))
+    return options
+
+
+def categories_display(categories_df: pd.DataFrame) -> pd.DataFrame:
+    """Tabla de categorías lista para st.dataframe"""
+    display_df = categories_df[['category_name', 'category_icon', 'display_order', 'created_date']].copy()
+    display_df['created_date'] = format_dates(display_df['created_date'])
+    return display_df
+
+
+def works_display(works_df: pd.DataFrame, categories_df: pd.DataFrame) -> pd.DataFrame:
+    """Tabla de trabajos lista para st.dataframe: nombre de categoría, estado con emoji y fechas legibles"""
+    display_df = works_df.copy()
+    if 'category' in display_df:
+        display_df['category'] = category_names(display_df['category'], categories_df)
+    if 'status' in display_df:
+        display_df['status'] = status_badges(display_df['status'])
+    for column in ('created_date', 'updated_date', 'activated_date', 'archived_date'):
+        if column in display_df:
+            display_df[column] = format_dates(display_df[column])
+    return display_df
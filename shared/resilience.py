@@ -0,0 +1,256 @@
+"""
+Plazos, reintentos con backoff y lecturas duplicadas (hedging) para las llamadas al almacenamiento
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from config import RESILIENCE_CONFIG
+from instrumentation import logger, record_call
+
+T = TypeVar("T")
+
+# Motivos de error de BigQuery que indican un fallo transitorio del servicio
+RETRYABLE_REASONS = {"backendError", "internalError", "rateLimitExceeded", "jobRateLimitExceeded",
+                     "jobBackendError"}
+
+# Los intentos corren en este pool para poder abandonarlos al vencer el plazo
+_pool = ThreadPoolExecutor(max_workers=RESILIENCE_CONFIG["max_workers"], thread_name_prefix="db-attempt")
+
+
+class DeadlineExceeded(TimeoutError):
+    """La operación no terminó dentro de su plazo (reintentos incluidos)"""
+
+    def __init__(self, operation: str, deadline_seconds: float):
+        self.operation = operation
+        self.deadline_seconds = deadline_seconds
+        super().__init__(f"{operation} no respondió en {deadline_seconds:.0f} s")
+
+
+class Attempt:
+    """Un intento de una operación: su número, si es una lectura duplicada y el tiempo que le queda"""
+
+    def __init__(self, number: int, hedge: bool, deadline: Optional[float]):
+        self.number = number
+        self.hedge = hedge
+        self.deadline = deadline  # time.monotonic(); None sin plazo
+        self.job = None  # job de BigQuery del intento, para cancelarlo si se abandona
+        self.abandoned = False
+        self._lock = threading.Lock()
+
+    def timeout(self) -> Optional[float]:
+        """Segundos hasta el plazo de la operación (None si no tiene), para job.result(timeout=...)"""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def track_job(self, job):
+        """Asociar el job al intento; si el intento ya se abandonó, se cancela enseguida"""
+        with self._lock:
+            self.job = job
+            abandoned = self.abandoned
+        if abandoned:
+            _cancel_job(job)
+        return job
+
+    def abandon(self):
+        """Descartar el intento (duplicado perdedor o plazo vencido) y cancelar su job en BigQuery"""
+        with self._lock:
+            self.abandoned = True
+            job = self.job
+        if job is not None:
+            _cancel_job(job)
+
+
+def attempt_fields(attempt: Optional[Attempt]) -> Dict:
+    """Campos de log que distinguen reintentos y duplicados (vacío en el primer intento)"""
+    if attempt is None or (attempt.number == 1 and not attempt.hedge):
+        return {}
+    return {"attempt": attempt.number, "hedge": attempt.hedge}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True si el error es transitorio: red, 429/5xx o un motivo de BigQuery de RETRYABLE_REASONS"""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        import requests
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True
+    except ImportError:
+        pass
+    try:
+        from google.api_core import exceptions
+        if isinstance(error, (exceptions.TooManyRequests, exceptions.InternalServerError, exceptions.BadGateway,
+                              exceptions.ServiceUnavailable, exceptions.GatewayTimeout,
+                              exceptions.DeadlineExceeded)):
+            return True
+    except ImportError:
+        pass
+    reasons = {e.get("reason") for e in getattr(error, "errors", None) or [] if isinstance(e, dict)}
+    return bool(reasons & RETRYABLE_REASONS)
+
+
+def deadline_for(operation: str, kind: str) -> float:
+    """Plazo de una operación ("works_index.get_all" -> deadline_seconds["get_all"] o el de su tipo)"""
+    method = operation.rsplit(".", 1)[-1]
+    return RESILIENCE_CONFIG["deadline_seconds"].get(method, RESILIENCE_CONFIG[f"{kind}_deadline_seconds"])
+
+
+def hedge_delay_for(operation: str) -> Optional[float]:
+    """Segundos antes de duplicar una lectura, o None si la operación no se duplica (lecturas completas)"""
+    return RESILIENCE_CONFIG["hedge_after_seconds"].get(operation.rsplit(".", 1)[-1])
+
+
+def backoff_seconds(retry: int) -> float:
+    """Espera antes del reintento número retry: backoff exponencial con jitter completo"""
+    ceiling = min(RESILIENCE_CONFIG["max_backoff_seconds"], RESILIENCE_CONFIG["initial_backoff_seconds"] * 2 ** retry)
+    return random.uniform(0, ceiling)
+
+
+def call_with_resilience(operation: str, attempt_fn: Callable[[Attempt], T], kind: str = "read") -> T:
+    """Ejecutar attempt_fn con plazo total, reintentos de errores transitorios y, en lecturas, hedging.
+
+    kind "read": en las operaciones de hedge_after_seconds, si un intento no respondió en ese
+    tiempo se lanza otro igual y gana el primero que termine bien.
+    kind "write": sin duplicados; attempt_fn debe ser idempotente para poder reintentarse.
+    Si vence el plazo lanza DeadlineExceeded. Los intentos perdedores o que siguen en curso
+    al vencer el plazo se abandonan y se cancela su job (attempt.track_job). Cuando hubo
+    reintentos, duplicados o un plazo vencido se registra un resumen (kind="resilience").
+    """
+    if not RESILIENCE_CONFIG["enabled"]:
+        return attempt_fn(Attempt(1, hedge=False, deadline=None))
+
+    deadline_seconds = deadline_for(operation, kind)
+    started = time.monotonic()
+    deadline = started + deadline_seconds
+    stats = {"attempts": 0, "retries": 0, "hedges": 0, "hedge_won": False, "abandoned": 0}
+    hedge_after = hedge_delay_for(operation) if kind == "read" and RESILIENCE_CONFIG["hedge_enabled"] else None
+    outcome = "ok"
+    try:
+        while True:
+            try:
+                return _run_round(operation, attempt_fn, kind, deadline_seconds, deadline, stats, hedge_after)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # El intento agotó el plazo por su cuenta (timeout de job.result)
+                    raise DeadlineExceeded(operation, deadline_seconds) from e
+                delay = backoff_seconds(stats["retries"])
+                if not is_retryable(e) or stats["attempts"] >= RESILIENCE_CONFIG["max_attempts"] or delay >= remaining:
+                    raise
+                stats["retries"] += 1
+                time.sleep(delay)
+    except DeadlineExceeded:
+        outcome = "deadline"
+        raise
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        if stats["retries"] or stats["hedges"] or outcome == "deadline":
+            record_call(operation, logging.WARNING, kind="resilience", outcome=outcome, **stats,
+                        deadline_s=deadline_seconds, wall_ms=round((time.monotonic() - started) * 1000, 1))
+
+
+def _run_round(operation: str, attempt_fn: Callable[[Attempt], T], kind: str, deadline_seconds: float,
+               deadline: float, stats: Dict, hedge_after: Optional[float]) -> T:
+    """Un intento más sus duplicados; devuelve el primer resultado correcto o lanza el último error.
+
+    Al salir se cancela el job de cada intento que no ganó: duplicados perdedores, intentos en
+    curso al vencer el plazo y, en lecturas, los que fallaron (un timeout del cliente deja el
+    job corriendo). En escrituras un intento fallido conserva su job: el reintento lo retoma.
+    """
+    hedge_at = time.monotonic() + (hedge_after or 0.0)
+    hedges_left = RESILIENCE_CONFIG["max_hedges"] if hedge_after is not None else 0
+    pending: Dict[Future, Attempt] = dict([_submit(attempt_fn, stats, deadline, hedge=False)])
+    failed: List[Attempt] = []
+    last_error: Optional[BaseException] = None
+    try:
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                raise DeadlineExceeded(operation, deadline_seconds)
+            wait_for = deadline - now
+            if hedges_left:
+                wait_for = min(wait_for, max(hedge_at - now, 0.0))
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                attempt = pending.pop(future)
+                if future.exception() is None:
+                    stats["hedge_won"] = attempt.hedge
+                    return future.result()
+                last_error = future.exception()
+                failed.append(attempt)
+            if not done and hedges_left and time.monotonic() >= hedge_at:
+                future, attempt = _submit(attempt_fn, stats, deadline, hedge=True)
+                pending[future] = attempt
+                stats["hedges"] += 1
+                hedges_left -= 1
+        raise last_error
+    finally:
+        deadline_hit = time.monotonic() >= deadline
+        losers = list(pending.values()) + (failed if kind == "read" or deadline_hit else [])
+        for attempt in losers:
+            attempt.abandon()
+        stats["abandoned"] += len(losers)
+
+
+def _submit(attempt_fn: Callable[[Attempt], T], stats: Dict, deadline: float,
+            hedge: bool) -> Tuple[Future, Attempt]:
+    """Lanzar un intento en el pool, con el contexto del rerun (instrumentación)"""
+    stats["attempts"] += 1
+    attempt = Attempt(stats["attempts"], hedge, deadline)
+    return _pool.submit(contextvars.copy_context().run, attempt_fn, attempt), attempt
+
+
+def run_idempotent_job(client, operation: str, submit: Callable[[str, Attempt], Any]) -> Any:
+    """Ejecutar un job de escritura con ID determinista, reintentando sin repetir la escritura.
+
+    submit(job_id, attempt) envía el job con ese ID y espera a que termine. Cada intento
+    usa "<operación>_<uuid>_<n>"; antes de enviar otro se consulta el último job enviado:
+    si terminó bien (se perdió la respuesta) o sigue en curso, se espera ese mismo job.
+    """
+    prefix = f"{operation.replace('.', '_')}_{uuid.uuid4().hex}"
+    submitted: List[str] = []
+
+    def attempt_fn(attempt: Attempt) -> Any:
+        if submitted:
+            previous = _find_job(client, submitted[-1])
+            if previous is not None and previous.error_result is None:
+                attempt.track_job(previous)
+                previous.result(timeout=attempt.timeout())
+                return previous
+        job_id = f"{prefix}_{attempt.number}"
+        submitted.append(job_id)
+        return submit(job_id, attempt)
+
+    return call_with_resilience(operation, attempt_fn, kind="write")
+
+
+def _find_job(client, job_id: str):
+    """Job por ID, o None si BigQuery no llegó a crearlo"""
+    from google.api_core import exceptions
+    try:
+        return client.get_job(job_id)
+    except exceptions.NotFound:
+        return None
+
+
+def _cancel_job(job):
+    """Pedir a BigQuery que cancele el job; si falla solo se registra (su resultado ya no se usa)"""
+    try:
+        job.cancel()
+    except Exception as e:
+        logger.warning("Job cancel failed", extra={"fields": {
+            "job_id": getattr(job, "job_id", None), "error": str(e)
+        }})
@@ -0,0 +1,201 @@
+"""
+Diseño físico de las tablas en BigQuery: particiones, clustering y vistas de última versión
+
+Uso (desde la raíz del repositorio):
+    python shared/schema.py           # mostrar el plan sin ejecutarlo
+    python shared/schema.py --apply   # crear o migrar tablas y vistas
+"""
+import argparse
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from google.api_core import exceptions
+from google.cloud import bigquery
+
+from backends import CATEGORIES_TABLE, WORKS_LATEST_VIEW, WORKS_TABLE, TableSpec
+from config import BIGQUERY_DATASET, BIGQUERY_PROJECT, TABLE_LAYOUT_CONFIG
+from connection import get_bigquery_client
+from instrumentation import logger, record_job_stats, track_call
+
+
+class TableLayout:
+    """Partición por una columna TIMESTAMP y columnas de clustering de una tabla"""
+
+    def __init__(self, partition_column: Optional[str] = None, partition_granularity: Optional[str] = None,
+                 cluster_columns: Tuple[str, ...] = ()):
+        self.partition_column = partition_column
+        # BigQuery informa el tipo en mayúsculas ("DAY"); la configuración admite cualquiera
+        self.partition_granularity = partition_granularity.upper() if partition_granularity else None
+        self.cluster_columns = tuple(cluster_columns)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, TableLayout) and (
+            (self.partition_column, self.partition_granularity, self.cluster_columns)
+            == (other.partition_column, other.partition_granularity, other.cluster_columns)
+        )
+
+    def __repr__(self) -> str:
+        partition = f"{self.partition_column}/{self.partition_granularity}" if self.partition_column else "-"
+        return f"TableLayout(partition={partition}, cluster={','.join(self.cluster_columns) or '-'})"
+
+    def clauses(self) -> str:
+        """PARTITION BY / CLUSTER BY para CREATE TABLE o CREATE MATERIALIZED VIEW"""
+        clauses = []
+        if self.partition_column:
+            clauses.append(f"PARTITION BY TIMESTAMP_TRUNC({self.partition_column}, {self.partition_granularity})")
+        if self.cluster_columns:
+            clauses.append(f"CLUSTER BY {', '.join(self.cluster_columns)}")
+        return "\n    ".join(clauses)
+
+
+# works_index se filtra por categoría, estado, última versión y rango de created_date; la sincronización
+# incremental filtra por updated_date, que no poda particiones pero sí bloques dentro de cada grupo.
+# works_categories es chica y no tiene esas columnas: solo se agrupa por is_active (get_all).
+TABLE_LAYOUTS = {
+    WORKS_TABLE.name: TableLayout(
+        partition_column="created_date",
+        partition_granularity=TABLE_LAYOUT_CONFIG["partition_granularity"],
+        cluster_columns=("category", "status", "is_latest", "updated_date")
+    ),
+    CATEGORIES_TABLE.name: TableLayout(cluster_columns=("is_active",))
+}
+
+VIEWS = [WORKS_LATEST_VIEW]
+
+
+def build_create_table_ddl(table_ref: str, table: TableSpec, layout: TableLayout) -> str:
+    """CREATE TABLE con las columnas de la tabla y su diseño"""
+    columns = ",\n        ".join(f"{column} {column_type}" for column, column_type in table.columns.items())
+    return f"""
+    CREATE TABLE IF NOT EXISTS `{table_ref}` (
+        {columns}
+    )
+    {layout.clauses()}
+    """
+
+
+def build_migration_ddl(table_ref: str, layout: TableLayout, backup_suffix: str) -> str:
+    """Script que copia la tabla con el diseño nuevo y la reemplaza, conservando la original como respaldo.
+
+    BigQuery no permite cambiar la partición de una tabla existente (ni con CREATE OR
+    REPLACE), así que se copia y se renombra. Las escrituras que lleguen durante la copia
+    quedan solo en el respaldo: conviene ejecutarlo sin escrituras en curso.
+    """
+    new_ref = f"{table_ref}__relayout"
+    table_name = table_ref.split(".")[-1]
+    return f"""
+    CREATE TABLE `{new_ref}`
+    {layout.clauses()}
+    AS SELECT * FROM `{table_ref}`;
+    ALTER TABLE `{table_ref}` RENAME TO `{table_name}__backup_{backup_suffix}`;
+    ALTER TABLE `{new_ref}` RENAME TO `{table_name}`;
+    """
+
+
+def build_view_ddl(view_ref: str, base_ref: str, view: TableSpec, materialized: bool) -> str:
+    """Vista con las filas de la tabla base que cumplen view_filter.
+
+    La vista lógica no guarda datos: filtra al consultar y aprovecha el clustering de la
+    base. La materializada guarda solo las filas filtradas con el mismo diseño que la base
+    y BigQuery la mantiene al día (una consulta directa siempre ve los datos vigentes).
+    """
+    conditions = " AND ".join(f"{column} = {_literal(view.columns[column], value)}"
+                              for column, value in view.view_filter.items())
+    if materialized:
+        return f"""
+    CREATE MATERIALIZED VIEW IF NOT EXISTS `{view_ref}`
+    {TABLE_LAYOUTS[view.view_of.name].clauses()}
+    AS SELECT * FROM `{base_ref}` WHERE {conditions}
+    """
+    return f"""
+    CREATE OR REPLACE VIEW `{view_ref}`
+    AS SELECT * FROM `{base_ref}` WHERE {conditions}
+    """
+
+
+def _literal(column_type: str, value) -> str:
+    """Valor constante de un filtro de vista como literal SQL"""
+    if column_type == "BOOL":
+        return "TRUE" if value else "FALSE"
+    if column_type == "INT64":
+        return str(int(value))
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _get_table(client: bigquery.Client, table_ref: str) -> Optional[bigquery.Table]:
+    try:
+        return client.get_table(table_ref)
+    except exceptions.NotFound:
+        return None
+
+
+def current_layout(client: bigquery.Client, table_ref: str) -> Optional[TableLayout]:
+    """Diseño actual de una tabla (None si no existe)"""
+    table = _get_table(client, table_ref)
+    if table is None:
+        return None
+    partitioning = table.time_partitioning
+    return TableLayout(
+        partition_column=partitioning.field if partitioning else None,
+        partition_granularity=partitioning.type_ if partitioning else None,
+        cluster_columns=tuple(table.clustering_fields or ())
+    )
+
+
+def plan(client: bigquery.Client, project_id: str, dataset_id: str) -> List[Tuple[str, str]]:
+    """Pasos (descripción, DDL) para llevar tablas y vistas al diseño configurado"""
+    steps = []
+    migrated = set()
+    backup_suffix = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    for table in (CATEGORIES_TABLE, WORKS_TABLE):
+        table_ref = f"{project_id}.{dataset_id}.{table.name}"
+        layout = TABLE_LAYOUTS[table.name]
+        current = current_layout(client, table_ref)
+        if current is None:
+            steps.append((f"crear {table.name} {layout}", build_create_table_ddl(table_ref, table, layout)))
+        elif current != layout:
+            steps.append((f"migrar {table.name}: {current} -> {layout}",
+                          build_migration_ddl(table_ref, layout, backup_suffix)))
+            migrated.add(table.name)
+
+    materialized = TABLE_LAYOUT_CONFIG["latest_view"] == "materialized"
+    for view in VIEWS:
+        view_ref = f"{project_id}.{dataset_id}.{view.name}"
+        base_ref = f"{project_id}.{dataset_id}.{view.view_of.name}"
+        existing = _get_table(client, view_ref)
+        existing_type = existing.table_type if existing is not None else None
+        if existing_type == "MATERIALIZED_VIEW" and (not materialized or view.view_of.name in migrated):
+            # Cambio de tipo, o la vista materializada quedó ligada a la tabla renombrada
+            steps.append((f"descartar {view.name}", f"DROP MATERIALIZED VIEW `{view_ref}`"))
+        elif existing_type == "VIEW" and materialized:
+            steps.append((f"descartar {view.name}", f"DROP VIEW `{view_ref}`"))
+        kind = "vista materializada" if materialized else "vista"
+        steps.append((f"{kind} {view.name}", build_view_ddl(view_ref, base_ref, view, materialized)))
+    return steps
+
+
+def apply(client: bigquery.Client, steps: List[Tuple[str, str]]):
+    """Ejecutar los pasos en orden; se detiene en el primer error"""
+    for description, ddl in steps:
+        with track_call("schema.apply", kind="ddl", step=description) as call:
+            job = client.query(ddl)
+            job.result()
+            record_job_stats(call, job)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apply", action="store_true", help="ejecutar el plan (sin esto solo se muestra)")
+    args = parser.parse_args()
+
+    client = get_bigquery_client(BIGQUERY_PROJECT)
+    steps = plan(client, BIGQUERY_PROJECT, BIGQUERY_DATASET)
+    for description, ddl in steps:
+        print(f"-- {description}{ddl}")
+    if args.apply:
+        apply(client, steps)
+        logger.info("Schema applied", extra={"fields": {"steps": len(steps)}})
+
+
+if __name__ == "__main__":
+    main()
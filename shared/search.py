@@ -0,0 +1,212 @@
+"""
+Índice invertido en memoria para buscar trabajos sin consultar la base de datos
+"""
+import bisect
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from config import SEARCH_CONFIG
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Minúsculas y sin tildes ni otros caracteres no ASCII ("Análisis" -> "analisis", "ñ" -> "n")"""
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """Palabras normalizadas de un texto"""
+    return _TOKEN_PATTERN.findall(normalize(text))
+
+
+def _column_tokens(values: pd.Series) -> pd.DataFrame:
+    """Pares (fila, palabra) de una columna; cada texto distinto se tokeniza una sola vez"""
+    if isinstance(values.dtype, pd.ArrowDtype) and pa.types.is_list(values.dtype.pyarrow_dtype):
+        values = pc.binary_join(pa.array(values), " ").to_pandas()
+    elif values.dtype == object:
+        values = values.map(lambda value: " ".join(value) if isinstance(value, (list, tuple, np.ndarray)) else value)
+    codes, uniques = pd.factorize(values)
+    unique_tokens = pd.Series([tokenize(str(text)) for text in uniques], dtype=object)
+    unique_tokens = unique_tokens.explode().dropna()
+    tokens_by_code = pd.DataFrame({"code": unique_tokens.index.to_numpy(), "token": unique_tokens.to_numpy()})
+    docs = pd.DataFrame({"doc": np.arange(len(codes), dtype=np.int32), "code": codes})
+    return docs[docs["code"] >= 0].merge(tokens_by_code, on="code")[["doc", "token"]].drop_duplicates()
+
+
+class SearchIndex:
+    """Índice invertido palabra -> (documentos, pesos) con búsqueda por prefijo.
+
+    Cada documento tiene un número interno y las listas de postings son arreglos numpy,
+    así que puntuar una palabra presente en todo el catálogo es una operación vectorial.
+    El peso de un documento para una palabra es la suma de los pesos de los campos en que
+    aparece (SEARCH_CONFIG["fields"]). Reindexar un documento lo marca como borrado y le
+    asigna un número nuevo. Los borrados no se compactan: siguen en las listas de postings
+    (rank los filtra con _alive) hasta que la recarga completa del snapshot, cada
+    DELTA_FULL_REFRESH_SECONDS, construye un índice nuevo.
+    """
+
+    def __init__(self, fields: Dict[str, float]):
+        self.fields = fields
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._vocabulary: List[str] = []  # ordenado, para resolver prefijos con bisect
+        self._keys: List[str] = []  # número de documento -> clave
+        self._ordinals: Dict[str, int] = {}  # clave -> número de documento vigente
+        self._alive = np.zeros(0, dtype=bool)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, key_column: str, fields: Dict[str, float],
+                       extra_batches: Iterable[pd.DataFrame] = ()) -> "SearchIndex":
+        """Construir el índice completo con operaciones por columna.
+
+        Los campos que df no tiene se toman de extra_batches: lotes con key_column y esos
+        campos (p. ej. texto largo leído aparte), de los que solo se guardan las palabras.
+        Las filas de los lotes que no están en df se ignoran.
+        """
+        index = cls(fields)
+        index._keys = list(df[key_column])
+        index._ordinals = {key: ordinal for ordinal, key in enumerate(index._keys)}
+        index._alive = np.ones(len(index._keys), dtype=bool)
+
+        frames = []
+        for field, weight in fields.items():
+            if field not in df:
+                continue
+            tokens = _column_tokens(df[field])
+            tokens["weight"] = np.float32(weight)
+            frames.append(tokens)
+        key_positions = pd.Index(df[key_column])
+        for batch in extra_batches:
+            documents = key_positions.get_indexer(batch[key_column])
+            for field, weight in fields.items():
+                if field in df or field not in batch:
+                    continue
+                tokens = _column_tokens(batch[field])
+                tokens["doc"] = documents[tokens["doc"].to_numpy()]
+                frames.append(tokens[tokens["doc"] >= 0].assign(weight=np.float32(weight)))
+        if not frames or df.empty:
+            return index
+
+        grouped = pd.concat(frames, ignore_index=True).groupby(["token", "doc"])["weight"].sum().reset_index()
+        tokens = grouped["token"].to_numpy()
+        boundaries = np.flatnonzero(tokens[1:] != tokens[:-1]) + 1
+        vocabulary = tokens[np.r_[0, boundaries]] if len(tokens) else []
+        docs = grouped["doc"].to_numpy(dtype=np.int32)
+        weights = grouped["weight"].to_numpy(dtype=np.float32)
+        starts = np.r_[0, boundaries].tolist()
+        ends = np.r_[boundaries, len(tokens)].tolist()
+        # Vistas sobre dos arreglos contiguos: una lista de postings por palabra sin copias
+        index._postings = {token: (docs[start:end], weights[start:end])
+                           for token, start, end in zip(vocabulary, starts, ends)}
+        index._vocabulary = list(vocabulary)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def add(self, key: str, record: Dict):
+        """Indexar (o reindexar) un documento"""
+        weights: Dict[str, float] = {}
+        for field, weight in self.fields.items():
+            value = record.get(field)
+            if isinstance(value, (list, tuple, np.ndarray)):
+                value = " ".join(value)
+            if not isinstance(value, str):
+                continue
+            for token in set(tokenize(value)):
+                weights[token] = weights.get(token, 0.0) + weight
+        with self._lock:
+            self._remove(key)
+            ordinal = len(self._keys)
+            self._keys.append(key)
+            self._ordinals[key] = ordinal
+            if ordinal >= len(self._alive):
+                self._alive = np.concatenate([self._alive, np.zeros(max(ordinal, 16), dtype=bool)])
+            self._alive[ordinal] = True
+            for token, weight in weights.items():
+                postings = self._postings.get(token)
+                if postings is None:
+                    bisect.insort(self._vocabulary, token)
+                    postings = (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32))
+                self._postings[token] = (np.append(postings[0], np.int32(ordinal)),
+                                         np.append(postings[1], np.float32(weight)))
+
+    def add_rows(self, df: pd.DataFrame, key_column: str):
+        """Indexar las filas de un DataFrame (pocas: altas y cambios incrementales)"""
+        for record in df.to_dict("records"):
+            self.add(record[key_column], record)
+
+    def remove(self, keys: Iterable[str]):
+        """Quitar documentos del índice"""
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def _remove(self, key: str):
+        ordinal = self._ordinals.pop(key, None)
+        if ordinal is not None:
+            self._alive[ordinal] = False
+
+    def keys(self) -> List[str]:
+        """Clave de cada número de documento, incluidos los borrados"""
+        with self._lock:
+            return list(self._keys)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Claves que contienen todas las palabras de la consulta (como palabra o prefijo), por relevancia"""
+        ordinals, scores = self.rank(query)
+        if limit:
+            ordinals, scores = ordinals[:limit], scores[:limit]
+        with self._lock:
+            return [(self._keys[ordinal], float(score)) for ordinal, score in zip(ordinals, scores)]
+
+    def rank(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Números de documento que coinciden con la consulta y sus puntajes, por relevancia.
+
+        Un documento coincide si contiene todas las palabras de la consulta, completas o como
+        prefijo. Una coincidencia por prefijo vale SEARCH_CONFIG["prefix_factor"] de una exacta;
+        las palabras más cortas que prefix_min_chars solo coinciden completas.
+        """
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return empty
+        with self._lock:
+            size = len(self._keys)
+            matched = self._alive[:size].copy()
+            total = np.zeros(size, dtype=np.float32)
+            for term in terms:
+                term_scores = self._term_scores(term, size)
+                matched &= term_scores > 0
+                if not matched.any():
+                    return empty
+                total += term_scores
+        candidates = np.flatnonzero(matched)
+        ranked = candidates[np.argsort(-total[candidates], kind="stable")]
+        return ranked, total[ranked]
+
+    def _term_scores(self, term: str, size: int) -> np.ndarray:
+        """Mejor puntaje de cada documento para un término (palabra exacta o prefijo)"""
+        scores = np.zeros(size, dtype=np.float32)
+        exact = self._postings.get(term)
+        if exact is not None:
+            scores[exact[0]] = exact[1]
+        if len(term) < SEARCH_CONFIG["prefix_min_chars"]:
+            return scores
+
+        start = bisect.bisect_left(self._vocabulary, term)
+        end = bisect.bisect_left(self._vocabulary, term + "\uffff", lo=start)
+        prefixed = [self._postings[token] for token in self._vocabulary[start:end] if token != term]
+        if prefixed:
+            docs = np.concatenate([postings[0] for postings in prefixed])
+            weights = np.concatenate([postings[1] for postings in prefixed]) * SEARCH_CONFIG["prefix_factor"]
+            np.maximum.at(scores, docs, weights)
+        return scores
@@ -0,0 +1,230 @@
+"""
+Backend de almacenamiento local sobre SQLite (desarrollo y mediciones sin red ni facturación)
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from backends import (CATEGORIES_TABLE, CURRENT_TIMESTAMP, WORKS_LATEST_VIEW, WORKS_TABLE, StorageBackend,
+                      TableSpec, build_keyset_condition, build_next_cursor)
+from config import SQLITE_PATH
+from instrumentation import track_call
+
+_SQLITE_TYPES = {
+    "STRING": "TEXT",
+    "INT64": "INTEGER",
+    "BOOL": "INTEGER",
+    "TIMESTAMP": "TEXT",
+    "ARRAY<STRING>": "TEXT"  # JSON
+}
+
+# Formato de ancho fijo en UTC: el orden lexicográfico coincide con el cronológico
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+class SQLiteBackend(StorageBackend):
+    """Tablas en un archivo SQLite (o en memoria con ":memory:")"""
+
+    def __init__(self, path: str = SQLITE_PATH,
+                 tables: Tuple[TableSpec, ...] = (CATEGORIES_TABLE, WORKS_TABLE, WORKS_LATEST_VIEW)):
+        self.path = path
+        # Una conexión compartida por todas las sesiones, serializada con un lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        for table in tables:
+            self._create_table(table)
+
+    def get_all(self, table: TableSpec, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        where_clause = f"WHERE {table.active_column} = 1" if table.active_column else ""
+        select_list = ", ".join(columns) if columns else "*"
+        query = f"SELECT {select_list} FROM {table.name} {where_clause} ORDER BY {self._order_clause(table.order_by)}"
+        return self._read(f"{table.name}.get_all", table, query, [])
+
+    def get_keys(self, table: TableSpec) -> List[str]:
+        query = f"SELECT {table.key_column} FROM {table.name}"
+        return self._read(f"{table.name}.get_keys", table, query, [])[table.key_column].tolist()
+
+    def get_by_id(self, table: TableSpec, key: str, columns: Optional[List[str]] = None) -> Dict:
+        select_list = ", ".join(columns) if columns else "*"
+        query = f"SELECT {select_list} FROM {table.name} WHERE {table.key_column} = ? LIMIT 1"
+        result = self._read(f"{table.name}.get_by_id", table, query, [key])
+        return result.to_dict('records')[0] if not result.empty else {}
+
+    def get_max_updated(self, table: TableSpec) -> Optional[pd.Timestamp]:
+        query = f"SELECT MAX(updated_date) AS updated_date FROM {table.name}"
+        result = self._read(f"{table.name}.get_max_updated", table, query, [])
+        value = result["updated_date"].iloc[0]
+        return None if pd.isna(value) else value
+
+    def get_changed(self, table: TableSpec, since: pd.Timestamp,
+                    columns: Optional[List[str]] = None) -> pd.DataFrame:
+        select_list = ", ".join(columns) if columns else "*"
+        query = f"SELECT {select_list} FROM {table.name} WHERE updated_date > ?"
+        return self._read(f"{table.name}.get_changed", table, query, [self._encode("TIMESTAMP", since)])
+
+    def list_page(self, table: TableSpec, columns: List[str], filters: Dict,
+                  page_size: int, cursor: Optional[Dict]) -> Tuple[pd.DataFrame, Optional[Dict]]:
+        keyset_columns = [column for column, _ in table.keyset_order]
+        select_columns = columns + [c for c in keyset_columns if c not in columns]
+        conditions = []
+        params: Dict[str, Any] = {}
+
+        for name, value in filters.items():
+            if name == "tag":
+                conditions.append("EXISTS (SELECT 1 FROM json_each(tags) WHERE json_each.value = :tag)")
+                params["tag"] = value
+            elif name == "created_from":
+                conditions.append("created_date >= :created_from")
+                params["created_from"] = self._encode("TIMESTAMP", value)
+            elif name == "created_to":
+                conditions.append("created_date < :created_to")
+                params["created_to"] = self._encode("TIMESTAMP", value)
+            elif name in table.columns:
+                conditions.append(f"{name} = :{name}")
+                params[name] = self._encode(table.columns[name], value)
+            else:
+                raise ValueError(f"Filtro desconocido: {name}")
+
+        if cursor:
+            conditions.append(build_keyset_condition(table.keyset_order, lambda c: f":cursor_{c}"))
+            params.update({
+                f"cursor_{column}": self._encode(table.columns[column], cursor[column])
+                for column in keyset_columns
+            })
+
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+        SELECT {', '.join(select_columns)}
+        FROM {table.name}
+        {where_clause}
+        ORDER BY {self._order_clause(table.keyset_order)}
+        LIMIT {int(page_size) + 1}
+        """
+        result = self._read(f"{table.name}.list_page", table, query, params)
+
+        next_cursor = None
+        if len(result) > page_size:
+            result = result.iloc[:page_size]
+            next_cursor = build_next_cursor(result, table)
+        return result[columns].reset_index(drop=True), next_cursor
+
+    def create(self, table: TableSpec, rows: List[Dict]) -> bool:
+        return self.create_bulk(table, rows) == len(rows)
+
+    def create_bulk(self, table: TableSpec, rows: List[Dict]) -> int:
+        if not rows:
+            return 0
+        columns = list(table.columns)
+        query = (f"INSERT INTO {table.name} ({', '.join(columns)}) "
+                 f"VALUES ({', '.join('?' for _ in columns)})")
+        values = [
+            [self._encode(table.columns[column], row.get(column)) for column in columns]
+            for row in rows
+        ]
+        with track_call(f"{table.name}.create", kind="insert", rows=len(rows)), self._lock, self.connection:
+            self.connection.executemany(query, values)
+        return len(rows)
+
+    def update(self, table: TableSpec, updates: List[Tuple[str, Dict]]):
+        now = self._encode("TIMESTAMP", CURRENT_TIMESTAMP)
+        with track_call(f"{table.name}.update", kind="dml", rows=len(updates)), self._lock, self.connection:
+            for key, changes in updates:
+                changed = [column for column in changes if column != table.key_column]
+                unknown = [column for column in changed if column not in table.update_columns]
+                if unknown:
+                    raise ValueError(f"Columnas no editables: {', '.join(unknown)}")
+                set_clauses = [f"{column} = ?" for column in changed] + ["updated_date = ?"]
+                values = [self._encode(table.columns[column], changes[column]) for column in changed]
+                self.connection.execute(
+                    f"UPDATE {table.name} SET {', '.join(set_clauses)} WHERE {table.key_column} = ?",
+                    values + [now, key]
+                )
+
+    def archive(self, table: TableSpec, keys: List[str],
+                children: Optional[Tuple[TableSpec, str]] = None):
+        with track_call(f"{table.name}.archive", kind="dml", rows=len(keys)), self._lock, self.connection:
+            self._archive_rows(table, table.key_column, keys)
+            if children:
+                child_table, foreign_key = children
+                self._archive_rows(child_table, foreign_key, keys)
+
+    def _archive_rows(self, table: TableSpec, column: str, keys: List[str]):
+        """Aplicar los valores de archivo a las filas aún no archivadas"""
+        set_clauses, values, pending = [], [], []
+        for target, value in table.archive_values.items():
+            set_clauses.append(f"{target} = ?")
+            values.append(self._encode(table.columns[target], value))
+            if value is not CURRENT_TIMESTAMP:
+                pending.append((f"IFNULL({target} != ?, 1)", self._encode(table.columns[target], value)))
+        set_clauses.append("updated_date = ?")
+        values.append(self._encode("TIMESTAMP", CURRENT_TIMESTAMP))
+
+        condition = f"{column} IN ({', '.join('?' for _ in keys)})"
+        if pending:
+            condition += f" AND ({' OR '.join(clause for clause, _ in pending)})"
+        self.connection.execute(
+            f"UPDATE {table.name} SET {', '.join(set_clauses)} WHERE {condition}",
+            values + list(keys) + [value for _, value in pending]
+        )
+
+    def _create_table(self, table: TableSpec):
+        """Crear la tabla (o la vista) si no existe, con tipos equivalentes a los de BigQuery"""
+        if table.view_of is not None:
+            conditions = [f"{column} = {self._encode(table.columns[column], value)!r}"
+                          for column, value in table.view_filter.items()]
+            with self._lock, self.connection:
+                self.connection.execute(
+                    f"CREATE VIEW IF NOT EXISTS {table.name} AS SELECT * FROM {table.view_of.name} "
+                    f"WHERE {' AND '.join(conditions)}"
+                )
+            return
+        columns = [
+            f"{column} {_SQLITE_TYPES[column_type]}{' PRIMARY KEY' if column == table.key_column else ''}"
+            for column, column_type in table.columns.items()
+        ]
+        with self._lock, self.connection:
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS {table.name} ({', '.join(columns)})")
+
+    def _read(self, operation: str, table: TableSpec, query: str, params) -> pd.DataFrame:
+        """Ejecutar lectura y devolver los tipos que devolvería BigQuery"""
+        with track_call(operation, kind="query") as call, self._lock:
+            cursor = self.connection.execute(query, params)
+            column_names = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
+            call["rows"] = len(rows)
+        df = pd.DataFrame(rows, columns=column_names)
+
+        for column in df.columns:
+            column_type = table.columns.get(column)
+            if column_type == "BOOL":
+                df[column] = df[column].astype("boolean")
+            elif column_type == "TIMESTAMP":
+                df[column] = pd.to_datetime(df[column], format=_TIMESTAMP_FORMAT, utc=True)
+            elif column_type == "ARRAY<STRING>":
+                df[column] = df[column].map(lambda value: json.loads(value) if value else [])
+        return df
+
+    def _encode(self, column_type: str, value: Any) -> Any:
+        """Convertir un valor Python al formato almacenado en SQLite"""
+        if value is CURRENT_TIMESTAMP:
+            return datetime.now(timezone.utc).strftime(_TIMESTAMP_FORMAT)
+        if value is None:
+            return None
+        if column_type == "BOOL":
+            return int(bool(value))
+        if column_type == "TIMESTAMP":
+            timestamp = pd.Timestamp(value)
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.tz_convert("UTC")
+            return timestamp.strftime(_TIMESTAMP_FORMAT)
+        if column_type == "ARRAY<STRING>":
+            return json.dumps(list(value))
+        return value
+
+    def _order_clause(self, order: List[Tuple[str, bool]]) -> str:
+        """ORDER BY a partir de [(columna, descendente)]"""
+        return ", ".join(f"{column} DESC" if descending else column for column, descending in order)
@@ -0,0 +1,61 @@
+"""
+Arranque en frío: medición de fases y precalentamiento del proceso antes del primer usuario
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from instrumentation import logger
+
+# Origen de las mediciones: start.py importa este módulo antes que cualquier dependencia pesada
+_process_started = time.perf_counter()
+_lock = threading.Lock()
+_phases: Dict[str, float] = {}
+
+
+@contextmanager
+def phase(name: str):
+    """Medir una fase del arranque (imports, backend, primera consulta)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _phases[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def get_startup_report() -> Dict[str, float]:
+    """Duración en ms de cada fase medida y el total desde el inicio del proceso hasta quedar listo"""
+    with _lock:
+        return dict(_phases)
+
+
+def warm_up():
+    """Crear el cliente compartido y cargar las categorías en la caché.
+
+    Corre en un hilo del mismo proceso que el servidor de Streamlit, así que el cliente
+    y la caché que deja listos son los que usan después todas las sesiones.
+    """
+    # Imports diferidos: el servidor empieza a escuchar sin esperar a google-cloud-bigquery
+    from backends import get_backend
+    from database import CategoriesDatabase
+
+    try:
+        with phase("backend_ms"):
+            get_backend()
+        with phase("first_query_ms"):
+            CategoriesDatabase().get_all_categories()
+    except Exception:
+        logger.exception("Error warming up")
+    finally:
+        with _lock:
+            _phases["ready_ms"] = round((time.perf_counter() - _process_started) * 1000, 1)
+        logger.info("startup", extra={"fields": {"operation": "startup", **get_startup_report()}})
+
+
+def start_warm_up() -> threading.Thread:
+    """Lanzar warm_up() en segundo plano"""
+    thread = threading.Thread(target=warm_up, name="startup-warm-up", daemon=True)
+    thread.start()
+    return thread
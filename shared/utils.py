@@ -6,6 +6,8 @@ from datetime import datetime
 import hashlib
 import re
 
+from config import STATUS_BADGES
+
 def generate_category_id(name: str) -> str:
     """Generar ID único para una categoría basado en el nombre"""
     # Convertir a minúsculas y reemplazar espacios con guiones
@@ -39,13 +41,7 @@ def format_date(date_str: str) -> str:
 
 def get_status_badge(status: str) -> str:
     """Obtener emoji para el estado"""
-    status_emojis = {
-        "active": "🟢",
-        "paused": "⏸️", 
-        "archived": "📁",
-        "maintenance": "🔧"
-    }
-    return status_emojis.get(status, "❓")
+    return STATUS_BADGES.get(status, "❓")
 
 def show_success_message(message: str):
     """Mostrar mensaje de éxito"""
@@ -65,7 +61,7 @@ def validate_image_file(file) -> tuple[bool, str]:
         return False, "No se seleccionó archivo"
     
     # Verificar tipo de archivo
-    allowed_types = ["image/jpeg", "image/png", "image/gif"]
+    allowed_types = ["image/jpeg", "image/png", "image/gif", "image/webp"]
     if file.type not in allowed_types:
         return False, f"Tipo de archivo no permitido. Use: {', '.join(allowed_types)}"
     
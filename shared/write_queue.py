@@ -0,0 +1,148 @@
+"""
+Cola de escritura diferida: ediciones y archivos se confirman en segundo plano, en lotes
+"""
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backends import TableSpec, get_backend
+from instrumentation import logger, track_call
+
+PENDING = "pending"
+COMMITTED = "committed"
+FAILED = "failed"
+
+
+class WriteBehindQueue:
+    """Cola acotada de escrituras con un hilo que las aplica en el backend.
+
+    Las escrituras consecutivas del mismo tipo sobre la misma tabla se envían juntas
+    (un MERGE o un UPDATE por lote en BigQuery), y varias ediciones de una misma fila
+    se combinan en una. on_flushed(tabla, ok) se llama después de cada lote.
+    """
+
+    def __init__(self, max_pending: int, batch_window_seconds: float, max_batch: int,
+                 max_statuses: int = 1000):
+        self.batch_window_seconds = batch_window_seconds
+        self.max_batch = max_batch
+        self.max_statuses = max_statuses
+        self.on_flushed: Optional[Callable[[TableSpec, bool], None]] = None
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_pending)
+        self._statuses: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, table: TableSpec, kind: str, changes: List[Tuple[str, Dict]],
+               children: Optional[Tuple[TableSpec, str]] = None) -> List[str]:
+        """Encolar escrituras ("update" o "archive") como pares (clave, cambios); devuelve sus IDs.
+
+        Se encolan todas o ninguna: si no hay lugar lanza queue.Full, para que quien
+        llama escriba de forma síncrona.
+        """
+        with self._submit_lock:
+            # Solo el hilo de escritura saca elementos: el lugar libre no puede disminuir
+            if self._queue.maxsize - self._queue.qsize() < len(changes):
+                raise queue.Full
+            write_ids = []
+            for key, row_changes in changes:
+                write_id = f"w{next(self._ids)}"
+                with self._lock:
+                    self._statuses[write_id] = {
+                        "write_id": write_id, "table": table.name, "kind": kind, "key": key,
+                        "status": PENDING, "error": None, "submitted_at": time.time()
+                    }
+                    while len(self._statuses) > self.max_statuses:
+                        self._statuses.popitem(last=False)
+                self._queue.put_nowait({"write_id": write_id, "table": table, "kind": kind, "key": key,
+                                        "changes": row_changes, "children": children})
+                write_ids.append(write_id)
+        self._ensure_worker()
+        return write_ids
+
+    def statuses(self, write_ids: List[str]) -> List[Dict]:
+        """Estado de las escrituras indicadas (las ya olvidadas se omiten)"""
+        with self._lock:
+            return [dict(self._statuses[w]) for w in write_ids if w in self._statuses]
+
+    def pending_count(self) -> int:
+        """Escrituras encoladas o en curso"""
+        return self._queue.unfinished_tasks
+
+    def drain(self, timeout: float = 30.0) -> bool:
+        """Esperar a que se apliquen todas las escrituras encoladas; False si vence el plazo"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _ensure_worker(self):
+        """Arrancar el hilo de escritura la primera vez que se encola algo"""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Ventana corta para juntar las escrituras que llegan casi a la vez
+            deadline = time.monotonic() + self.batch_window_seconds
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _flush(self, batch: List[Dict]):
+        """Aplicar el lote por tramos consecutivos de igual tabla, tipo y tablas hijas"""
+        group_key = lambda item: (item["table"].name, item["kind"], item["children"])
+        for _, run in itertools.groupby(batch, key=group_key):
+            run = list(run)
+            table, kind, children = run[0]["table"], run[0]["kind"], run[0]["children"]
+            # Ediciones de una misma fila combinadas en una sola, respetando el orden de llegada
+            merged: "OrderedDict[str, Dict]" = OrderedDict()
+            for item in run:
+                merged.setdefault(item["key"], {}).update(item["changes"])
+
+            ok = True
+            try:
+                with track_call(f"{table.name}.write_behind", kind="write_behind", writes=len(run), rows=len(merged)):
+                    backend = get_backend()
+                    if kind == "update":
+                        backend.update(table, list(merged.items()))
+                    else:
+                        backend.archive(table, list(merged), children)
+            except Exception as e:
+                ok = False
+                logger.exception("Error flushing queued writes", extra={"fields": {"table": table.name, "kind": kind}})
+                self._set_status(run, FAILED, str(e))
+            else:
+                self._set_status(run, COMMITTED)
+
+            if self.on_flushed is not None:
+                self.on_flushed(table, ok)
+                if children:
+                    self.on_flushed(children[0], ok)
+
+    def _set_status(self, items: List[Dict], status: str, error: Optional[str] = None):
+        with self._lock:
+            for item in items:
+                entry = self._statuses.get(item["write_id"])
+                if entry is not None:
+                    entry["status"] = status
+                    entry["error"] = error
@@ -0,0 +1,38 @@
+"""
+Punto de entrada del contenedor: servidor de Streamlit con precalentamiento en el mismo proceso
+
+    python start.py --server.port=8080 --server.address=0.0.0.0
+
+Equivale a `streamlit run admin_main.py`, pero mientras el servidor arranca un hilo crea el
+cliente BigQuery y carga las categorías en la caché compartida, así que la primera sesión
+no paga el arranque en frío. Acepta las mismas opciones --seccion.opcion=valor que
+`streamlit run`.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(ROOT, "shared"))
+
+# Primero: fija el origen de las mediciones de arranque
+import startup
+
+with startup.phase("imports_ms"):
+    from streamlit.web import bootstrap
+    import pandas  # noqa: F401 - lo usan todas las secciones; mejor pagarlo antes del primer usuario
+
+
+def parse_flag_options(argv: list) -> dict:
+    """Convertir --server.port=8080 en {"server_port": "8080"}, como hace `streamlit run`"""
+    options = {}
+    for arg in argv:
+        name, _, value = arg[2:].partition("=")
+        options[name.replace(".", "_")] = value
+    return options
+
+
+if __name__ == "__main__":
+    flag_options = parse_flag_options(sys.argv[1:])
+    bootstrap.load_config_options(flag_options=flag_options)
+    startup.start_warm_up()
+    bootstrap.run(os.path.join(ROOT, "admin_main.py"), False, [], flag_options)
@@ -0,0 +1,36 @@
+"""
+Configuración de pytest: los módulos de shared/ se importan por nombre, igual que en la app
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "shared"))
+
+
+@pytest.fixture
+def sqlite_backend():
+    """Backend SQLite en memoria como backend del proceso, con la caché de snapshots vacía"""
+    import backends
+    from database import snapshot_cache
+    from sqlite_backend import SQLiteBackend
+
+    backend = SQLiteBackend(":memory:")
+    backends.set_backend(backend)
+    snapshot_cache.clear()
+    yield backend
+    snapshot_cache.clear()
+    backends.set_backend(None)
+
+
+def make_work(work_id: str, **values) -> dict:
+    """Fila completa de works_index con valores por defecto"""
+    now = pd.Timestamp.now(tz="UTC")
+    return {"work_id": work_id, "work_name": f"Trabajo {work_id}", "work_slug": work_id, "category": "ml",
+            "subcategory": "", "status": "active", "version": "1.0", "is_latest": True, "description": "",
+            "short_description": "", "image_preview_url": "", "created_date": now, "updated_date": now,
+            "activated_date": None, "archived_date": None, "work_url": "https://example.com",
+            "config_json": "{}", "notes": "", "tags": [], **values}
@@ -0,0 +1,77 @@
+"""
+Sincronización incremental de snapshots: filas cambiadas desde la marca de agua combinadas por clave
+"""
+import pandas as pd
+import pytest
+
+from backends import CATEGORIES_TABLE
+from database import load_snapshot
+from sqlite_backend import SQLiteBackend
+
+START = pd.Timestamp.now(tz="UTC").floor("s") - pd.Timedelta(hours=1)
+
+
+def make_category(category_id: str, display_order: int, updated_date: pd.Timestamp = START) -> dict:
+    return {"category_id": category_id, "category_name": category_id.upper(), "category_icon": "📊",
+            "description": "", "display_order": display_order, "is_active": True,
+            "created_date": START, "updated_date": updated_date}
+
+
+@pytest.fixture
+def backend():
+    backend = SQLiteBackend(":memory:")
+    backend.create_bulk(CATEGORIES_TABLE, [make_category("a", 1), make_category("b", 2), make_category("c", 3)])
+    return backend
+
+
+def category_ids(snapshot) -> list:
+    return snapshot.dataframe["category_id"].tolist()
+
+
+def test_insert_is_merged_in_table_order(backend):
+    snapshot = load_snapshot(backend, CATEGORIES_TABLE)
+    backend.create_bulk(CATEGORIES_TABLE, [make_category("nueva", 2, START + pd.Timedelta(minutes=1))])
+
+    synced = load_snapshot(backend, CATEGORIES_TABLE, snapshot)
+
+    assert category_ids(synced) == ["a", "b", "nueva", "c"]
+    assert synced.watermark == START + pd.Timedelta(minutes=1)
+    assert synced.full_load_at == snapshot.full_load_at
+
+
+def test_update_moves_row_to_its_new_position(backend):
+    snapshot = load_snapshot(backend, CATEGORIES_TABLE)
+    backend.update(CATEGORIES_TABLE, [("a", {"display_order": 9, "category_name": "Última"})])
+
+    synced = load_snapshot(backend, CATEGORIES_TABLE, snapshot)
+
+    assert category_ids(synced) == ["b", "c", "a"]
+    assert synced.lookup("a")["category_name"] == "Última"
+    assert category_ids(snapshot) == ["a", "b", "c"]
+
+
+def test_archived_row_leaves_the_snapshot(backend):
+    snapshot = load_snapshot(backend, CATEGORIES_TABLE)
+    backend.archive(CATEGORIES_TABLE, ["b"])
+
+    synced = load_snapshot(backend, CATEGORIES_TABLE, snapshot)
+
+    assert category_ids(synced) == ["a", "c"]
+    assert synced.lookup("b") is None
+
+
+def test_rows_at_the_watermark_are_reread_without_duplicates(backend):
+    snapshot = load_snapshot(backend, CATEGORIES_TABLE)
+    # Fila confirmada tarde con el mismo updated_date que la marca de agua, más un cambio posterior
+    backend.create_bulk(CATEGORIES_TABLE, [make_category("tardía", 4, snapshot.watermark),
+                                           make_category("posterior", 5, snapshot.watermark + pd.Timedelta(seconds=1))])
+
+    synced = load_snapshot(backend, CATEGORIES_TABLE, snapshot)
+
+    assert category_ids(synced) == ["a", "b", "c", "tardía", "posterior"]
+
+
+def test_unchanged_table_reuses_the_snapshot(backend):
+    snapshot = load_snapshot(backend, CATEGORIES_TABLE)
+
+    assert load_snapshot(backend, CATEGORIES_TABLE, snapshot) is snapshot
@@ -0,0 +1,45 @@
+"""
+Validación de importaciones masivas: los IDs que ya existen se rechazan fila a fila
+"""
+import pandas as pd
+
+from backends import CATEGORIES_TABLE, WORKS_TABLE
+from importer import validate_categories_import, validate_works_import
+from sqlite_backend import SQLiteBackend
+
+CATEGORIES_DF = pd.DataFrame({"category_id": ["ml"], "category_name": ["Machine Learning"]})
+
+
+def work_row(work_id: str) -> dict:
+    return {"work_id": work_id, "work_name": f"Trabajo {work_id}", "category": "ml",
+            "status": "active", "version": "1.0", "work_url": "https://example.com"}
+
+
+def test_existing_work_id_is_a_row_error():
+    import_df = pd.DataFrame([work_row("existente"), work_row("nuevo")])
+
+    valid_df, errors_df = validate_works_import(import_df, CATEGORIES_DF, ["existente"])
+
+    assert valid_df["work_id"].tolist() == ["nuevo"]
+    assert errors_df.to_dict("records") == [{"fila": 1, "campo": "work_id", "error": "El ID ya existe"}]
+
+
+def test_archived_ids_come_back_from_get_keys():
+    backend = SQLiteBackend(":memory:")
+    now = pd.Timestamp.now(tz="UTC")
+    backend.create_bulk(CATEGORIES_TABLE, [
+        {"category_id": "ml", "category_name": "Machine Learning", "category_icon": "🤖", "description": "",
+         "display_order": 1, "is_active": True, "created_date": now, "updated_date": now}
+    ])
+    backend.create_bulk(WORKS_TABLE, [{**work_row("archivado"), "is_latest": True, "tags": [],
+                                       "created_date": now, "updated_date": now}])
+    backend.archive(WORKS_TABLE, ["archivado"])
+    backend.archive(CATEGORIES_TABLE, ["ml"])
+
+    _, work_errors = validate_works_import(pd.DataFrame([work_row("archivado")]), CATEGORIES_DF,
+                                           backend.get_keys(WORKS_TABLE))
+    category_df = pd.DataFrame([{"category_id": "ml", "category_name": "ML", "description": "x"}])
+    _, category_errors = validate_categories_import(category_df, backend.get_keys(CATEGORIES_TABLE))
+
+    assert work_errors["error"].tolist() == ["El ID ya existe"]
+    assert category_errors["error"].tolist() == ["El ID ya existe"]
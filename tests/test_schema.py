@@ -0,0 +1,26 @@
+"""
+Diseño de tablas: comparación del diseño actual con el configurado
+"""
+from types import SimpleNamespace
+
+from backends import WORKS_TABLE
+from schema import TableLayout, current_layout
+
+
+class LayoutClient:
+    """Cliente que solo devuelve una tabla con la partición y el clustering indicados"""
+
+    def __init__(self, partition_type: str, clustering_fields):
+        self.table = SimpleNamespace(time_partitioning=SimpleNamespace(field="created_date", type_=partition_type),
+                                     clustering_fields=list(clustering_fields))
+
+    def get_table(self, table_ref):
+        return self.table
+
+
+def test_partition_granularity_case_does_not_report_drift():
+    configured = TableLayout("created_date", "day", ("category", "status"))
+    client = LayoutClient("DAY", ["category", "status"])
+
+    assert current_layout(client, f"proyecto.dataset.{WORKS_TABLE.name}") == configured
+    assert TableLayout("created_date", "month", ("category", "status")) != configured
@@ -0,0 +1,21 @@
+"""
+Búsqueda de trabajos en el snapshot en memoria
+"""
+from backends import WORKS_TABLE
+from conftest import make_work
+from database import WorksDatabase
+
+
+def test_filters_skip_rows_with_missing_values(sqlite_backend):
+    sqlite_backend.create_bulk(WORKS_TABLE, [
+        make_work("con-valor", work_name="Análisis de datos", is_latest=True),
+        make_work("sin-valor", work_name="Análisis de ventas", is_latest=None, status=None),
+        make_work("anterior", work_name="Análisis previo", is_latest=False)
+    ])
+    db = WorksDatabase()
+
+    latest = db.search_works("analisis", {"is_latest": True})
+    active = db.search_works("analisis", {"status": "active", "is_latest": False})
+
+    assert latest["work_id"].tolist() == ["con-valor"]
+    assert active["work_id"].tolist() == ["anterior"]
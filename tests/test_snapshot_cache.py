@@ -0,0 +1,74 @@
+"""
+Caché compartida de snapshots: carga única por clave, generaciones y desalojo LRU
+"""
+import threading
+import time
+
+from database import SnapshotCache
+
+
+def test_get_or_load_loads_once_for_concurrent_readers():
+    cache = SnapshotCache(max_entries=8, ttl_seconds=60)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.05)
+        return "valor"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load(("works", "by_id", "a"), loader)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["valor"] * 5
+    assert len(loads) == 1
+    assert cache._load_locks == {}
+
+
+def test_get_or_refresh_refreshes_expired_value():
+    cache = SnapshotCache(max_entries=8, ttl_seconds=60)
+    assert cache.get_or_refresh(("works", "all"), lambda: 1, lambda stale: stale + 10) == 1
+
+    cache.invalidate("works")
+
+    assert cache.get(("works", "all")) is None
+    assert cache.get_or_refresh(("works", "all"), lambda: 1, lambda stale: stale + 10) == 11
+    assert cache.get(("works", "all")) == 11
+
+
+def test_discard_during_load_drops_the_loaded_value():
+    cache = SnapshotCache(max_entries=8, ttl_seconds=60)
+    loading = threading.Event()
+    discarded = threading.Event()
+
+    def loader():
+        loading.set()
+        discarded.wait(1)
+        return "leído antes de la escritura"
+
+    thread = threading.Thread(target=lambda: cache.get_or_load(("works", "all"), loader))
+    thread.start()
+    loading.wait(1)
+    cache.discard("works")
+    discarded.set()
+    thread.join()
+
+    assert cache.get(("works", "all")) is None
+    assert cache.get_or_load(("works", "all"), lambda: "nuevo") == "nuevo"
+
+
+def test_lru_eviction_keeps_full_snapshots():
+    cache = SnapshotCache(max_entries=2, ttl_seconds=60)
+    cache.put(("works", "all"), "snapshot")
+    for work_id in ("a", "b", "c"):
+        cache.put(("works", "by_id", work_id), work_id)
+
+    assert cache.get(("works", "all")) == "snapshot"
+    assert cache.get(("works", "by_id", "a")) is None
+    assert [cache.get(("works", "by_id", work_id)) for work_id in ("b", "c")] == ["b", "c"]
+    assert cache.stats()["entries"] == 3
+    assert cache.stats()["pinned"] == 1
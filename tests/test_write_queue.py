@@ -0,0 +1,95 @@
+"""
+Escritura diferida: lotes combinados, estado de cada escritura y copia optimista en la caché
+"""
+import pytest
+
+import database
+from backends import WORKS_TABLE
+from conftest import make_work
+from database import WorksDatabase, write_queue
+from sqlite_backend import SQLiteBackend
+from write_queue import COMMITTED, FAILED, WriteBehindQueue
+
+
+class RecordingBackend(SQLiteBackend):
+    """SQLite en memoria que anota cada update (o falla si se le pide)"""
+
+    def __init__(self, fail: bool = False):
+        super().__init__(":memory:")
+        self.fail = fail
+        self.updates = []
+
+    def update(self, table, updates):
+        self.updates.append(list(updates))
+        if self.fail:
+            raise RuntimeError("backend caído")
+        return super().update(table, updates)
+
+
+@pytest.fixture
+def recording_backend(sqlite_backend):
+    import backends
+    backend = RecordingBackend()
+    backends.set_backend(backend)
+    return backend
+
+
+def test_edits_of_the_same_row_are_merged_into_one_update(recording_backend):
+    recording_backend.create_bulk(WORKS_TABLE, [make_work("a"), make_work("b")])
+    flushed = []
+    queue = WriteBehindQueue(max_pending=10, batch_window_seconds=0.2, max_batch=10)
+    queue.on_flushed = lambda table, ok: flushed.append((table.name, ok))
+
+    write_ids = queue.submit(WORKS_TABLE, "update", [("a", {"work_name": "Uno"}), ("b", {"version": "2.0"}),
+                                                     ("a", {"status": "draft"})])
+    assert queue.drain(5)
+
+    assert recording_backend.updates == [[("a", {"work_name": "Uno", "status": "draft"}), ("b", {"version": "2.0"})]]
+    assert [status["status"] for status in queue.statuses(write_ids)] == [COMMITTED] * 3
+    assert flushed == [(WORKS_TABLE.name, True)]
+    assert recording_backend.get_by_id(WORKS_TABLE, "a")["status"] == "draft"
+
+
+def test_failed_flush_marks_every_write_as_failed(recording_backend):
+    recording_backend.fail = True
+    flushed = []
+    queue = WriteBehindQueue(max_pending=10, batch_window_seconds=0.05, max_batch=10)
+    queue.on_flushed = lambda table, ok: flushed.append(ok)
+
+    write_ids = queue.submit(WORKS_TABLE, "update", [("a", {"work_name": "Uno"}), ("b", {"work_name": "Dos"})])
+    assert queue.drain(5)
+
+    statuses = queue.statuses(write_ids)
+    assert [status["status"] for status in statuses] == [FAILED, FAILED]
+    assert statuses[0]["error"] == "backend caído"
+    assert flushed == [False]
+    assert queue.pending_count() == 0
+
+
+def test_drain_times_out_while_writes_are_pending(recording_backend):
+    queue = WriteBehindQueue(max_pending=10, batch_window_seconds=1.0, max_batch=10)
+    queue.submit(WORKS_TABLE, "update", [("a", {"work_name": "Uno"})])
+
+    assert not queue.drain(0.05)
+    assert queue.pending_count() == 1
+    assert queue.drain(5)
+
+
+def test_queued_edit_shows_up_in_cached_list_pages(sqlite_backend, monkeypatch):
+    monkeypatch.setitem(database.WRITE_BEHIND_CONFIG, "enabled", True)
+    sqlite_backend.create_bulk(WORKS_TABLE, [make_work("a"), make_work("b")])
+    db = WorksDatabase()
+    columns = ["work_name", "status"]
+    db.list_works(columns)
+    db.list_works(columns, {"status": "active"})
+
+    assert db.update_work("a", {"work_name": "Nuevo nombre"})
+    assert db.archive_work("b")
+    all_works, _ = db.list_works(columns)
+    active_works, _ = db.list_works(columns, {"status": "active"})
+    assert write_queue.drain(5)
+
+    # Orden de la tabla: created_date descendente
+    assert all_works.to_dict("records") == [{"work_name": "Trabajo b", "status": "archived"},
+                                            {"work_name": "Nuevo nombre", "status": "active"}]
+    assert active_works.to_dict("records") == [{"work_name": "Nuevo nombre", "status": "active"}]